@@ -9,6 +9,20 @@ const fileUpload = require('express-fileupload');
 
 const birdnet = require('./BirdNET');
 
+// Content types of the recordings the classifier can decode
+const SUPPORTED_CONTENT_TYPES = ['audio/x-wav', 'audio/wav', 'audio/wave', 'audio/flac', 'audio/x-flac'];
+
+function unsupportedFiles(files) {
+    return files.filter(file => SUPPORTED_CONTENT_TYPES.indexOf(file.mimetype) < 0);
+}
+
+function sendUnsupportedMediaType(res) {
+    res.status(415).send({
+        message: 'Unsupported content type',
+        accepted: SUPPORTED_CONTENT_TYPES
+    });
+}
+
 // Creates and configures an ExpressJS web server.
 class App {
 
@@ -53,7 +67,9 @@ class App {
                     //Use the name of the input field (i.e. "avatar") to retrieve the uploaded file
                     let file = req.files.wave;
         
-                    if (!Array.isArray(file)){
+                    if (!Array.isArray(file) && unsupportedFiles([file]).length > 0) {
+                        sendUnsupportedMediaType(res);
+                    } else if (!Array.isArray(file)){
 
                         //Use the mv() method to place the file in upload directory (i.e. "uploads")
                         file.mv('./uploads/' + file.name);
@@ -73,6 +89,46 @@ class App {
             }
         });
 
+        router.post('/actions/analyse_batch', async (req, res) => {
+            try {
+                if (!req.files) {
+                    res.send({
+                        status: false,
+                        message: 'No file uploaded'
+                    });
+                } else {
+                    //All recordings of the batch are uploaded in the field "wave"
+                    let files = req.files.wave;
+                    if (!Array.isArray(files)) {
+                        files = [files];
+                    }
+                    if (unsupportedFiles(files).length > 0) {
+                        sendUnsupportedMediaType(res);
+                        return;
+                    }
+
+                    const paths = [];
+                    for (const file of files) {
+                        await file.mv('./uploads/' + file.name);
+                        paths.push('./uploads/' + file.name);
+                    }
+
+                    const data = await birdnet.predictBatch(paths);
+
+                    let results = {};
+                    files.forEach((file, index) => results[file.name] = data[index]);
+                    console.log(results);
+
+                    //send response
+                    res.send({
+                        Results: results
+                    });
+                }
+            } catch (err) {
+                res.status(500).send(err);
+            }
+        });
+
         // placeholder route handler
         router.get('/', (req, res, next) => {
             res.json({
@@ -41,8 +41,17 @@ class SimpleSpecLayer extends tf.layers.Layer {
 
     call(input, kwargs) {
 
+        // Compute the spectrogram of every example in the batch
+        return tf.tidy(() => tf.stack(
+            tf.unstack(input[0].reshape([-1, input[0].shape[input[0].shape.length - 1]]))
+                .map(signal => this.spectrogram(signal))));
+
+    }
+
+    spectrogram(signal) {
+
         // Perform STFT    
-        var spec = tf.signal.stft(input[0].squeeze(),
+        var spec = tf.signal.stft(signal,
             this.frame_length,
             this.frame_step)
 
@@ -64,9 +73,6 @@ class SimpleSpecLayer extends tf.layers.Layer {
         // Add channel axis        
         spec = tf.expandDims(spec, -1);
 
-        // Add batch axis        
-        spec = tf.expandDims(spec, 0);
-
         return spec;
 
     }
@@ -183,9 +189,56 @@ exports.predict = async function predict(audioFile) {
 
     }
 
-    RESULTS.sort((cName1, cName2) => cName2['Confidence'] - cName1['Confidence'])
+    return uniqueResults(RESULTS);
+
+}
+
+exports.predictBatch = async function predictBatch(audioFiles) {
+
+    // Slice every file into chunks and classify the chunks of all files at once
+    let chunks = [];
+    let chunkFiles = [];
+    var chunkLength = CONFIG.sampleRate * CONFIG.specLength;
+    for (const audioFile of audioFiles) {
+        await loadAudioFile(audioFile);
+        for (var start = 0; start < AUDIO_DATA.length - chunkLength; start += CONFIG.sampleRate) {
+            chunks.push(AUDIO_DATA.slice(start, start + chunkLength));
+            chunkFiles.push(audioFile);
+        }
+    }
+
+    let results = {};
+    audioFiles.forEach(audioFile => results[audioFile] = []);
+    if (chunks.length == 0) {
+        return audioFiles.map(audioFile => results[audioFile]);
+    }
+
+    const batchTensor = tf.tensor2d(chunks.map(chunk => Array.from(chunk)));
+    const prediction = MODEL.predict(batchTensor);
+    const indices = prediction.argMax(1).dataSync();
+    const scores = prediction.dataSync();
+    const labelCount = prediction.shape[1];
+    batchTensor.dispose();
+    prediction.dispose();
+
+    indices.forEach((index, chunk) => {
+        const score = scores[chunk * labelCount + index];
+        console.log(chunkFiles[chunk], index, CONFIG.labels[index], score);
+
+        if (!isEnvironmentNoise(index)) {
+            let birdName = CONFIG.labels[index].split('_')[1];
+            results[chunkFiles[chunk]].push({ 'Common Name': birdName, 'Confidence': score });
+        }
+    });
+
+    return audioFiles.map(audioFile => uniqueResults(results[audioFile]));
+
+}
+
+function uniqueResults(results) {
+    results.sort((cName1, cName2) => cName2['Confidence'] - cName1['Confidence'])
     let unique_results = [];
-    RESULTS.forEach(res => {
+    results.forEach(res => {
         if (!unique_results.some(item => item['Common Name'] === res['Common Name'])) {
             if (typeof res['Common Name'] === 'string' && notInBlacklist(res['Common Name'])) {
                 unique_results.push(res);
@@ -194,7 +247,6 @@ exports.predict = async function predict(audioFile) {
     })
 
     return unique_results;
-
 }
 
 function isEnvironmentNoise(index: any) {
@@ -211,11 +263,28 @@ function notInBlacklist(birdName: string) {
         birdName != "Human".toLowerCase();
 }
 
+// Stations may upload recordings with a lower sample rate, the model needs 48 kHz
+function resample(audioData, fromRate, toRate) {
+    if (fromRate == toRate) {
+        return audioData;
+    }
+    const resampled = new Float32Array(Math.round(audioData.length * toRate / fromRate));
+    const step = fromRate / toRate;
+    for (let i = 0; i < resampled.length; ++i) {
+        const position = i * step;
+        const index = Math.floor(position);
+        const next = Math.min(index + 1, audioData.length - 1);
+        const fraction = position - index;
+        resampled[i] = audioData[index] * (1 - fraction) + audioData[next] * fraction;
+    }
+    return resampled;
+}
+
 async function loadAudioFile(filePath) {
 
     await load(filePath).then((buffer) => {
         console.log(AUDIO_DATA);
-        AUDIO_DATA = buffer.getChannelData(0);
+        AUDIO_DATA = resample(buffer.getChannelData(0), buffer.sampleRate, CONFIG.sampleRate);
     });
 }
 
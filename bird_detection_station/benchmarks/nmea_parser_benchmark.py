@@ -0,0 +1,76 @@
+"""
+Compares the parsed lines per second of the byte level NMEA parser with decoding
+every line and parsing the GGA sentences with pynmea2, like earlier versions did.
+Run it with python -m benchmarks.nmea_parser_benchmark
+"""
+
+import time
+from typing import Callable, List
+
+import pynmea2  # type: ignore
+
+from bird_detection.gps.nmea_parser import parse_fix
+
+# One second of output of a GNSS module
+NMEA_LINES = [
+    b"$GNRMC,123011.00,A,5333.88700,N,01000.39900,E,0.021,,181026,,,A*62\r\n",
+    b"$GNVTG,,T,,M,0.021,N,0.039,K,A*34\r\n",
+    b"$GNGGA,123011.00,5333.88700,N,01000.39900,E,1,12,0.78,35.4,M,45.2,M,,*7C\r\n",
+    b"$GNGSA,A,3,05,13,15,18,20,23,24,,,,,,1.34,0.78,1.09*12\r\n",
+    b"$GPGSV,3,1,11,05,34,296,31,13,38,255,27,15,59,199,36,18,50,060,34*79\r\n",
+    b"$GPGSV,3,2,11,20,11,254,22,23,14,106,30,24,36,169,41,26,08,021,*7E\r\n",
+    b"$GLGSV,2,1,07,65,36,099,29,72,39,041,32,73,11,262,,79,32,328,34*64\r\n",
+    b"$GPGGA,123011.345,5333.887,N,01000.399,E,1,12,1.0,0.0,M,0.0,M,,*6F\r\n",
+    b"$GNGLL,5333.88700,N,01000.39900,E,123011.00,A,A*74\r\n",
+]
+
+
+def parse_with_pynmea2(line: bytes):
+    try:
+        str_line = line.decode("UTF-8")
+        if "GPGGA" in str_line:
+            msg = pynmea2.parse(str_line)
+            if msg.latitude != 0.0 and msg.longitude != 0.0:
+                return msg.latitude, msg.longitude
+    except Exception:
+        return None
+    return None
+
+
+def measure(parse: Callable[[bytes], object], lines: List[bytes]) -> float:
+    """
+    :return: The parsed lines per second
+    """
+    start = time.perf_counter()
+    for line in lines:
+        parse(line)
+    return len(lines) / (time.perf_counter() - start)
+
+
+def run(repetitions: int = 20000) -> dict:
+    """
+    Measures the whole output of a module and the GPGGA sentences alone, which are
+    the only sentences both parsers extract a position from
+    """
+    results = {}
+    workloads = {
+        "mixed": NMEA_LINES * repetitions,
+        "gpgga": [line for line in NMEA_LINES if line.startswith(b"$GPGGA")]
+        * repetitions,
+    }
+    for name, lines in workloads.items():
+        results[name] = {
+            "pynmea2": measure(parse_with_pynmea2, lines),
+            "fast_path": measure(parse_fix, lines),
+        }
+        results[name]["speedup"] = results[name]["fast_path"] / results[name]["pynmea2"]
+    return results
+
+
+if __name__ == "__main__":
+    for name, result in run().items():
+        print(
+            f"{name:<6} pynmea2 {result['pynmea2']:>10,.0f} lines/s, "
+            f"fast path {result['fast_path']:>10,.0f} lines/s, "
+            f"speedup {result['speedup']:.1f}x"
+        )
@@ -0,0 +1,333 @@
+"""
+Drives SoundDevice.record_sound and the recording pipeline of the BirdRecorder with
+synthetic audio and a local stand-in of the classification service. Reports
+the clips per second, the latency from the triggered recording to the persisted
+event, the peak RSS and the memory the allocations of the station take up.
+Run it with python -m benchmarks.pipeline_benchmark, which fails if a result is
+worse than its baseline in benchmarks/baselines.json by more than the tolerance.
+--update-baselines stores the results as the new baselines.
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Dict, List
+
+import numpy as np  # type: ignore
+
+# The tests package replaces the sounddevice module before the station imports it
+import tests  # noqa: F401
+import bird_detection.audio.sound_device_wrapper as sound_device_module
+from benchmarks.classifier_server import StandInClassifier
+from benchmarks.synthetic_audio import SyntheticAudio, SyntheticInputStream
+from bird_detection.audio.device_selection import DeviceSelector
+from bird_detection.audio.sound_device_wrapper import SoundDevice
+from bird_detection.bird_recorder_service import BirdRecorder
+from bird_detection.http.rest_client import RestClient
+from bird_detection.pipeline import StageConfig
+from bird_detection.station_type import BirdRecorderType
+from bird_detection.storage.sqlite_store import SQLitePredictionStore
+from tests.stubs import GPSServiceStub, MQTTStub, WeatherServiceStub
+
+BASELINES_FILE = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+# The stages of the shipped config.yml. The stages block instead of dropping clips,
+# so the capture is slowed down to the pace of the pipeline and the clips per second
+# are the throughput of the pipeline.
+STAGE_CONFIGS = {
+    "encode": StageConfig(workers=1, queue_size=4),
+    "classify": StageConfig(workers=2, queue_size=8),
+    "enrich": StageConfig(workers=1, queue_size=8),
+    "persist": StageConfig(workers=1, queue_size=16),
+}
+
+# Metrics which regress if they shrink, all others regress if they grow
+HIGHER_IS_BETTER = {"clips_per_second"}
+
+# Differences which are noise, even if they exceed the tolerance
+MIN_DIFFERENCES = {
+    "latency_p50_ms": 5,
+    "latency_p95_ms": 10,
+    "latency_p99_ms": 20,
+    "peak_rss_mb": 5,
+    "traced_peak_mb": 2,
+    "retained_blocks_per_clip": 20,
+}
+
+
+class Scenario:
+    def __init__(
+        self,
+        name: str,
+        background: str = "silence",
+        burst_interval: float = 4.0,
+        classifier_latency: float = 0.02,
+        paced_clips_per_second: float = 4.0,
+        record_sound: bool = False,
+    ):
+        """
+        :param paced_clips_per_second: The rate of the bursts while the latency is
+        measured, which should be below the throughput, so the clips do not queue up
+        :param record_sound: Measures SoundDevice.record_sound instead of the pipeline
+        """
+        self.name = name
+        self.background = background
+        self.burst_interval = burst_interval
+        self.classifier_latency = classifier_latency
+        self.paced_clips_per_second = paced_clips_per_second
+        self.record_sound = record_sound
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario("record_sound", record_sound=True),
+        Scenario("chirps_in_silence"),
+        Scenario("chirps_in_noise", background="noise", burst_interval=3.7),
+        Scenario("slow_classifier", background="noise", classifier_latency=0.2),
+    ]
+}
+
+
+class SyntheticStation:
+    """
+    A sound device which records the synthetic audio of a scenario and remembers
+    when the recording of every clip was complete
+    """
+
+    def __init__(self, scenario: Scenario):
+        self.audio = SyntheticAudio(scenario.background, scenario.burst_interval)
+        sound_device_module.sd.InputStream = lambda **kwargs: SyntheticInputStream(
+            self.audio, **kwargs
+        )
+        device_selector = DeviceSelector()
+        device_selector._set_device("Test audio device")
+        self.sound_device = SoundDevice(device_selector)
+        self.recorded_times: Dict[str, float] = {}
+        # When the requested clips were complete, clips which were still queued
+        # are processed while the pipeline stops
+        self.completed_time = 0.0
+
+        capture_sound = self.sound_device.capture_sound
+
+        def capture_and_stamp(record_seconds: int = 3):
+            segment = capture_sound(record_seconds)
+            if segment is not None:
+                self.recorded_times[str(segment.time)] = time.monotonic()
+            return segment
+
+        self.sound_device.capture_sound = capture_and_stamp  # type: ignore
+
+    def latency(self, file_name: str) -> float:
+        """
+        The recording time after the trigger is fixed by the recording_time,
+        so the latency starts when the recording is complete
+        :return: The seconds since the recording of the clip was complete
+        """
+        return time.monotonic() - self.recorded_times.pop(
+            os.path.splitext(file_name)[0]
+        )
+
+
+def record_sounds(
+    station: SyntheticStation, directory: str, clips: int, **kwargs
+) -> List[float]:
+    latencies = []
+    for _ in range(clips):
+        file_name = station.sound_device.record_sound(3, sound_directory=directory)
+        latencies.append(station.latency(file_name))  # type: ignore
+    station.completed_time = time.perf_counter()
+    return latencies
+
+
+def run_pipeline(
+    station: SyntheticStation, directory: str, clips: int, classifier_url: str = ""
+) -> List[float]:
+    """
+    Runs the pipeline of an online station until clips bird events were persisted
+    :return: The latencies of all persisted clips, including those which were
+    persisted while the pipeline stopped
+    """
+    prediction_store = SQLitePredictionStore(
+        os.path.join(directory, f"predictions-{time.monotonic_ns()}.db")
+    )
+    bird_recorder = BirdRecorder(
+        BirdRecorderType.ONLINE,
+        station.sound_device,
+        "localhost:8000",
+        MQTTStub("localhost", 1883),
+        RestClient(classifier_url),
+        GPSServiceStub(),
+        WeatherServiceStub(),
+        prediction_store=prediction_store,
+        stage_configs=STAGE_CONFIGS,
+    )
+    bird_recorder.sound_directory = directory
+
+    latencies: List[float] = []
+    persisted = threading.Event()
+    persist_clip = bird_recorder._persist_clip
+
+    def persist_and_measure(clip):
+        persist_clip(clip)
+        latencies.append(station.latency(clip.file_name))
+        if len(latencies) == clips:
+            station.completed_time = time.perf_counter()
+            persisted.set()
+
+    bird_recorder._persist_clip = persist_and_measure  # type: ignore
+    bird_recorder.start_recording()
+    persisted.wait(timeout=120)
+    bird_recorder.stop_recording()
+    prediction_store.close()
+    return latencies
+
+
+def run_scenario(scenario: Scenario, clips: int) -> Dict[str, float]:
+    """
+    Measures the throughput with audio which is played as fast as the station
+    takes it, the latency with paced audio, so the clips do not queue up,
+    and the memory in a third run, as tracing the allocations slows the station down
+    """
+    classifier = StandInClassifier(scenario.classifier_latency)
+    run = record_sounds if scenario.record_sound else run_pipeline
+    station = SyntheticStation(scenario)
+    with tempfile.TemporaryDirectory() as directory:
+        # Warms up the imports, the connection and the caches of the first clips
+        run(station, directory, 3, classifier_url=classifier.url)
+
+        start = time.perf_counter()
+        run(station, directory, clips, classifier_url=classifier.url)
+        elapsed = station.completed_time - start
+
+        station.audio.speed = scenario.burst_interval * scenario.paced_clips_per_second
+        latencies = run(station, directory, clips, classifier_url=classifier.url)
+        station.audio.speed = 0
+
+        gc.collect()
+        tracemalloc.start()
+        blocks_before = len(tracemalloc.take_snapshot().traces)
+        traced_clips = len(
+            run(station, directory, max(clips // 4, 1), classifier_url=classifier.url)
+        )
+        gc.collect()
+        blocks_after = len(tracemalloc.take_snapshot().traces)
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    classifier.close()
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "clips_per_second": round(clips / elapsed, 2),
+        "latency_p50_ms": round(float(np.percentile(latencies_ms, 50)), 1),
+        "latency_p95_ms": round(float(np.percentile(latencies_ms, 95)), 1),
+        "latency_p99_ms": round(float(np.percentile(latencies_ms, 99)), 1),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+        "traced_peak_mb": round(traced_peak / 1024 / 1024, 1),
+        "retained_blocks_per_clip": round(
+            (blocks_after - blocks_before) / traced_clips, 1
+        ),
+    }
+
+
+def run_in_subprocess(name: str, clips: int) -> Dict[str, float]:
+    """
+    Every scenario runs in its own process, so its peak RSS is not the peak
+    of a previous scenario
+    """
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.pipeline_benchmark"]
+        + ["--in-process", "--scenario", name, "--clips", str(clips)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, float]],
+    baselines: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """
+    :param tolerance: The share a metric may be worse than its baseline, e.g. 0.3
+    :return: A description of every metric which is worse than its baseline
+    """
+    regressions = []
+    for name, baseline in baselines.items():
+        if name not in results:
+            continue
+        for metric, expected in baseline.items():
+            value = results[name][metric]
+            if metric in HIGHER_IS_BETTER:
+                is_worse = value < expected * (1 - tolerance)
+            else:
+                is_worse = value > expected * (
+                    1 + tolerance
+                ) and value - expected > MIN_DIFFERENCES.get(metric, 0)
+            if is_worse:
+                regressions.append(f"{name} {metric}: {value} (baseline {expected})")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append")
+    parser.add_argument("--clips", type=int, default=40)
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--in-process", action="store_true", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    names = arguments.scenario or list(SCENARIOS)
+    if arguments.in_process:
+        print(json.dumps(run_scenario(SCENARIOS[names[0]], arguments.clips)))
+        return 0
+
+    results = {name: run_in_subprocess(name, arguments.clips) for name in names}
+    for name, result in results.items():
+        print(
+            f"{name:<18} {result['clips_per_second']:>6.1f} clips/s, "
+            f"latency p50 {result['latency_p50_ms']:>6.1f} ms "
+            f"p95 {result['latency_p95_ms']:>6.1f} ms "
+            f"p99 {result['latency_p99_ms']:>6.1f} ms, "
+            f"peak RSS {result['peak_rss_mb']:>5.1f} MB, "
+            f"traced peak {result['traced_peak_mb']:>5.1f} MB, "
+            f"{result['retained_blocks_per_clip']:>5.1f} retained blocks per clip"
+        )
+
+    if arguments.update_baselines:
+        baselines = {}
+        if os.path.isfile(BASELINES_FILE):
+            with open(BASELINES_FILE) as baselines_file:
+                baselines = json.load(baselines_file)
+        baselines.update(results)
+        with open(BASELINES_FILE, "w") as baselines_file:
+            json.dump(baselines, baselines_file, indent=2, sort_keys=True)
+            baselines_file.write("\n")
+        return 0
+
+    with open(BASELINES_FILE) as baselines_file:
+        regressions = find_regressions(
+            results, json.load(baselines_file), arguments.tolerance
+        )
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Compares the windows per second of the batched spectrogram frontend with computing
+the spectrogram of every window on its own, like the SimpleSpecLayer does.
+Run it with python -m benchmarks.spectrogram_benchmark
+"""
+
+import time
+from typing import Callable
+
+import numpy as np  # type: ignore
+
+from bird_detection.classification.spectrogram import (
+    FRAME_LENGTH,
+    FRAME_STEP,
+    SpectrogramFrontend,
+    hann_window,
+    window_starts,
+)
+
+WINDOW_LENGTH = 144000
+HOP = 48000
+
+
+def spectrogram_per_window(samples: np.ndarray) -> np.ndarray:
+    window = hann_window(FRAME_LENGTH)
+    exponent = 1 / (1 + np.exp(1.0))
+    features = []
+    for start in window_starts(len(samples), WINDOW_LENGTH, HOP):
+        signal = samples[start : start + WINDOW_LENGTH]
+        frames = np.lib.stride_tricks.as_strided(
+            signal,
+            shape=((WINDOW_LENGTH - FRAME_LENGTH) // FRAME_STEP + 1, FRAME_LENGTH),
+            strides=(signal.strides[0] * FRAME_STEP, signal.strides[0]),
+        )
+        spec = np.fft.rfft(frames * window, axis=1).real.astype(np.float32)
+        spec = np.power(np.power(spec, 2), exponent)
+        spec = (spec - spec.min()) / spec.max()
+        features.append(spec.T)
+    return np.stack(features)
+
+
+def measure(compute: Callable[[np.ndarray], np.ndarray], samples: np.ndarray) -> float:
+    """
+    :return: The windows per second
+    """
+    windows = len(window_starts(len(samples), WINDOW_LENGTH, HOP))
+    start = time.perf_counter()
+    compute(samples)
+    return windows / (time.perf_counter() - start)
+
+
+def run(clip_seconds: int = 15, repetitions: int = 5) -> dict:
+    """
+    Takes the best of some repetitions, so the first allocations do not count
+    """
+    rng = np.random.default_rng(0)
+    samples = (0.1 * rng.standard_normal(48000 * clip_seconds)).astype(np.float32)
+    frontend = SpectrogramFrontend()
+    result = {
+        "per_window": max(
+            measure(spectrogram_per_window, samples) for _ in range(repetitions)
+        ),
+        "batched": max(measure(frontend.compute, samples) for _ in range(repetitions)),
+    }
+    result["speedup"] = result["batched"] / result["per_window"]
+    return result
+
+
+if __name__ == "__main__":
+    result = run()
+    print(
+        f"per window {result['per_window']:>8,.1f} windows/s, "
+        f"batched {result['batched']:>8,.1f} windows/s, "
+        f"speedup {result['speedup']:.1f}x"
+    )
@@ -0,0 +1,110 @@
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np  # type: ignore
+
+
+class SyntheticAudio:
+    """
+    An endless recording of silence or quiet noise with a chirp burst, a sweep from
+    2 to 6 kHz, every burst_interval seconds. The noise stays below the default
+    silence threshold, so only the bursts trigger a recording. Streams play it
+    speed times faster than real time, 0 plays it as fast as it is consumed.
+    """
+
+    def __init__(
+        self,
+        background: str = "silence",
+        burst_interval: float = 4.0,
+        burst_seconds: float = 0.5,
+        noise_level: float = 0.005,
+        sample_rate: int = 48000,
+        block_size: int = 1024,
+        seed: int = 0,
+    ):
+        self.background = background
+        self.sample_rate = sample_rate
+        self.speed = 0.0
+        self.burst_length = int(burst_seconds * sample_rate)
+        self.burst_interval = int(burst_interval * sample_rate)
+        self.noise_level = noise_level
+        self.block_size = block_size
+        self.rng = np.random.default_rng(seed)
+        self.position = 0
+
+        time = np.arange(self.burst_length) / sample_rate
+        frequency = 2000 + 4000 * time / burst_seconds
+        phase = 2 * np.pi * np.cumsum(frequency) / sample_rate
+        self.burst = (0.3 * np.hanning(self.burst_length) * np.sin(phase)).astype(
+            np.float32
+        )
+
+    def next_block(self) -> np.ndarray:
+        """
+        :return: The next block with the shape [block_size, 1]
+        """
+        if self.background == "noise":
+            block = self.noise_level * self.rng.standard_normal(self.block_size)
+            block = block.astype(np.float32)
+        else:
+            block = np.zeros(self.block_size, dtype=np.float32)
+
+        # The bursts in this block, one may have started in the previous block
+        first_burst = self.position // self.burst_interval * self.burst_interval
+        for burst_start in range(
+            first_burst, self.position + self.block_size, self.burst_interval
+        ):
+            start = max(burst_start, self.position)
+            end = min(burst_start + self.burst_length, self.position + self.block_size)
+            if start < end:
+                block[start - self.position : end - self.position] += self.burst[
+                    start - burst_start : end - burst_start
+                ]
+        self.position += self.block_size
+        return block.reshape(-1, 1)
+
+
+class SyntheticInputStream:
+    """
+    Replaces sounddevice.InputStream. While the stream is open, a thread passes
+    the blocks of the synthetic audio to the callback at the speed of the audio.
+    """
+
+    def __init__(self, audio: SyntheticAudio, callback: Callable, **kwargs):
+        self.audio = audio
+        self.callback = callback
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._stream, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _stream(self):
+        start_time = time.monotonic()
+        start_position = self.audio.position
+        while self.running:
+            if self.audio.speed:
+                audio_time = (self.audio.position - start_position) / (
+                    self.audio.sample_rate * self.audio.speed
+                )
+                time.sleep(max(audio_time - (time.monotonic() - start_time), 0))
+            block = self.audio.next_block()
+            self.callback(block, len(block), None, None)
@@ -1,4 +1,8 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, Optional
+
+import numpy as np  # type: ignore
 
 
 class AudioStreamFormat:
@@ -21,6 +25,31 @@ class AudioStreamFormat:
         self.device_name = device_name
 
 
+class Segment:
+    def __init__(
+        self,
+        time: datetime,
+        data: np.ndarray,
+        sample_rate: int = 48000,
+        release: Optional[Callable[[], None]] = None,
+    ):
+        """
+        :param release: Returns the buffer of the data to the capture which recorded it
+        """
+        self.time = time
+        self.data = data
+        self.sample_rate = sample_rate
+        self._release = release
+
+    def release(self):
+        """
+        Lets the capture reuse the buffer of the data, which must not be used afterwards
+        """
+        if self._release:
+            self._release()
+            self._release = None
+
+
 class AudioRecorderService(ABC):
     @abstractmethod
     def record_audio(self, record_seconds: int, wave_output_filename: str):
@@ -59,7 +88,7 @@ class AudioRecorderService(ABC):
         record_seconds: int = 3,
         blocking: bool = True,
         sound_directory: str = "data",
-    ) -> str:
+    ) -> Optional[str]:
         """
         This method listens to the surrounding and records any occurring sound
 
@@ -67,4 +96,52 @@ class AudioRecorderService(ABC):
         how many seconds will be recorded after the occurrence
         :param blocking: Determines if the recording should be blocking
         :param sound_directory: the directory in which the sound files are saved
+        :return: The file name of the recording or None if the continuous capture
+        was stopped before a sound occurred
+        """
+
+    @abstractmethod
+    def capture_sound(self, record_seconds: int = 3) -> Optional[Segment]:
+        """
+        Listens to the surrounding and captures the next occurring sound
+        without saving it
+
+        :param record_seconds: If a sound occurs, the duration specifies
+        how many seconds will be recorded after the occurrence
+        :return: The captured sound or None if the continuous capture
+        was stopped before a sound occurred
+        """
+
+    @abstractmethod
+    def save_audio(self, file_name: str, recording, sound_directory: str = "data"):
+        """
+        Saves a recording as audio file
+
+        :param file_name: The name of the audio file
+        :param recording: The recorded data
+        :param sound_directory: the directory in which the sound files are saved
+        """
+
+    def start_continuous_capture(self, record_seconds: int = 3, held_sounds: int = 0):
+        """
+        Opens a long-lived audio stream which keeps capturing sounds in the background.
+        Subsequent calls of record_sound return the captured sounds
+        without opening a new stream.
+
+        :param record_seconds: The duration of a captured sound
+        :param held_sounds: The number of captured sounds which the caller may hold
+        at once before it releases them
+        """
+        pass
+
+    def stop_continuous_capture(self):
+        """
+        Closes the long-lived audio stream
+        """
+        pass
+
+    def get_statistics(self) -> dict:
+        """
+        :return: Counters which describe the state of the audio capture
         """
+        return {}
@@ -0,0 +1,98 @@
+import numpy as np  # type: ignore
+
+
+class RingBuffer:
+    """
+    A fixed-size float32 ring buffer which keeps the most recent audio frames.
+    The storage is allocated once, writing a block only copies into the
+    existing array.
+    """
+
+    def __init__(self, capacity: int, channels: int = 1):
+        self.capacity = max(int(capacity), 0)
+        self.channels = channels
+        self.buffer = np.zeros((self.capacity, channels), dtype=np.float32)
+        self.position = 0
+        self.size = 0
+
+    def write(self, data: np.ndarray):
+        """
+        Copies a block of frames into the ring buffer, overwriting the oldest frames
+        :param data: A block of frames with the shape (frames, channels)
+        """
+        if self.capacity == 0:
+            return
+
+        frames = len(data)
+        if frames >= self.capacity:
+            self.buffer[:] = data[frames - self.capacity :]
+            self.position = 0
+            self.size = self.capacity
+            return
+
+        end = self.position + frames
+        if end <= self.capacity:
+            self.buffer[self.position : end] = data
+        else:
+            first_part = self.capacity - self.position
+            self.buffer[self.position :] = data[:first_part]
+            self.buffer[: frames - first_part] = data[first_part:]
+        self.position = end % self.capacity
+        self.size = min(self.size + frames, self.capacity)
+
+    def read_into(self, out: np.ndarray) -> int:
+        """
+        Copies the buffered frames, oldest first, to the beginning of out
+        :param out: The destination array, it needs room for at least size frames
+        :return: The number of copied frames
+        """
+        start = (self.position - self.size) % self.capacity if self.capacity else 0
+        end = start + self.size
+        if end <= self.capacity:
+            out[: self.size] = self.buffer[start:end]
+        else:
+            first_part = self.capacity - start
+            out[:first_part] = self.buffer[start:]
+            out[first_part : self.size] = self.buffer[: self.size - first_part]
+        return self.size
+
+    def clear(self):
+        self.position = 0
+        self.size = 0
+
+
+class ClipBuffer:
+    """
+    A preallocated linear float32 buffer which is filled block by block
+    until it holds a complete clip.
+    """
+
+    def __init__(self, capacity: int, channels: int = 1):
+        self.capacity = int(capacity)
+        self.channels = channels
+        self.buffer = np.empty((self.capacity, channels), dtype=np.float32)
+        self.filled = 0
+
+    def is_full(self) -> bool:
+        return self.filled >= self.capacity
+
+    def write(self, data: np.ndarray) -> bool:
+        """
+        Copies a block of frames into the free part of the buffer.
+        Frames which do not fit anymore are discarded.
+        :param data: A block of frames with the shape (frames, channels)
+        :return: True if the buffer is full
+        """
+        frames = min(len(data), self.capacity - self.filled)
+        self.buffer[self.filled : self.filled + frames] = data[:frames]
+        self.filled += frames
+        return self.is_full()
+
+    def view(self) -> np.ndarray:
+        """
+        :return: A view of the recorded frames without copying them.
+        Mono recordings are returned as one dimensional array
+        """
+        if self.channels == 1:
+            return self.buffer[: self.filled, 0]
+        return self.buffer[: self.filled]
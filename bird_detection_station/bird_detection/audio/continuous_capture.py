@@ -0,0 +1,193 @@
+import logging
+import queue
+from datetime import datetime
+from functools import partial
+from typing import Callable, List, Optional
+
+import numpy as np  # type: ignore
+import sounddevice as sd  # type: ignore
+
+from bird_detection.audio.audio_services import Segment
+from bird_detection.audio.buffers import ClipBuffer, RingBuffer
+
+
+class ContinuousCapture:
+    """
+    Keeps a single input stream open and cuts every detected sound into a segment.
+    Segments are handed to consumers through a bounded queue, so the capture
+    never waits for downstream work. If the queue is full the segment is dropped
+    and counted instead. The clips are recorded into a pool of buffers which is
+    allocated up front, so the audio callback never allocates a clip. Consumers
+    release a segment once they are done with its data, which returns the buffer
+    to the pool. A sound which occurs while every buffer is in use is dropped.
+    The audio before a sound is prepended to its clip, unless it belongs to the
+    previous clip, so clips which follow each other have no pre-trigger.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        channels: int,
+        device_name: str,
+        is_silent: Callable[[np.ndarray], bool],
+        record_seconds: float = 3,
+        pre_trigger_seconds: float = 0.5,
+        queue_size: int = 8,
+    ):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.device_name = device_name
+        self.is_silent = is_silent
+        self.segments: queue.Queue = queue.Queue(maxsize=queue_size)
+
+        self.stream: Optional[sd.InputStream] = None
+        self.pre_trigger = RingBuffer(int(pre_trigger_seconds * sample_rate), channels)
+        # The number of released segments which the consumers may hold at once
+        self.held_segments = 0
+        self.free_buffers: List[ClipBuffer] = []
+        self._record_seconds = 0.0
+        self.record_seconds = record_seconds
+        self.clip: Optional[ClipBuffer] = None
+        self.clip_pool: List[ClipBuffer] = self.free_buffers
+        self.clip_time: Optional[datetime] = None
+        self.clip_blocks = 0
+        self.skipped_frames = 0
+
+        self.captured_segments = 0
+        self.dropped_segments = 0
+        self.dropped_blocks = 0
+        self.input_overflows = 0
+
+    @property
+    def record_seconds(self) -> float:
+        return self._record_seconds
+
+    @record_seconds.setter
+    def record_seconds(self, record_seconds: float):
+        """
+        Allocates a new pool of buffers if the duration of the clips changes.
+        Buffers of the previous pool which are still in use are not reused.
+        """
+        if record_seconds == self._record_seconds:
+            return
+        self._record_seconds = record_seconds
+        self._allocate_buffers()
+
+    @property
+    def pool_size(self) -> int:
+        """
+        Every queued segment, every segment held by the consumers and the clip
+        which is being recorded need a buffer
+        """
+        return self.segments.maxsize + self.held_segments + 1
+
+    def start(self, held_segments: Optional[int] = None):
+        """
+        :param held_segments: The number of segments which the consumers may hold
+        at once before they release them
+        """
+        if self.is_running():
+            return
+        if held_segments is not None:
+            self.held_segments = held_segments
+        # Buffers which were not released since the last start are not waited for
+        self._allocate_buffers()
+        self.stream = sd.InputStream(
+            samplerate=self.sample_rate,
+            device=self.device_name,
+            channels=self.channels,
+            callback=self._callback,
+        )
+        self.stream.start()
+        logging.info("Continuous audio capture started")
+
+    def stop(self):
+        if not self.is_running():
+            return
+        stream = self.stream
+        self.stream = None
+        stream.stop()
+        stream.close()
+        logging.info("Continuous audio capture stopped")
+
+    def is_running(self) -> bool:
+        return self.stream is not None
+
+    def _allocate_buffers(self):
+        capacity = (
+            int(self.record_seconds * self.sample_rate) + self.pre_trigger.capacity
+        )
+        self.free_buffers = [
+            ClipBuffer(capacity, self.channels) for _ in range(self.pool_size)
+        ]
+
+    def next_segment(self, timeout: Optional[float] = None) -> Optional[Segment]:
+        """
+        Waits for the next captured segment
+        :param timeout: The maximum time in seconds to wait
+        :return: The next segment or None if no segment was captured in time
+        """
+        try:
+            return self.segments.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_statistics(self) -> dict:
+        return {
+            "captured_segments": self.captured_segments,
+            "queued_segments": self.segments.qsize(),
+            "free_buffers": len(self.free_buffers),
+            "dropped_segments": self.dropped_segments,
+            "dropped_blocks": self.dropped_blocks,
+            "input_overflows": self.input_overflows,
+        }
+
+    # indata: ndarray, frames: int, time: CData, status: CallbackFlags
+    def _callback(self, indata, frames, time, status):
+        if status:
+            self.input_overflows += 1
+
+        if self.skipped_frames > 0:
+            self.skipped_frames -= frames
+            self.dropped_blocks += 1
+            return
+
+        if self.clip is None:
+            if self.is_silent(indata):
+                self.pre_trigger.write(indata)
+                return
+            free_buffers = self.free_buffers
+            try:
+                clip = free_buffers.pop()
+            except IndexError:
+                # Skips the sound which would have been recorded
+                self.dropped_segments += 1
+                self.dropped_blocks += 1
+                self.skipped_frames = int(self.record_seconds * self.sample_rate)
+                self.skipped_frames -= frames
+                self.pre_trigger.clear()
+                return
+            clip.filled = self.pre_trigger.read_into(clip.buffer)
+            self.pre_trigger.clear()
+            self.clip = clip
+            self.clip_pool = free_buffers
+            self.clip_time = datetime.now()
+            self.clip_blocks = 0
+
+        self.clip_blocks += 1
+        if self.clip.write(indata):
+            try:
+                self.segments.put_nowait(
+                    Segment(
+                        self.clip_time,
+                        self.clip.view(),
+                        self.sample_rate,
+                        release=partial(self.clip_pool.append, self.clip),
+                    )
+                )
+                self.captured_segments += 1
+            except queue.Full:
+                self.dropped_segments += 1
+                self.dropped_blocks += self.clip_blocks
+                self.clip_pool.append(self.clip)
+            self.clip = None
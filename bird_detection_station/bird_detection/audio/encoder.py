@@ -0,0 +1,127 @@
+import io
+import logging
+import os
+from enum import Enum
+from math import gcd
+from typing import Optional, Tuple
+
+import numpy as np  # type: ignore
+from scipy.io.wavfile import read, write  # type: ignore
+from scipy.signal import resample_poly  # type: ignore
+
+try:
+    import soundfile  # type: ignore
+except ImportError:
+    soundfile = None
+
+WAV_CONTENT_TYPE = "audio/x-wav"
+FLAC_CONTENT_TYPE = "audio/flac"
+
+CONTENT_TYPES = {".wav": WAV_CONTENT_TYPE, ".flac": FLAC_CONTENT_TYPE}
+
+
+class ClipEncoding(Enum):
+    FLOAT32 = "float32"
+    PCM16 = "pcm16"
+    FLAC = "flac"
+
+
+def encode_wav(recording: np.ndarray, sample_rate: int) -> memoryview:
+    """
+    Encodes a recording as WAV file in memory
+    :param recording: The recorded frames
+    :param sample_rate: The sample rate of the recording
+    :return: A view of the encoded WAV file
+    """
+    wav_buffer = io.BytesIO()
+    write(wav_buffer, sample_rate, recording)
+    return wav_buffer.getbuffer()
+
+
+def decode(data) -> Tuple[np.ndarray, int]:
+    """
+    Decodes a WAV or FLAC file in memory
+    :return: The frames and the sample rate of the recording
+    """
+    if bytes(data[:4]) == b"fLaC":
+        if soundfile is None:
+            raise ValueError("Decoding FLAC requires the soundfile package")
+        recording, sample_rate = soundfile.read(io.BytesIO(data), dtype="int16")
+        return recording, sample_rate
+    sample_rate, recording = read(io.BytesIO(data))
+    return recording, sample_rate
+
+
+def transcode_to_wav(data) -> memoryview:
+    """
+    Converts an encoded recording to a WAV file, which every classifier accepts
+    """
+    recording, sample_rate = decode(data)
+    return encode_wav(recording, sample_rate)
+
+
+def content_type_of(file_name: str) -> str:
+    """
+    :return: The content type of a recording based on its file extension
+    """
+    return CONTENT_TYPES.get(
+        os.path.splitext(file_name)[1].lower(), "application/octet-stream"
+    )
+
+
+class ClipEncoder:
+    """
+    Encodes recordings before they are uploaded or saved.
+    16 bit PCM halves the size of the float32 recordings without audible loss,
+    FLAC compresses the 16 bit samples losslessly again. Recordings can also be
+    resampled to the sample rate the classifier needs, the polyphase filter of the
+    resampling removes the frequencies above the new Nyquist frequency.
+    """
+
+    def __init__(
+        self,
+        encoding: ClipEncoding = ClipEncoding.PCM16,
+        sample_rate: Optional[int] = None,
+    ):
+        if encoding == ClipEncoding.FLAC and soundfile is None:
+            logging.warning("FLAC requires the soundfile package, using 16 bit WAV")
+            encoding = ClipEncoding.PCM16
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+
+    @property
+    def extension(self) -> str:
+        return ".flac" if self.encoding == ClipEncoding.FLAC else ".wav"
+
+    @property
+    def content_type(self) -> str:
+        return CONTENT_TYPES[self.extension]
+
+    def encode(self, recording: np.ndarray, sample_rate: int) -> memoryview:
+        """
+        :param recording: The float32 frames of the recording
+        :param sample_rate: The sample rate of the recording
+        :return: A view of the encoded file
+        """
+        recording, sample_rate = self.resample(recording, sample_rate)
+        if self.encoding == ClipEncoding.FLOAT32:
+            return encode_wav(recording, sample_rate)
+
+        samples = (np.clip(recording, -1.0, 1.0) * 32767).astype(np.int16)
+        if self.encoding == ClipEncoding.PCM16:
+            return encode_wav(samples, sample_rate)
+
+        flac_buffer = io.BytesIO()
+        soundfile.write(flac_buffer, samples, sample_rate, format="FLAC")
+        return flac_buffer.getbuffer()
+
+    def resample(
+        self, recording: np.ndarray, sample_rate: int
+    ) -> Tuple[np.ndarray, int]:
+        if not self.sample_rate or self.sample_rate == sample_rate:
+            return recording, sample_rate
+        divisor = gcd(self.sample_rate, sample_rate)
+        resampled = resample_poly(
+            recording, self.sample_rate // divisor, sample_rate // divisor, axis=0
+        )
+        return resampled.astype(np.float32), self.sample_rate
@@ -1,12 +1,20 @@
 import os
 from datetime import datetime
+from typing import Optional
 from scipy.io.wavfile import write  # type: ignore
 import logging
 import numpy as np  # type: ignore
 import sounddevice as sd  # type: ignore
 
-from bird_detection.audio.audio_services import AudioRecorderService, AudioStreamFormat
+from bird_detection.audio.audio_services import (
+    AudioRecorderService,
+    AudioStreamFormat,
+    Segment,
+)
+from bird_detection.audio.buffers import ClipBuffer, RingBuffer
+from bird_detection.audio.continuous_capture import ContinuousCapture
 from bird_detection.audio.device_selection import DeviceSelector
+from bird_detection.audio.trigger_detector import BandEnergyDetector
 
 
 class SoundDevice(AudioRecorderService):
@@ -14,14 +22,29 @@ class SoundDevice(AudioRecorderService):
         self,
         sound_device_selector: DeviceSelector,
         threshold: float = 0.02,
+        pre_trigger_seconds: float = 0.5,
+        capture_queue_size: int = 8,
+        trigger_detector: Optional[BandEnergyDetector] = None,
     ):
 
         self.threshold = threshold
+        self.trigger_detector = trigger_detector
+        self.pre_trigger_seconds = pre_trigger_seconds
         self.default_device = sound_device_selector.selected_device
         self.sample_rate = 48000
         self.channels = 1
 
         self.stream_data = None
+        self.continuous_capture = ContinuousCapture(
+            self.sample_rate,
+            self.channels,
+            self.default_device["name"],
+            self.is_silent,
+            pre_trigger_seconds=pre_trigger_seconds,
+            queue_size=capture_queue_size,
+        )
+        self.reported_dropped_segments = 0
+        self.continuous_mode = False
         sd.default.device = self.default_device["name"]
         sd.default.samplerate = 48000
         sd.default.channels = self.channels
@@ -32,6 +55,7 @@ class SoundDevice(AudioRecorderService):
     def __del__(self):
         if self.stream_data:
             self.close_audio_stream()
+        self.stop_continuous_capture()
 
     def record_audio(self, record_seconds: int, wave_output_filename: str):
         print("Recording ....")
@@ -55,14 +79,17 @@ class SoundDevice(AudioRecorderService):
     def is_silent(self, data) -> bool:
         """
         Calculates the root mean square to indicate if a sound/noise was recorded.
-        If the rms is greater than the threshold a sound occurred
+        If the rms is greater than the threshold a sound occurred.
+        If a trigger detector is configured the detector decides instead
         :param threshold:
         :return: true if the surrounding is silent and no sound was recorded
         """
+        if self.trigger_detector:
+            return self.trigger_detector.is_silent(data)
         return np.sqrt(np.mean(data ** 2)) < self.threshold
 
     # TODO add recording type
-    def _save_audio(self, file_name: str, recording, sound_directory: str = "data"):
+    def save_audio(self, file_name: str, recording, sound_directory: str = "data"):
         """
         Saves an audio file with the given file and sample rate into the data folder.
         If the data folder does not exist the folder will be created
@@ -84,24 +111,51 @@ class SoundDevice(AudioRecorderService):
         record_seconds: int = 3,
         blocking: bool = True,
         sound_directory: str = "data",
-    ) -> str:
+    ) -> Optional[str]:
+        segment = self.capture_sound(record_seconds)
+        if segment is None:
+            return None
+
+        file_name = str(segment.time) + ".wav"
+        try:
+            self.save_audio(file_name, segment.data, sound_directory)
+        finally:
+            segment.release()
+
+        return file_name
+
+    def capture_sound(self, record_seconds: int = 3) -> Optional[Segment]:
+        # Once the continuous capture was started, a stopped capture ends the recording
+        # instead of falling back to a stream of its own
+        if self.continuous_mode:
+            return self._next_continuous_segment(record_seconds)
+
         import threading
 
-        my_recording = None
         event = threading.Event()
+        pre_trigger = RingBuffer(
+            int(self.pre_trigger_seconds * self.sample_rate), self.channels
+        )
+        clip = ClipBuffer(
+            int(record_seconds * self.sample_rate) + pre_trigger.capacity,
+            self.channels,
+        )
+        trigger_time = None
 
         # indata: ndarray, frames: int, time: CData, status: CallbackFlags
         def callback(indata, frames, time, status):
-            nonlocal my_recording
-            if (my_recording is not None) or (not self.is_silent(indata)):
-                if my_recording is None:
-                    logging.info(f"Recording for {record_seconds} seconds")
-                    recording = True
-                    my_recording = indata.copy()
-                else:
-                    my_recording = np.append(my_recording, indata.copy())
-                if len(my_recording) >= (self.sample_rate * record_seconds):
-                    event.set()
+            nonlocal trigger_time
+            if event.is_set():
+                return
+            if clip.filled == 0:
+                if self.is_silent(indata):
+                    pre_trigger.write(indata)
+                    return
+                logging.info(f"Recording for {record_seconds} seconds")
+                trigger_time = datetime.now()
+                clip.filled = pre_trigger.read_into(clip.buffer)
+            if clip.write(indata):
+                event.set()
 
         with sd.InputStream(
             samplerate=self.sample_rate,
@@ -111,11 +165,43 @@ class SoundDevice(AudioRecorderService):
         ):
             event.wait()
 
-        file_name = str(datetime.now()) + ".wav"
+        return Segment(trigger_time or datetime.now(), clip.view(), self.sample_rate)
 
-        self._save_audio(file_name, my_recording, sound_directory)
+    def start_continuous_capture(self, record_seconds: int = 3, held_sounds: int = 0):
+        self.continuous_mode = True
+        self.continuous_capture.record_seconds = record_seconds
+        self.continuous_capture.start(held_sounds)
 
-        return file_name
+    def stop_continuous_capture(self):
+        self.continuous_capture.stop()
+
+    def get_statistics(self) -> dict:
+        statistics = self.continuous_capture.get_statistics()
+        if self.trigger_detector:
+            statistics["trigger"] = self.trigger_detector.get_statistics()
+        return statistics
+
+    def _next_continuous_segment(self, record_seconds: int) -> Optional[Segment]:
+        """
+        Waits for the next sound captured by the long-lived stream
+        """
+        self.continuous_capture.record_seconds = record_seconds
+        segment = None
+        while segment is None:
+            if not self.continuous_capture.is_running():
+                return None
+            segment = self.continuous_capture.next_segment(timeout=1)
+
+        dropped_segments = self.continuous_capture.dropped_segments
+        if dropped_segments > self.reported_dropped_segments:
+            logging.warning(
+                f"{dropped_segments - self.reported_dropped_segments} recordings were "
+                f"dropped because the processing could not keep up "
+                f"({self.continuous_capture.dropped_blocks} blocks in total)"
+            )
+            self.reported_dropped_segments = dropped_segments
+
+        return segment
 
     def start_audio_stream(self):
         assert self.stream_data is None
@@ -0,0 +1,112 @@
+from typing import Dict, Tuple
+
+import numpy as np  # type: ignore
+
+
+class BandEnergyDetector:
+    """
+    Detects sounds in the frequency band of bird songs. The energy of each block is
+    measured in logarithmically spaced bands between the low and the high frequency
+    and compared against a noise floor, which is tracked per band with an
+    exponential moving average. A sound occurs if at least one band exceeds its
+    noise floor by the margin. Wind, traffic and rain mostly raise the energy
+    outside of the band or raise the noise floor, so they do not trigger a recording.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        low_frequency: float = 1000,
+        high_frequency: float = 10000,
+        bands: int = 8,
+        margin_db: float = 10.0,
+        smoothing: float = 0.05,
+        warmup_blocks: int = 10,
+        rms_threshold: float = 0.02,
+        minimum_noise_floor: float = 1e-8,
+    ):
+        self.sample_rate = sample_rate
+        self.band_frequencies = np.geomspace(low_frequency, high_frequency, bands + 1)
+        self.margin = 10 ** (margin_db / 10)
+        self.smoothing = smoothing
+        self.warmup_blocks = warmup_blocks
+        self.rms_threshold = rms_threshold
+        self.minimum_noise_floor = minimum_noise_floor
+
+        self.noise_floor = np.zeros(bands)
+        self.blocks = 0
+        self.triggers = 0
+        self.rms_triggers = 0
+        self.suppressed_triggers = 0
+        self._block_settings: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def is_silent(self, data: np.ndarray) -> bool:
+        """
+        :param data: A block of frames with the shape (frames,) or (frames, channels)
+        :return: True if no sound occurred in the bird band
+        """
+        samples = data if data.ndim == 1 else data.mean(axis=1)
+        band_energy = self.band_energy(samples)
+
+        self.blocks += 1
+        if self.blocks <= self.warmup_blocks:
+            self._update_noise_floor(band_energy)
+            return True
+
+        noise_floor = np.maximum(self.noise_floor, self.minimum_noise_floor)
+        triggered = bool(np.any(band_energy > noise_floor * self.margin))
+        self._update_noise_floor(band_energy)
+
+        rms_triggered = bool(np.sqrt(np.mean(np.square(samples))) >= self.rms_threshold)
+        self.triggers += triggered
+        self.rms_triggers += rms_triggered
+        self.suppressed_triggers += rms_triggered and not triggered
+        return not triggered
+
+    def band_energy(self, samples: np.ndarray) -> np.ndarray:
+        """
+        :return: The mean power of each band computed from the FFT of the block
+        """
+        window, low_bins, high_bins = self._get_block_settings(len(samples))
+        power = np.abs(np.fft.rfft(samples * window)) ** 2
+        cumulative_power = np.concatenate(([0.0], np.cumsum(power)))
+        return (cumulative_power[high_bins] - cumulative_power[low_bins]) / np.maximum(
+            high_bins - low_bins, 1
+        )
+
+    def get_statistics(self) -> dict:
+        return {
+            "triggers": self.triggers,
+            "rms_triggers": self.rms_triggers,
+            "suppressed_triggers": self.suppressed_triggers,
+            "noise_floor_db": (10 * np.log10(self.noise_floor + 1e-20))
+            .round(1)
+            .tolist(),
+        }
+
+    def _update_noise_floor(self, band_energy: np.ndarray):
+        if self.blocks == 1:
+            self.noise_floor = band_energy
+            return
+        # Loud blocks only raise the noise floor gradually, so a single call does
+        # not mask the following ones while a persistent noise is adapted within seconds
+        limited_energy = np.minimum(
+            band_energy,
+            np.maximum(self.noise_floor, self.minimum_noise_floor) * self.margin,
+        )
+        self.noise_floor = (
+            1 - self.smoothing
+        ) * self.noise_floor + self.smoothing * limited_energy
+
+    def _get_block_settings(
+        self, frames: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        The window and the FFT bins of the bands only depend on the block size,
+        so they are computed once per block size
+        """
+        if frames not in self._block_settings:
+            frequencies = np.fft.rfftfreq(frames, 1 / self.sample_rate)
+            edges = np.searchsorted(frequencies, self.band_frequencies)
+            self._block_settings[frames] = (np.hanning(frames), edges[:-1], edges[1:])
+        return self._block_settings[frames]
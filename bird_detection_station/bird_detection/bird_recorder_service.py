@@ -1,32 +1,80 @@
-import _thread
 import asyncio
 import json
 import os
 import logging
-from asyncio import Future
-from json import JSONDecodeError
-from typing import List, Optional, Union
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Union
+
+import numpy as np  # type: ignore
 
 from bird_detection.audio.audio_services import AudioRecorderService
 from bird_detection.audio.device_selection import (
     DeviceSelector,
 )
+from bird_detection.audio.encoder import (
+    WAV_CONTENT_TYPE,
+    ClipEncoder,
+)
 from bird_detection.audio.sound_device_wrapper import SoundDevice
+from bird_detection.audio.trigger_detector import BandEnergyDetector
+from bird_detection.classification.classification_cache import ClassificationCache
+from bird_detection.classification.local_classifier import LocalClassifier
 from bird_detection.config import Config
+from bird_detection.event_hub import EventHub
 from bird_detection.gps.location_service import (
     LocationService,
     Location,
     LocationServiceInterface,
 )
+from bird_detection.http.async_client import AsyncRestClient
+from bird_detection.http.batching_client import BatchingRestClient
 from bird_detection.http.rest_client import RestClient, RestClientInterface
+from bird_detection.http.session_pool import SessionPool
 from bird_detection.mqtt.mqtt_service import MQTTService, MQTTServiceInterface
+from bird_detection.mqtt.outbox import MQTTOutbox
+from bird_detection.pipeline import Pipeline, Stage, StageConfig
 from bird_detection.station_type import BirdRecorderType
+from bird_detection.storage.prediction_store import (
+    FilePredictionStore,
+    PredictionStoreInterface,
+    max_confidence,
+)
+from bird_detection.storage.retention import RetentionManager
+from bird_detection.storage.sqlite_store import SQLitePredictionStore
+from bird_detection.weather.weather_cache import WeatherCache
 from bird_detection.weather.weather_service import (
+    AsyncWeatherService,
     WeatherService,
     WeatherServiceInterface,
 )
 
 
+class Clip:
+    """
+    A recording which passes through the stages of the recording pipeline
+    """
+
+    def __init__(
+        self,
+        file_name: str,
+        data: Optional[np.ndarray] = None,
+        sample_rate: int = 48000,
+        release: Optional[Callable[[], None]] = None,
+    ):
+        """
+        :param release: Lets the capture reuse the buffer of the data once it is encoded
+        """
+        self.file_name = file_name
+        self.data = data
+        self.sample_rate = sample_rate
+        self.release = release
+        self.encoded_data: Optional[memoryview] = None
+        self.content_type = WAV_CONTENT_TYPE
+        self.prediction: dict = {}
+        self.location: Optional[Location] = None
+        self.weather_info: Union[dict, str] = {}
+
+
 class BirdRecorder:
     instance = None
 
@@ -58,28 +106,123 @@ class BirdRecorder:
         accuracy_threshold = config.accuracy_threshold
         station_type = config.station_type
         host_url = config.host_url
-        rest_client = None
+        rest_client: Optional[RestClientInterface] = None
         mqtt_service = None
-        weather_service = None
+        weather_service: Optional[WeatherServiceInterface] = None
 
         coordinates = config.gps_coordinates
         location_service = LocationService(
             Location(lat=coordinates["lat"], lon=coordinates["lon"])
         )
 
-        if config.classifier_url:
-            rest_client = RestClient(config.classifier_url)
+        session_pool = SessionPool(config.http_settings)
+
+        if config.classifier_backend == "local":
+            rest_client = LocalClassifier(
+                config.classifier_model,
+                config.classifier_labels,
+                num_threads=config.classifier_threads or None,
+            )
+        elif config.classifier_url:
+            if config.classifier_batch_size > 1:
+                rest_client = BatchingRestClient(
+                    config.classifier_url,
+                    session_pool=session_pool,
+                    batch_size=config.classifier_batch_size,
+                    batch_wait=config.classifier_batch_wait / 1000,
+                )
+            elif config.http_client == "async":
+                rest_client = AsyncRestClient(
+                    config.classifier_url,
+                    settings=config.http_settings,
+                    max_concurrent_requests=config.max_concurrent_requests,
+                )
+            else:
+                rest_client = RestClient(
+                    config.classifier_url, session_pool=session_pool
+                )
+        if rest_client and config.classification_cache_size:
+            rest_client = ClassificationCache(
+                rest_client,
+                max_entries=config.classification_cache_size,
+                ttl=config.classification_cache_ttl,
+                threshold=config.classification_cache_similarity,
+            )
 
         if config.api_key:
             location = location_service.get_valid_location()
-            weather_service = WeatherService(
-                float(location.lat), float(location.lon), config.api_key
+            if config.http_client == "async":
+                weather_service = AsyncWeatherService(
+                    float(location.lat),
+                    float(location.lon),
+                    config.api_key,
+                    settings=config.http_settings,
+                )
+            else:
+                weather_service = WeatherService(
+                    float(location.lat),
+                    float(location.lon),
+                    config.api_key,
+                    session_pool=session_pool,
+                )
+            weather_service = WeatherCache(
+                weather_service,
+                location_service,
+                config.root_dir + "/weather_cache.json",
+                ttl=config.weather_ttl,
+                max_stale=config.weather_max_stale,
+                precision=config.weather_location_precision,
             )
 
         if config.station_type == BirdRecorderType.ONLINE:
-            mqtt_service = MQTTService(config.mqtt_broker, config.mqtt_port)
+            mqtt_service = MQTTService(
+                config.mqtt_broker,
+                config.mqtt_port,
+                outbox=MQTTOutbox(
+                    config.mqtt_outbox_file,
+                    max_messages=config.mqtt_outbox_size,
+                ),
+                qos=config.mqtt_qos,
+                max_inflight=config.mqtt_max_inflight,
+                batch_size=config.mqtt_batch_size,
+                rate_limit=config.mqtt_rate_limit,
+            )
+
+        trigger_detector = None
+        if config.trigger_mode == "band":
+            trigger_detector = BandEnergyDetector(
+                48000,
+                low_frequency=float(config.trigger_frequencies["low"]),
+                high_frequency=float(config.trigger_frequencies["high"]),
+                margin_db=config.trigger_margin,
+                rms_threshold=is_silent_threshold,
+            )
 
-        sound_device = SoundDevice(sound_device_selector, threshold=is_silent_threshold)
+        sound_device = SoundDevice(
+            sound_device_selector,
+            threshold=is_silent_threshold,
+            pre_trigger_seconds=config.pre_trigger_time,
+            capture_queue_size=config.capture_queue_size,
+            trigger_detector=trigger_detector,
+        )
+
+        prediction_file = config.root_dir + "/predictions.txt"
+        prediction_store: PredictionStoreInterface
+        if config.prediction_store == "sqlite":
+            sqlite_store = SQLitePredictionStore(
+                config.root_dir + "/predictions.db",
+                fsync_policy=config.prediction_fsync,
+            )
+            if sqlite_store.is_new and os.path.isfile(prediction_file):
+                imported = sqlite_store.import_file(prediction_file)
+                logging.info(f"Imported {imported} predictions from {prediction_file}")
+            prediction_store = sqlite_store
+        else:
+            prediction_store = FilePredictionStore(
+                prediction_file,
+                fsync_policy=config.prediction_fsync,
+                fsync_interval=config.prediction_fsync_interval,
+            )
 
         bird_recorder = BirdRecorder(
             station_type,
@@ -91,8 +234,20 @@ class BirdRecorder:
             weather_service,
             recording_time,
             accuracy_threshold,
-            config.root_dir + "/predictions.txt",
+            prediction_store,
+            continuous_capture=config.continuous_capture,
+            stage_configs=config.pipeline_stages,
+            encoder=ClipEncoder(config.clip_encoding, config.clip_sample_rate),
         )
+        # Recordings are only deleted if a limit is configured
+        if config.retention_max_size or config.retention_max_age:
+            bird_recorder.retention_manager = RetentionManager(
+                bird_recorder.sound_directory,
+                prediction_store,
+                max_bytes=config.retention_max_size * 1024 * 1024,
+                max_age=config.retention_max_age * 24 * 60 * 60,
+                policy=config.retention_policy,
+            )
 
         return bird_recorder
 
@@ -107,7 +262,11 @@ class BirdRecorder:
         weather_service: Optional[WeatherServiceInterface],
         duration: int = 3,
         accuracy_threshold: float = 0.5,
-        prediction_file: str = "predictions.txt",
+        prediction_store: Optional[PredictionStoreInterface] = None,
+        continuous_capture: bool = False,
+        stage_configs: Optional[Dict[str, StageConfig]] = None,
+        encoder: Optional[ClipEncoder] = None,
+        retention_manager: Optional[RetentionManager] = None,
     ):
         self.location_service = location_service
         self.rest_client = rest_client
@@ -118,55 +277,91 @@ class BirdRecorder:
         self.station_type = station_type
         self.host_url = host_url
         self.recording = False
-        self.recordings: List[dict] = []
         self.duration = duration
         self.accuracy_threshold = accuracy_threshold
-        self.futures: List[Future] = []
-
-        self.prediction_file = prediction_file
-        if os.path.isfile(self.prediction_file):
-            self._read_predictions()
+        self.event_hub = EventHub()
+        self.continuous_capture = continuous_capture
+        self.stage_configs = stage_configs or {}
+        self.pipeline: Optional[Pipeline] = None
+        self.sound_directory = "data"
+        self.encoder = encoder or ClipEncoder()
+        self.prediction_store = prediction_store or FilePredictionStore()
+        self.retention_manager = retention_manager
 
     def start_recording(self):
         """
-        Start the recording process in a new thread
+        Start the recording pipeline in new threads
         """
         self.recording = True
-        _thread.start_new_thread(self._start_recording, ("Thread-1",))
+        if self.pipeline:
+            self.pipeline.stop()
+        if self.continuous_capture:
+            # The capture worker, the queued clips and the encode workers hold a buffer
+            # of the capture until the clip is encoded
+            encode = self._get_stage_config("encode")
+            self.audio_recorder.start_continuous_capture(
+                self.duration, 1 + encode.queue_size + encode.workers
+            )
+        self.pipeline = self._create_pipeline()
+        self.pipeline.start()
 
     def stop_recording(self):
         """
-        Stop the recording thread. This action is not executed immediately
-        because an ongoing recording first has to be complete before the thread can finally stop
+        Stops the recording pipeline and waits for its threads. The capture is stopped
+        when the pipeline stops, so it no longer waits for the next sound.
+        An ongoing one-shot recording first has to be complete before its thread can stop.
+        Clips which were already captured are still classified and persisted
         """
         self.recording = False
+        if self.pipeline:
+            self.pipeline.stop()
+        self.audio_recorder.stop_continuous_capture()
 
-    def bird_event(self):
+    def attach_event_loop(self, loop: asyncio.AbstractEventLoop):
         """
-        Subscribe to the bird recorder to be informed when a bird is detected
-        :return: a future of a bird event
+        Lets asynchronous clients run their requests on the event loop of the server
         """
-        loop = asyncio.get_running_loop()
-        future = loop.create_future()
-        self.futures.append(future)
-
-        return future
+        if self.rest_client:
+            self.rest_client.attach_event_loop(loop)
+        if self.weather_service:
+            self.weather_service.attach_event_loop(loop)
 
-    def _read_predictions(self):
-        with open(self.prediction_file, "r+") as predictions:
-            for prediction in predictions.readlines():
-                prediction_dict = None
-                try:
-                    prediction_dict = json.loads(prediction)
-                except JSONDecodeError:
-                    logging.warning("Could not parse prediction file")
+    async def shutdown(self):
+        """
+        Closes the connections of the clients when the server shuts down
+        """
+        if self.rest_client:
+            await self.rest_client.shutdown()
+        if self.weather_service:
+            await self.weather_service.shutdown()
 
-                if prediction_dict is not None:
-                    self.recordings.append(prediction_dict)
+    def get_statistics(self) -> dict:
+        """
+        :return: Counters of the station which help to monitor its performance
+        """
+        statistics = {"capture": self.audio_recorder.get_statistics()}
+        if self.pipeline:
+            statistics["pipeline"] = self.pipeline.get_statistics()
+        if self.rest_client:
+            statistics["http"] = self.rest_client.get_statistics()
+        statistics["storage"] = self.prediction_store.get_statistics()
+        if self.mqtt_service:
+            statistics["mqtt"] = self.mqtt_service.get_statistics()
+        if self.weather_service:
+            statistics["weather"] = self.weather_service.get_statistics()
+        if self.retention_manager:
+            statistics["retention"] = self.retention_manager.get_statistics()
+        statistics["events"] = self.event_hub.get_statistics()
+        return statistics
 
-    def _write_to_file(self, prediction: str):
-        with open(self.prediction_file, "a+") as predictions:
-            predictions.write(prediction + "\n")
+    async def bird_event(self) -> str:
+        """
+        Waits for the next bird detection
+        :return: The serialized bird event
+        """
+        with self.event_hub.subscribe(queue_size=1) as subscription:
+            event = await subscription.get()
+        return event.data
 
     def _filter_results(self, prediction: dict) -> dict:
         filtered_prediction = {}
@@ -182,31 +377,144 @@ class BirdRecorder:
             )
         return filtered_prediction
 
-    def _start_recording(self, threadName: str):
-        while self.recording:
-            file_name = self.audio_recorder.record_sound(self.duration)
-            if (
-                self.station_type == BirdRecorderType.ONLINE
-                or self.station_type == BirdRecorderType.OFFLINE_CLASSIFICATION
-            ) and self.rest_client:
-                prediction = self.rest_client.post_wav(file_name)
-                self._process_prediction(prediction, file_name)
+    def _is_classifying(self) -> bool:
+        return (
+            self.station_type == BirdRecorderType.ONLINE
+            or self.station_type == BirdRecorderType.OFFLINE_CLASSIFICATION
+        ) and self.rest_client is not None
+
+    def _create_pipeline(self) -> Pipeline:
+        """
+        Creates the recording pipeline. Each stage runs in its own worker threads
+        and is connected to the next stage by a bounded queue.
+        Stations without classification only capture and save the recordings.
+        """
+        stages = [
+            Stage(
+                "capture",
+                self._capture_clip,
+                StageConfig(workers=1),
+                interrupt=self.audio_recorder.stop_continuous_capture,
+            ),
+            Stage(
+                "encode",
+                self._encode_clip,
+                self._get_stage_config("encode"),
+                discard=self._discard_clip,
+            ),
+        ]
+        if self._is_classifying():
+            stages += [
+                Stage(
+                    "classify", self._classify_clip, self._get_stage_config("classify")
+                ),
+                Stage("enrich", self._enrich_clip, self._get_stage_config("enrich")),
+                Stage("persist", self._persist_clip, self._get_stage_config("persist")),
+            ]
+        return Pipeline(stages)
+
+    def _get_stage_config(self, name: str) -> StageConfig:
+        return self.stage_configs.get(name, StageConfig())
+
+    def _capture_clip(self) -> Optional[Clip]:
+        segment = self.audio_recorder.capture_sound(self.duration)
+        if segment is None:
+            return None
+        return Clip(
+            str(segment.time) + self.encoder.extension,
+            segment.data,
+            segment.sample_rate,
+            segment.release,
+        )
+
+    @staticmethod
+    def _discard_clip(clip: Clip):
+        """
+        Returns the buffer of a clip which is dropped before it was encoded
+        """
+        if clip.release:
+            clip.release()
+
+    def _encode_clip(self, clip: Clip) -> Clip:
+        """
+        Stations without classification keep every recording, so it is saved right away.
+        Otherwise the recording is only encoded in memory and written to disk
+        if the classification is positive
+        """
+        try:
+            clip.encoded_data = self.encoder.encode(clip.data, clip.sample_rate)  # type: ignore
+        finally:
+            clip.data = None
+            if clip.release:
+                clip.release()
+        clip.content_type = self.encoder.content_type
+        if not self._is_classifying():
+            self._save_encoded_clip(clip)
+        return clip
+
+    def _classify_clip(self, clip: Clip) -> Future:
+        """
+        Sends the clip to the classifier without waiting for the result
+        :return: A future of the classified clip, or of None if no bird was detected
+        """
+        classified_clip: Future = Future()
+
+        def on_classified(request: Future):
+            try:
+                classified_clip.set_result(
+                    self._accept_prediction(clip, request.result())
+                )
+            except Exception as e:
+                classified_clip.set_exception(e)
+
+        self.rest_client.submit(  # type: ignore
+            clip.file_name, clip.encoded_data, clip.content_type
+        ).add_done_callback(on_classified)
+        return classified_clip
+
+    def _accept_prediction(self, clip: Clip, prediction: dict) -> Optional[Clip]:
+        clip.prediction = self._filter_results(prediction)
+        if not clip.prediction:
+            return None
+        logging.info(f"New prediction {clip.prediction}")
+        return clip
+
+    def _enrich_clip(self, clip: Clip) -> Clip:
+        clip.location = self.location_service.get_valid_location()
+        clip.weather_info = self._get_weather_info()
+        return clip
+
+    def _persist_clip(self, clip: Clip):
+        complete_prediction = self._create_complete_prediction(
+            clip.file_name, clip.location, clip.prediction, clip.weather_info  # type: ignore
+        )
+        prediction_json = json.dumps(complete_prediction)
+        if clip.encoded_data is not None:
+            self._save_encoded_clip(clip)
+        self.prediction_store.add(complete_prediction)
+        self._publish_bird_event(prediction_json, complete_prediction)
 
     def _process_prediction(self, prediction: dict, file_name: str):
         filtered_prediction = self._filter_results(prediction)
         if filtered_prediction:
             logging.info(f"New prediction {filtered_prediction}")
-            location = self.location_service.get_valid_location()
-            weather_info = self._get_weather_info()
-            complete_prediction = self._create_complete_prediction(
-                file_name, location, filtered_prediction, weather_info
+            clip = Clip(file_name)
+            clip.prediction = filtered_prediction
+            self._persist_clip(self._enrich_clip(clip))
+        elif os.path.isfile(self.sound_directory + "/" + file_name):
+            os.remove(self.sound_directory + "/" + file_name)
+
+    def _save_encoded_clip(self, clip: Clip):
+        os.makedirs(self.sound_directory, exist_ok=True)
+        with open(self.sound_directory + "/" + clip.file_name, "wb") as clip_file:
+            clip_file.write(clip.encoded_data)  # type: ignore
+        if self.retention_manager:
+            self.retention_manager.add_clip(
+                clip.file_name,
+                len(clip.encoded_data),  # type: ignore
+                max_confidence(clip.prediction),
             )
-            self.recordings.append(complete_prediction)
-            prediction_json = json.dumps(complete_prediction)
-            self._write_to_file(prediction_json)
-            self._publish_bird_event(prediction_json)
-        else:
-            os.remove("data/" + file_name)
+        clip.encoded_data = None
 
     def _get_weather_info(self):
         if self.weather_service:
@@ -224,15 +532,12 @@ class BirdRecorder:
         return {
             "Result": prediction["Result"],
             "File": f"http://{self.host_url}/actions/files/{file_name}",
-            "Time": file_name[:-4],
+            "Time": os.path.splitext(file_name)[0],
             "GPS": vars(location),
             "weather_info": weather_info,
         }
 
-    def _publish_bird_event(self, json_response: str):
+    def _publish_bird_event(self, json_response: str, prediction: dict):
         if self.station_type == BirdRecorderType.ONLINE and self.mqtt_service:
             self.mqtt_service.publish("BirdEvent", json_response)
-        for f in self.futures:
-            if f and not f.done():
-                f.set_result(json_response)
-            self.futures.remove(f)
+        self.event_hub.publish(json_response, prediction)
@@ -0,0 +1,179 @@
+import asyncio
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, List, Optional
+
+import numpy as np  # type: ignore
+
+from bird_detection.audio.encoder import WAV_CONTENT_TYPE, decode
+from bird_detection.classification.fingerprint import fingerprint, similarity
+from bird_detection.http.rest_client import AudioData, RestClientInterface
+
+
+class CacheEntry:
+    def __init__(self, key: int, signature: np.ndarray, result: Future, created: float):
+        self.key = key
+        self.signature = signature
+        self.result = result
+        self.created = created
+
+
+class ClassificationCache(RestClientInterface):
+    """
+    Answers recordings which are nearly identical to a recently classified recording
+    with the cached result, e.g. if a bird sings again and again on a nearby perch.
+    Recordings are compared by their spectral fingerprint, a recording whose
+    similarity to a cached one reaches the threshold is a hit. Results are cached
+    for ttl seconds and the least recently used of more than max_entries results
+    are evicted. A recording which is similar to one that is still being classified
+    waits for that result instead of being sent as well.
+    """
+
+    def __init__(
+        self,
+        rest_client: RestClientInterface,
+        max_entries: int = 64,
+        ttl: float = 60,
+        threshold: float = 0.7,
+        sample_rate: int = 48000,
+    ):
+        """
+        :param sample_rate: The sample rate of recordings which are given as numpy array
+        """
+        self.rest_client = rest_client
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+
+        self.lock = threading.Lock()
+        self.entries: OrderedDict = OrderedDict()
+        self.next_key = 0
+        self.hits = 0
+        self.misses = 0
+
+    def post_wav(
+        self,
+        file_name: str,
+        data: Optional[AudioData] = None,
+        content_type: str = WAV_CONTENT_TYPE,
+    ) -> Any:
+        return self.submit(file_name, data, content_type).result()
+
+    def submit(
+        self,
+        file_name: str,
+        data: Optional[AudioData] = None,
+        content_type: str = WAV_CONTENT_TYPE,
+    ) -> Future:
+        if data is None:
+            with open("data/" + file_name, "rb") as audio_file:
+                data = audio_file.read()
+        signature = self._fingerprint(data)
+
+        entry = self._find(signature) if signature is not None else None
+        with self.lock:
+            # The entry may have been evicted or failed while it was compared
+            if entry is not None and entry.key in self.entries:
+                self.entries.move_to_end(entry.key)
+                self.hits += 1
+                return self._share(entry.result)
+            self.misses += 1
+
+        result = self.rest_client.submit(file_name, data, content_type)
+        if signature is None:
+            return result
+        self._add(signature, result)
+        return self._share(result)
+
+    def attach_event_loop(self, loop: asyncio.AbstractEventLoop):
+        self.rest_client.attach_event_loop(loop)
+
+    async def shutdown(self):
+        await self.rest_client.shutdown()
+
+    def get_statistics(self) -> dict:
+        statistics = self.rest_client.get_statistics()
+        requests = self.hits + self.misses
+        statistics["cache"] = {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 3) if requests else 0,
+        }
+        return statistics
+
+    def _fingerprint(self, data: AudioData) -> Optional[np.ndarray]:
+        """
+        :return: The fingerprint, or None if the recording has too little song
+        to be compared or cannot be decoded
+        """
+        try:
+            if isinstance(data, np.ndarray):
+                recording, sample_rate = data, self.sample_rate
+            else:
+                recording, sample_rate = decode(data)
+            signature = fingerprint(recording, sample_rate)
+        except Exception as e:
+            logging.warning(f"Could not fingerprint the recording: {e!r}")
+            return None
+        return signature if len(signature) else None
+
+    def _find(self, signature: np.ndarray) -> Optional[CacheEntry]:
+        """
+        Compares the recording with the cached recordings, the most recent first.
+        The comparison does not hold the lock.
+        """
+        with self.lock:
+            self._expire()
+            entries: List[CacheEntry] = list(reversed(self.entries.values()))
+        for entry in entries:
+            if similarity(signature, entry.signature) >= self.threshold:
+                return entry
+        return None
+
+    def _add(self, signature: np.ndarray, result: Future):
+        with self.lock:
+            key = self.next_key
+            self.next_key += 1
+            self.entries[key] = CacheEntry(key, signature, result, time.monotonic())
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+        def on_classified(request: Future):
+            # Failed requests are not cached, the next recording is sent again
+            if request.exception() is not None:
+                with self.lock:
+                    self.entries.pop(key, None)
+
+        result.add_done_callback(on_classified)
+
+    def _expire(self):
+        """
+        Needs to hold the lock
+        """
+        now = time.monotonic()
+        for key in [
+            key for key, entry in self.entries.items() if now - entry.created > self.ttl
+        ]:
+            del self.entries[key]
+
+    @staticmethod
+    def _share(result: Future) -> Future:
+        """
+        :return: A future of a copy of the result, so the copies can be modified
+        """
+        shared: Future = Future()
+
+        def on_classified(request: Future):
+            try:
+                shared.set_result(copy.deepcopy(request.result()))
+            except Exception as e:
+                shared.set_exception(e)
+
+        result.add_done_callback(on_classified)
+        return shared
@@ -0,0 +1,85 @@
+import numpy as np  # type: ignore
+from scipy import fft  # type: ignore
+
+from bird_detection.classification.spectrogram import frame, hann_window
+
+# Frames without a prominent band
+INACTIVE = 255
+
+
+def band_bins(
+    frame_length: int, sample_rate: int, low: float, high: float, bands: int
+) -> np.ndarray:
+    """
+    :return: The first FFT bin of each of the logarithmically spaced bands,
+    followed by the bin after the last band
+    """
+    high = min(high, sample_rate / 2)
+    edges = np.geomspace(low, high, bands + 1)
+    return np.round(edges * frame_length / sample_rate).astype(int)
+
+
+def fingerprint(
+    recording: np.ndarray,
+    sample_rate: int,
+    frame_seconds: float = 0.032,
+    hop_seconds: float = 0.016,
+    bands: int = 32,
+    low: float = 1000,
+    high: float = 10000,
+    prominence: float = 10.0,
+) -> np.ndarray:
+    """
+    A compact signature of the song in a recording, one byte per frame: the index
+    of the loudest of the logarithmically spaced bands of the bird band, or INACTIVE
+    if that band is less than prominence dB above the median band of the frame.
+    The signature follows the pitch of the song and does not depend on the volume
+    or the background noise of the recording.
+    :param recording: The recorded frames of any dtype, only the first channel is used
+    :return: The fingerprint as uint8 array
+    """
+    if recording.ndim > 1:
+        recording = recording[:, 0]
+    samples = np.ascontiguousarray(recording, dtype=np.float32)
+    frame_length = int(sample_rate * frame_seconds)
+    if len(samples) < frame_length:
+        return np.zeros(0, dtype=np.uint8)
+
+    frames = frame(samples, frame_length, int(sample_rate * hop_seconds))
+    spectrum = np.abs(fft.rfft(frames * hann_window(frame_length), axis=1)) ** 2
+    bins = band_bins(frame_length, sample_rate, low, high, bands)
+    # The mean energy of the bins of every band
+    energy = np.add.reduceat(spectrum, bins, axis=1)[:, :bands]
+    energy /= np.diff(bins).clip(1)
+
+    loudest = np.argmax(energy, axis=1)
+    peak = energy[np.arange(len(energy)), loudest]
+    is_active = peak > np.median(energy, axis=1) * 10 ** (prominence / 10)
+    return np.where(is_active, loudest, INACTIVE).astype(np.uint8)
+
+
+def similarity(
+    first: np.ndarray, second: np.ndarray, max_shift: int = 32, min_active: int = 4
+) -> float:
+    """
+    Compares two fingerprints, which may be shifted by up to max_shift frames
+    against each other, e.g. if the song was recorded a bit later
+    :return: The share of frames with song in either fingerprint in which both
+    have the song in the same or a neighbouring band, at the best shift.
+    0 if there is too little song to compare.
+    """
+    active_frames = min(
+        np.count_nonzero(first != INACTIVE), np.count_nonzero(second != INACTIVE)
+    )
+    if active_frames < min_active:
+        return 0.0
+    best = 0.0
+    for shift in range(-max_shift, max_shift + 1):
+        a = first[max(shift, 0) :]
+        b = second[max(-shift, 0) :]
+        length = min(len(a), len(b))
+        a, b = a[:length].astype(np.int16), b[:length].astype(np.int16)
+        is_active = (a != INACTIVE) | (b != INACTIVE)
+        matches = int(np.count_nonzero(is_active & (np.abs(a - b) <= 1)))
+        best = max(best, matches / max(int(np.count_nonzero(is_active)), 1))
+    return best
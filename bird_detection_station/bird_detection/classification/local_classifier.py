@@ -0,0 +1,239 @@
+import json
+import os
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np  # type: ignore
+
+from bird_detection.audio.encoder import WAV_CONTENT_TYPE, ClipEncoder, decode
+from bird_detection.classification.spectrogram import SpectrogramFrontend
+from bird_detection.http.rest_client import AudioData, RestClientInterface
+
+try:
+    from tflite_runtime.interpreter import Interpreter  # type: ignore
+except ImportError:
+    try:
+        import tensorflow as tf  # type: ignore
+
+        Interpreter = tf.lite.Interpreter
+    except ImportError:
+        Interpreter = None
+
+ENVIRONMENT_NOISE = {"Non-Bird_Non-Bird", "Noise_Noise", "Non-Bird"}
+BLACKLIST = {"rook", "european pied flycatcher", "painted bunting", "human"}
+
+
+def load_labels(labels_file: str) -> List[str]:
+    """
+    Reads the labels of the model, e.g. "Fringilla coelebs_Common Chaffinch".
+    Either one label per line or the labels.ts of the classification service.
+    """
+    with open(labels_file) as labels:
+        content = labels.read()
+    if labels_file.endswith((".ts", ".js")):
+        return json.loads(content[content.index("[") : content.rindex("]") + 1])
+    return [label for label in content.splitlines() if label]
+
+
+def unique_results(results: List[dict]) -> List[dict]:
+    """
+    Keeps the highest confidence of every species, like the classification service
+    """
+    unique: List[dict] = []
+    names = set()
+    for result in sorted(results, key=lambda result: -result["Confidence"]):
+        name = result["Common Name"]
+        if name not in names and name.lower() not in BLACKLIST:
+            names.add(name)
+            unique.append(result)
+    return unique
+
+
+def to_samples(recording: np.ndarray) -> np.ndarray:
+    """
+    Converts the first channel of a recording to float32 samples between -1 and 1
+    """
+    if recording.ndim > 1:
+        recording = recording[:, 0]
+    if np.issubdtype(recording.dtype, np.integer):
+        return recording.astype(np.float32) / np.iinfo(recording.dtype).max
+    return recording.astype(np.float32)
+
+
+def available_cores() -> int:
+    """
+    :return: The number of cores the station may use, which can be less than
+    the cores of the device
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class LocalClassifier(RestClientInterface):
+    """
+    Classifies the recordings with a TensorFlow Lite BirdNET model in the process of
+    the station, so no recording is uploaded to the classification service.
+    The model is loaded once and warmed up on startup. Like the classification service,
+    the recording is resampled to 48 kHz and cut into 3 s chunks with a hop of 1 s,
+    all chunks are classified in one invocation and the best species of every chunk
+    is returned. The interpreter uses num_threads threads, by default one per
+    available core, and classifies one recording at a time. Models which were exported
+    without their spectrogram layer, so their input has the shape [chunks, 257, 384]
+    or [chunks, 257, 384, 1], get the spectrograms of all chunks computed by the
+    SpectrogramFrontend at once.
+    """
+
+    def __init__(
+        self,
+        model_file: str,
+        labels_file: str,
+        num_threads: Optional[int] = None,
+        sample_rate: int = 48000,
+        chunk_seconds: float = 3.0,
+        sensitivity: float = 1.0,
+        logits: bool = True,
+    ):
+        if Interpreter is None:
+            raise ValueError(
+                "The local classifier requires the tflite-runtime or tensorflow package"
+            )
+        self.sample_rate = sample_rate
+        self.chunk_length = int(sample_rate * chunk_seconds)
+        self.sensitivity = sensitivity
+        self.logits = logits
+        self.labels = load_labels(labels_file)
+        self.num_threads = num_threads or available_cores()
+        self.resampler = ClipEncoder(sample_rate=sample_rate)
+
+        self.lock = threading.Lock()
+        self.interpreter = Interpreter(
+            model_path=model_file, num_threads=self.num_threads
+        )
+        input_details = self.interpreter.get_input_details()
+        self.input_index = input_details[0]["index"]
+        self.frontend: Optional[SpectrogramFrontend] = None
+        self.feature_shape = tuple(input_details[0]["shape"][1:])
+        if len(self.feature_shape) > 1:
+            self.frontend = SpectrogramFrontend(
+                sample_rate, chunk_seconds, workers=self.num_threads
+            )
+        # BirdNET models with a second input expect the latitude, longitude and week
+        # followed by a mask, -1 and a mask of 0 disable the location filter
+        self.metadata_index = None
+        self.metadata = np.zeros(0, dtype=np.float32)
+        if len(input_details) > 1:
+            self.metadata_index = input_details[1]["index"]
+            self.metadata = np.zeros(input_details[1]["shape"][-1], dtype=np.float32)
+            self.metadata[:3] = -1
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self.batch_size = 0
+        self.reset_statistics()
+
+        # The first invocation allocates the tensors, so it is not left
+        # to the first recording
+        self._classify(self._split(np.zeros(self.chunk_length, dtype=np.float32)))
+        self.reset_statistics()
+
+    def post_wav(
+        self,
+        file_name: str,
+        data: Optional[AudioData] = None,
+        content_type: str = WAV_CONTENT_TYPE,
+    ):
+        """
+        :return: The prediction in the format of the classification service,
+        or None if no bird was detected
+        """
+        if data is None:
+            with open("data/" + file_name, "rb") as audio_file:
+                data = audio_file.read()
+        if isinstance(data, np.ndarray):
+            recording, sample_rate = data, self.sample_rate
+        else:
+            recording, sample_rate = decode(data)
+        samples, _ = self.resampler.resample(to_samples(recording), sample_rate)
+
+        scores = self._classify(self._split(samples))
+        results = []
+        for chunk_scores in scores:
+            index = int(np.argmax(chunk_scores))
+            label = self.labels[index]
+            if label not in ENVIRONMENT_NOISE:
+                results.append(
+                    {
+                        "Common Name": label.split("_")[1],
+                        "Confidence": float(chunk_scores[index]),
+                    }
+                )
+        results = unique_results(results)
+        return {"Result": results} if results else None
+
+    def reset_statistics(self):
+        self.recordings = 0
+        self.chunks = 0
+        self.inference_seconds = 0.0
+
+    def get_statistics(self) -> dict:
+        return {
+            "recordings": self.recordings,
+            "chunks": self.chunks,
+            "threads": self.num_threads,
+            "average_inference_ms": round(
+                self.inference_seconds / max(self.recordings, 1) * 1000, 3
+            ),
+        }
+
+    def _split(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Cuts the recording into overlapping chunks without copying it, or computes
+        the spectrograms of the chunks if the model expects them.
+        Recordings shorter than a chunk are padded with silence.
+        """
+        if self.frontend:
+            features = self.frontend.compute(samples)
+            return features.reshape((len(features),) + self.feature_shape)
+        samples = np.ascontiguousarray(samples)
+        if len(samples) < self.chunk_length:
+            samples = np.pad(samples, (0, self.chunk_length - len(samples)))
+        chunk_count = (len(samples) - self.chunk_length) // self.sample_rate + 1
+        return np.lib.stride_tricks.as_strided(
+            samples,
+            shape=(chunk_count, self.chunk_length),
+            strides=(samples.strides[0] * self.sample_rate, samples.strides[0]),
+            writeable=False,
+        )
+
+    def _classify(self, chunks: np.ndarray) -> np.ndarray:
+        """
+        :return: The confidence of every label for every chunk
+        """
+        start = time.monotonic()
+        with self.lock:
+            if len(chunks) != self.batch_size:
+                self.interpreter.resize_tensor_input(
+                    self.input_index, list(chunks.shape)
+                )
+                if self.metadata_index is not None:
+                    self.interpreter.resize_tensor_input(
+                        self.metadata_index, [len(chunks), len(self.metadata)]
+                    )
+                self.interpreter.allocate_tensors()
+                self.batch_size = len(chunks)
+            self.interpreter.set_tensor(
+                self.input_index, np.ascontiguousarray(chunks, dtype=np.float32)
+            )
+            if self.metadata_index is not None:
+                self.interpreter.set_tensor(
+                    self.metadata_index,
+                    np.tile(self.metadata, (len(chunks), 1)),
+                )
+            self.interpreter.invoke()
+            scores = self.interpreter.get_tensor(self.output_index)
+            self.recordings += 1
+            self.chunks += len(chunks)
+            self.inference_seconds += time.monotonic() - start
+        if self.logits:
+            scores = 1 / (1 + np.exp(-self.sensitivity * scores))
+        return scores
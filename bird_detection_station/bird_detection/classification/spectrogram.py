@@ -0,0 +1,114 @@
+import numpy as np  # type: ignore
+from scipy import fft  # type: ignore
+
+FRAME_LENGTH = 512
+FRAME_STEP = 374
+
+
+def hann_window(length: int) -> np.ndarray:
+    """
+    The periodic Hann window, which tf.signal.stft uses for frames of even length
+    """
+    return (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(length) / length)).astype(
+        np.float32
+    )
+
+
+def window_starts(length: int, window_length: int, hop: int) -> np.ndarray:
+    """
+    :return: The first sample of every window which fits into the recording,
+    at least one
+    """
+    return np.arange(max(length - window_length, 0) // hop + 1) * hop
+
+
+def frame(signal: np.ndarray, frame_length: int, step: int) -> np.ndarray:
+    """
+    Cuts the last axis of the signal into all frames which fit, without copying it
+    """
+    count = (signal.shape[-1] - frame_length) // step + 1
+    return np.lib.stride_tricks.as_strided(
+        signal,
+        shape=signal.shape[:-1] + (count, frame_length),
+        strides=signal.strides[:-1] + (signal.strides[-1] * step, signal.strides[-1]),
+        writeable=False,
+    )
+
+
+class SpectrogramFrontend:
+    """
+    Computes the input features of the SimpleSpecLayer of the BirdNET model for all
+    overlapping windows of a recording at once: the real part of the STFT with
+    a frame length of 512 and a step of 374, squared, compressed with the power
+    1 / (1 + exp(mag_scale)) and normalised per window with (spec - min) / max.
+    The layer transforms every window on its own. Here, the frames of the whole
+    recording are cut as one strided view and go through a single real FFT in single
+    precision, which can use several workers, and every window is a slice of these
+    frames. So overlapping windows share their frames and every frame of the
+    recording is transformed only once. A window therefore starts on the frame which
+    is nearest to its hop, at most half a frame step away, 3.9 ms at 48 kHz.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 48000,
+        chunk_seconds: float = 3.0,
+        hop_seconds: float = 1.0,
+        frame_length: int = FRAME_LENGTH,
+        frame_step: int = FRAME_STEP,
+        mag_scale: float = 1.0,
+        workers: int = 1,
+    ):
+        self.window_length = int(sample_rate * chunk_seconds)
+        self.hop = int(sample_rate * hop_seconds)
+        self.frame_length = frame_length
+        self.frame_step = frame_step
+        self.workers = workers
+        self.frame_count = (self.window_length - frame_length) // frame_step + 1
+        self.exponent = 1 / (1 + np.exp(mag_scale))
+        self.window = hann_window(frame_length)
+        self.frame_range = np.arange(self.frame_count)
+
+    @property
+    def shape(self):
+        """
+        :return: The shape of the features of one window, e.g. (257, 384)
+        """
+        return self.frame_length // 2 + 1, self.frame_count
+
+    def first_frames(self, length: int) -> np.ndarray:
+        """
+        :param length: The number of samples of the recording, at least one window
+        :return: The index of the first frame of every window
+        """
+        frames = (length - self.frame_length) // self.frame_step + 1
+        starts = window_starts(length, self.window_length, self.hop)
+        first_frames = np.rint(starts / self.frame_step).astype(int)
+        return np.minimum(first_frames, frames - self.frame_count)
+
+    def compute(self, samples: np.ndarray) -> np.ndarray:
+        """
+        :param samples: A mono recording with samples between -1 and 1. Recordings
+        shorter than a window are padded with silence.
+        :return: The features of every window, with the shape [windows, 257, 384].
+        Silent windows are all 0, where the layer would divide by 0.
+        """
+        samples = np.ascontiguousarray(samples, dtype=np.float32)
+        if len(samples) < self.window_length:
+            samples = np.pad(samples, (0, self.window_length - len(samples)))
+
+        spec = self._power_spectrum(frame(samples, self.frame_length, self.frame_step))
+        spec = spec[self.first_frames(len(samples))[:, np.newaxis] + self.frame_range]
+
+        minimum = spec.min(axis=(1, 2), keepdims=True)
+        maximum = spec.max(axis=(1, 2), keepdims=True)
+        spec -= minimum
+        np.divide(spec, maximum, out=spec, where=maximum > 0)
+        return spec.transpose(0, 2, 1)
+
+    def _power_spectrum(self, frames: np.ndarray) -> np.ndarray:
+        """
+        :return: pow(pow(real(rfft(frames)), 2), exponent), in one pass
+        """
+        real = fft.rfft(frames * self.window, axis=-1, workers=self.workers).real
+        return np.abs(real).astype(np.float32) ** np.float32(2 * self.exponent)
@@ -2,6 +2,11 @@ import yaml
 import os
 import logging
 
+from bird_detection.audio.encoder import ClipEncoding
+from bird_detection.http.session_pool import HTTPSettings
+from bird_detection.pipeline import BackpressurePolicy, StageConfig
+from bird_detection.storage.append_writer import FsyncPolicy
+from bird_detection.storage.retention import RetentionPolicy
 from bird_detection.station_type import BirdRecorderType
 
 
@@ -25,14 +30,100 @@ class Config:
             self.is_silent_threshold = float(
                 self.config.get("is_silent_threshold", 0.02)
             )
+            self.trigger_mode = str(self.config.get("trigger_mode", "band")).lower()
+            self.trigger_margin = float(self.config.get("trigger_margin", 10.0))
+            self.trigger_frequencies = self.config.get(
+                "trigger_frequencies", {"low": 1000, "high": 10000}
+            )
             self.recording_time = int(self.config.get("recording_time", 3))
+            self.pre_trigger_time = float(self.config.get("pre_trigger_time", 0.5))
+            self.continuous_capture = bool(self.config.get("continuous_capture", False))
+            self.capture_queue_size = int(self.config.get("capture_queue_size", 8))
             self.accuracy_threshold = float(self.config.get("accuracy_threshold", 0.5))
             self.station_type = BirdRecorderType[
                 self.config.get("station_type", "OFFLINE").upper()
             ]
+            self.clip_encoding = ClipEncoding(
+                str(self.config.get("clip_encoding", "pcm16")).lower()
+            )
+            self.clip_sample_rate = int(self.config.get("clip_sample_rate", 0)) or None
+            self.pipeline_stages = {
+                name: StageConfig(
+                    int(stage.get("workers", 1)),
+                    int(stage.get("queue_size", 4)),
+                    BackpressurePolicy[stage.get("backpressure", "block").upper()],
+                    int(stage.get("concurrency", 1)),
+                )
+                for name, stage in (self.config.get("pipeline") or {}).items()
+            }
+            self.http_settings = HTTPSettings(
+                connect_timeout=float(self.config.get("http_connect_timeout", 3.05)),
+                read_timeout=float(self.config.get("http_read_timeout", 30)),
+                retries=int(self.config.get("http_retries", 3)),
+                backoff_factor=float(self.config.get("http_backoff_factor", 0.5)),
+                pool_size=int(self.config.get("http_pool_size", 4)),
+            )
+            self.http_client = str(self.config.get("http_client", "requests")).lower()
+            self.max_concurrent_requests = int(
+                self.config.get("max_concurrent_requests", 8)
+            )
+            self.classifier_batch_size = int(
+                self.config.get("classifier_batch_size", 1)
+            )
+            self.classifier_batch_wait = float(
+                self.config.get("classifier_batch_wait", 250)
+            )
+            self.classifier_backend = str(
+                self.config.get("classifier_backend", "http")
+            ).lower()
+            self.classifier_model = self.config.get("classifier_model")
+            self.classifier_labels = self.config.get(
+                "classifier_labels",
+                self.root_dir + "/../bird_classification/src/labels.ts",
+            )
+            self.classifier_threads = int(self.config.get("classifier_threads", 0))
+            self.classification_cache_size = int(
+                self.config.get("classification_cache_size", 64)
+            )
+            self.classification_cache_ttl = float(
+                self.config.get("classification_cache_ttl", 60)
+            )
+            self.classification_cache_similarity = float(
+                self.config.get("classification_cache_similarity", 0.7)
+            )
+            self.prediction_store = str(
+                self.config.get("prediction_store", "sqlite")
+            ).lower()
+            self.prediction_fsync = FsyncPolicy(
+                str(self.config.get("prediction_fsync", "interval")).lower()
+            )
+            self.prediction_fsync_interval = float(
+                self.config.get("prediction_fsync_interval", 1.0)
+            )
+            self.retention_max_size = int(self.config.get("retention_max_size", 0))
+            self.retention_max_age = float(self.config.get("retention_max_age", 0))
+            self.retention_policy = RetentionPolicy(
+                str(self.config.get("retention_policy", "oldest")).lower()
+            )
+            self.compressed_clip_cache = int(
+                self.config.get("compressed_clip_cache", 32)
+            )
             self.api_key = self.config.get("api_key", "")
+            self.weather_ttl = float(self.config.get("weather_ttl", 600))
+            self.weather_max_stale = float(self.config.get("weather_max_stale", 10800))
+            self.weather_location_precision = int(
+                self.config.get("weather_location_precision", 2)
+            )
             self.mqtt_broker = str(self.config.get("mqtt_broker", "localhost"))
             self.mqtt_port = int(self.config.get("mqtt_port", 1883))
+            self.mqtt_qos = int(self.config.get("mqtt_qos", 1))
+            self.mqtt_max_inflight = int(self.config.get("mqtt_max_inflight", 20))
+            self.mqtt_batch_size = int(self.config.get("mqtt_batch_size", 50))
+            self.mqtt_rate_limit = float(self.config.get("mqtt_rate_limit", 0))
+            self.mqtt_outbox_size = int(self.config.get("mqtt_outbox_size", 10000))
+            self.mqtt_outbox_file = str(
+                self.config.get("mqtt_outbox_file", self.root_dir + "/mqtt_outbox.db")
+            )
         except FileNotFoundError:
             logging.error("Config file not found. Please provide a config file")
             exit(-1)
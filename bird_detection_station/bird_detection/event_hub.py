@@ -0,0 +1,165 @@
+import asyncio
+import itertools
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+from bird_detection.pipeline import BackpressurePolicy
+
+
+class Event:
+    """
+    A published event. The data is serialized once and shared by all subscribers.
+    """
+
+    def __init__(self, event_id: int, data: str, payload: Optional[dict] = None):
+        self.id = event_id
+        self.data = data
+        self.payload = payload or {}
+
+
+class Subscription:
+    """
+    The bounded queue of a single subscriber, which lives on the event loop
+    of the subscriber
+    """
+
+    def __init__(
+        self,
+        hub: "EventHub",
+        subscription_id: int,
+        loop: asyncio.AbstractEventLoop,
+        queue_size: int,
+        policy: BackpressurePolicy,
+    ):
+        self.hub = hub
+        self.id = subscription_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.policy = policy
+        self.dropped = 0
+
+    async def get(self) -> Event:
+        return await self.queue.get()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _put(self, event: Event):
+        """
+        Runs on the event loop of the subscriber
+        """
+        if self.queue.full():
+            self.dropped += 1
+            if self.policy == BackpressurePolicy.DROP_NEWEST:
+                return
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class EventHub:
+    """
+    Broadcasts events from the threads of the station to subscribers on asyncio
+    event loops. Each subscriber has its own bounded queue, so a slow subscriber only
+    drops its own events. Events are handed over to each event loop with a single
+    call_soon_threadsafe, which then fills the queues of all subscribers of the loop.
+    The most recent events are kept in a replay buffer, so reconnecting subscribers
+    can catch up on the events they missed.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 16,
+        policy: BackpressurePolicy = BackpressurePolicy.DROP_OLDEST,
+        replay_size: int = 64,
+    ):
+        if policy == BackpressurePolicy.BLOCK:
+            raise ValueError("Publishing must not block, use a drop policy")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.lock = threading.Lock()
+        # The subscriptions by their id, grouped by their event loop
+        self.subscriptions: Dict[asyncio.AbstractEventLoop, dict] = {}
+        self.subscription_ids = itertools.count()
+        self.event_ids = itertools.count(1)
+        self.published = 0
+        self.replay_buffer: deque = deque(maxlen=replay_size)
+
+    def subscribe(self, queue_size: Optional[int] = None) -> Subscription:
+        """
+        Subscribes to all further events. Needs to be called on the event loop
+        the events are consumed on.
+        """
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(
+            self,
+            next(self.subscription_ids),
+            loop,
+            queue_size or self.queue_size,
+            self.policy,
+        )
+        with self.lock:
+            self.subscriptions.setdefault(loop, {})[subscription.id] = subscription
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.lock:
+            loop_subscriptions = self.subscriptions.get(subscription.loop, {})
+            loop_subscriptions.pop(subscription.id, None)
+            if not loop_subscriptions:
+                self.subscriptions.pop(subscription.loop, None)
+
+    def publish(self, data: str, payload: Optional[dict] = None) -> Event:
+        """
+        Publishes an event to all subscribers. Can be called from any thread.
+        :param data: The serialized event
+        :param payload: The event before serialization, which subscribers may use to filter events
+        """
+        with self.lock:
+            event = Event(next(self.event_ids), data, payload)
+            self.published += 1
+            self.replay_buffer.append(event)
+            loops = list(self.subscriptions.keys())
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._deliver, loop, event)
+            except RuntimeError:
+                # The event loop was closed without unsubscribing
+                with self.lock:
+                    self.subscriptions.pop(loop, None)
+        return event
+
+    def replay(self, last_event_id: int) -> List[Event]:
+        """
+        :param last_event_id: The id of the last event the subscriber received
+        :return: The buffered events which were published after the given event
+        """
+        with self.lock:
+            return [event for event in self.replay_buffer if event.id > last_event_id]
+
+    def get_statistics(self) -> dict:
+        with self.lock:
+            subscriptions = [
+                subscription
+                for loop_subscriptions in self.subscriptions.values()
+                for subscription in loop_subscriptions.values()
+            ]
+        return {
+            "published_events": self.published,
+            "subscribers": len(subscriptions),
+            "dropped_events": sum(
+                subscription.dropped for subscription in subscriptions
+            ),
+        }
+
+    def _deliver(self, loop: asyncio.AbstractEventLoop, event: Event):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(loop, {}).values())
+        for subscription in subscriptions:
+            subscription._put(event)
@@ -1,12 +1,14 @@
+import threading
 import time
 import logging
 from abc import ABC, abstractmethod
 from typing import Optional
 
-import pynmea2  # type: ignore
 from serial import Serial  # type: ignore
 from serial.serialutil import SerialException  # type: ignore
 
+from bird_detection.gps.nmea_parser import parse_fix
+
 
 class Location:
     def __init__(self, lat: str, lon: str):
@@ -14,6 +16,29 @@ class Location:
         self.lon = lon
 
 
+class Fix:
+    """
+    A location read from the GPS sensor
+    """
+
+    def __init__(self, location: Location, quality: int):
+        """
+        :param quality: The fix quality of the GGA sentence, e.g. 1 for GPS and 2 for DGPS.
+        RMC sentences only provide 1 for a valid fix
+        """
+        self.location = location
+        self.quality = quality
+        self.timestamp = time.time()
+        self.received = time.monotonic()
+
+    @property
+    def age(self) -> float:
+        """
+        :return: The seconds since the fix was read
+        """
+        return time.monotonic() - self.received
+
+
 class SerialPortConfig:
     def __init__(
         self, path: str = "/dev/serial0", baud_rate: int = 9600, timeout: float = 0.5
@@ -41,38 +66,80 @@ class LocationServiceInterface(ABC):
         """
         pass
 
+    def get_fix(self) -> Optional[Fix]:
+        """
+        :return: The latest fix of the GPS sensor, None if there was no fix yet
+        """
+        return None
+
+    def close(self):
+        """
+        Stops reading the GPS sensor
+        """
+        pass
+
 
 class LocationService(LocationServiceInterface):
-    NMEA_SENTENCE_GPGGA = "GPGGA"
+    """
+    Reads the GPS sensor continuously in a background thread. The latest fix is
+    replaced as a whole, so reading it never blocks and never sees a partial update.
+    If the sensor is not attached, the fallback coordinates are used.
+    """
 
     def __init__(
         self,
         gps_coordinates: Location = None,
         serial_port_config: SerialPortConfig = SerialPortConfig(),
         timeout: float = 0.5,
+        reconnect_delay: float = 5.0,
     ):
         self.gps_coordinates = gps_coordinates
         self.serial_port_config = serial_port_config
         self.timeout = timeout
+        self.reconnect_delay = reconnect_delay
+        self.fix: Optional[Fix] = None
+        self.condition = threading.Condition()
+        self.running = True
         self.serial_port = self.__init_GPS_senor()
-
-    def get_valid_location(self):
+        self.reader: Optional[threading.Thread] = None
         if self.is_GPS_sensor_attached():
-            new_gps_coordinates = self._try_to_read_location()
-            self.gps_coordinates = (
-                new_gps_coordinates
-                if new_gps_coordinates is not None
-                else self.gps_coordinates
+            self.reader = threading.Thread(
+                target=self._read_fixes, name="gps-reader", daemon=True
             )
+            self.reader.start()
         else:
             logging.warning(
                 "Default location value is used because no GPS-Sensor was initialized."
             )
-        return self.gps_coordinates
+
+    def get_valid_location(self):
+        fix = self.fix
+        return fix.location if fix is not None else self.gps_coordinates
+
+    def get_fix(self) -> Optional[Fix]:
+        return self.fix
+
+    def wait_for_fix(self, timeout: Optional[float] = None) -> Optional[Fix]:
+        """
+        Waits until the GPS sensor provided a fix
+        :return: The latest fix, None if there was no fix within the timeout
+        """
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.fix is not None or self.reader is None, timeout
+            )
+            return self.fix
 
     def is_GPS_sensor_attached(self) -> bool:
         return self.serial_port is not None and self.serial_port.isOpen()
 
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.reader:
+            self.reader.join()
+
     def __init_GPS_senor(self) -> Serial:
         serial_port = None
         try:
@@ -86,27 +153,34 @@ class LocationService(LocationServiceInterface):
 
         return serial_port
 
-    def _try_to_read_location(self) -> Optional[Location]:
-        valid = False
-        next_timeout = time.time() + self.timeout
-        new_gps_coordinates = None
-        while not valid and next_timeout > time.time():
-            line = self.serial_port.readline()
-            coordinates = self._parseGPS(line)
-            if coordinates:
-                new_gps_coordinates = coordinates
-                valid = True
-        return new_gps_coordinates
-
-    def _parseGPS(self, line: bytes):
-        try:
-            str_line = line.decode("UTF-8")
-            if LocationService.NMEA_SENTENCE_GPGGA in str_line:
-                msg = pynmea2.parse(str_line)
-                if msg.latitude != 0.0 and msg.longitude != 0.0:
-                    return Location(str(msg.latitude), str(msg.longitude))
-        except:
-            logging.warning(f"Could not parse GPS data {bytes}")
+    def _read_fixes(self):
+        while self.running:
+            try:
+                line = self.serial_port.readline()
+            except SerialException as e:
+                logging.warning(f"Could not read the GPS-Sensor: {e}")
+                self._reconnect()
+                continue
+            fix = self._parseGPS(line)
+            if fix:
+                with self.condition:
+                    self.fix = fix
+                    self.gps_coordinates = fix.location
+                    self.condition.notify_all()
+
+    def _reconnect(self):
+        with self.condition:
+            self.condition.wait_for(lambda: not self.running, self.reconnect_delay)
+        if self.running:
+            serial_port = self.__init_GPS_senor()
+            if serial_port is not None:
+                self.serial_port = serial_port
+
+    def _parseGPS(self, line: bytes) -> Optional[Fix]:
+        nmea_fix = parse_fix(line)
+        if nmea_fix is None:
             return None
-
-        return None
+        lat, lon, quality = nmea_fix
+        if lat == 0.0 or lon == 0.0:
+            return None
+        return Fix(Location(str(lat), str(lon)), quality)
@@ -0,0 +1,87 @@
+from typing import Optional, Tuple
+
+# GPS, GLONASS, Galileo, BeiDou and the combined fix of multi-GNSS modules
+TALKERS = [b"GP", b"GL", b"GA", b"GB", b"BD", b"GN"]
+SENTENCES = [b"GGA", b"RMC"]
+SENTENCE_IDS = {talker + sentence for talker in TALKERS for sentence in SENTENCES}
+
+# The latitude, the longitude and the fix quality of the GGA sentence
+NMEAFix = Tuple[float, float, int]
+
+
+def is_position_sentence(line: bytes, start: int = 0) -> bool:
+    """
+    Checks the sentence id, e.g. $GNGGA, without decoding the line
+    """
+    return line[start + 1 : start + 6] in SENTENCE_IDS
+
+
+def has_valid_checksum(line: bytes, start: int, star: int) -> bool:
+    """
+    :param start: The offset of the $ which starts the sentence
+    :param star: The offset of the * which precedes the checksum
+    """
+    try:
+        expected = int(line[star + 1 : star + 3], 16)
+    except ValueError:
+        return False
+    return xor_bytes(line[start + 1 : star]) == expected
+
+
+def xor_bytes(data: bytes) -> int:
+    """
+    XORs all bytes by folding the data as one integer, which needs about log2(n)
+    integer operations instead of a loop over every byte
+    """
+    value = int.from_bytes(data, "little")
+    width = len(data)
+    while width > 1:
+        width = (width + 1) // 2
+        value = (value & ((1 << (width * 8)) - 1)) ^ (value >> (width * 8))
+    return value
+
+
+def parse_coordinate(value: bytes, hemisphere: bytes) -> float:
+    """
+    Converts a coordinate in degrees and decimal minutes, e.g. 5333.887 or 01000.399,
+    to decimal degrees
+    """
+    minutes_start = value.index(b".") - 2
+    degrees = float(value[:minutes_start]) + float(value[minutes_start:]) / 60
+    return -degrees if hemisphere in (b"S", b"W") else degrees
+
+
+def parse_fix(line: bytes) -> Optional[NMEAFix]:
+    """
+    Parses the position of a GGA or an RMC sentence of any supported talker.
+    Other sentences are skipped by their id and sentences with a wrong checksum are
+    skipped before their fields are split.
+    :param line: A raw line read from the GPS sensor
+    :return: The latitude, the longitude and the fix quality,
+    or None if the line does not contain a valid fix
+    """
+    start = 0 if line[:1] == b"$" else line.find(b"$")
+    if start < 0 or not is_position_sentence(line, start):
+        return None
+    star = line.find(b"*", start)
+    if star < 0 or not has_valid_checksum(line, start, star):
+        return None
+
+    fields = line[start + 1 : star].split(b",")
+    try:
+        if fields[0][2:] == b"GGA":
+            quality = int(fields[6] or 0)
+            lat, lat_hemisphere, lon, lon_hemisphere = fields[2:6]
+        else:
+            # RMC only tells whether the fix is valid
+            quality = 1 if fields[2] == b"A" else 0
+            lat, lat_hemisphere, lon, lon_hemisphere = fields[3:7]
+        if quality == 0 or not lat or not lon:
+            return None
+        return (
+            parse_coordinate(lat, lat_hemisphere),
+            parse_coordinate(lon, lon_hemisphere),
+            quality,
+        )
+    except (IndexError, ValueError):
+        return None
@@ -0,0 +1,277 @@
+import asyncio
+import json
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine, Optional, Tuple
+
+import aiohttp  # type: ignore
+import numpy as np  # type: ignore
+
+from bird_detection.audio.encoder import WAV_CONTENT_TYPE, encode_wav
+from bird_detection.http.rest_client import (
+    AudioData,
+    ContentNegotiation,
+    RestClientInterface,
+)
+from bird_detection.http.session_pool import HTTPSettings
+
+
+class AsyncHTTPClient:
+    """
+    Base class of the HTTP clients which run their requests on an asyncio event loop.
+    The loop of the server is used if one is attached, otherwise the client
+    starts its own loop in a background thread. A semaphore limits the number
+    of concurrent requests. shutdown closes the HTTP client and stops the own loop.
+    """
+
+    def __init__(
+        self,
+        settings: Optional[HTTPSettings] = None,
+        max_concurrent_requests: int = 8,
+    ):
+        self.settings = settings or HTTPSettings()
+        self.max_concurrent_requests = max_concurrent_requests
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.own_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_lock = threading.Lock()
+        self.client: Optional[aiohttp.ClientSession] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.active_requests = 0
+        self.max_active_requests = 0
+
+    def attach_event_loop(self, loop: asyncio.AbstractEventLoop):
+        """
+        Runs all further requests on the given event loop
+        """
+        self.loop = loop
+
+    def run(self, coroutine: Coroutine) -> Future:
+        """
+        Schedules a coroutine on the event loop of the client
+        :return: A future which can be awaited from any thread
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop())
+
+    def run_and_wait(self, coroutine: Coroutine) -> Any:
+        """
+        Runs a coroutine on the event loop of the client and waits for its result
+        :raises RuntimeError: If it is called on the event loop of the client, which
+        would wait for itself. Coroutines on that loop await the coroutine instead.
+        """
+        loop = self._get_loop()
+        try:
+            running_loop: Optional[
+                asyncio.AbstractEventLoop
+            ] = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is loop:
+            coroutine.close()
+            raise RuntimeError(
+                "Blocking calls are not allowed on the event loop of the client"
+            )
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        create_data: Optional[Callable[[], Any]] = None,
+    ) -> Tuple[int, bytes]:
+        """
+        Executes a request with the configured timeouts and retries
+        :param create_data: Creates the request body, a new body is created for every attempt
+        :return: The status code and the body of the response
+        :raises aiohttp.ClientError: If the request still fails after the last retry
+        :raises asyncio.TimeoutError: If the last retry timed out
+        """
+        client, semaphore = self._get_client()
+        attempt = 0
+        async with semaphore:
+            self.active_requests += 1
+            self.max_active_requests = max(
+                self.max_active_requests, self.active_requests
+            )
+            try:
+                while True:
+                    self.requests += 1
+                    try:
+                        data = create_data() if create_data else None
+                        async with client.request(method, url, data=data) as response:
+                            body = await response.read()
+                        if not self.settings.should_retry(response.status, attempt):
+                            return response.status, body
+                        logging.warning(f"{method} {url} returned {response.status}")
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        if attempt >= self.settings.retries:
+                            self.failures += 1
+                            raise e
+                        logging.warning(f"{method} {url} failed: {e!r}")
+
+                    await asyncio.sleep(self.settings.get_backoff(attempt))
+                    attempt += 1
+                    self.retries += 1
+            finally:
+                self.active_requests -= 1
+
+    def get_statistics(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "active_requests": self.active_requests,
+            "max_active_requests": self.max_active_requests,
+            "max_concurrent_requests": self.max_concurrent_requests,
+        }
+
+    async def shutdown(self):
+        """
+        Closes the HTTP client and stops the loop the client started itself.
+        Further requests open a new client.
+        """
+        client, client_loop = self.client, self.client_loop
+        self.client = None
+        self.client_loop = None
+        if client is not None:
+            await self._close_client(client, client_loop)
+        with self.loop_lock:
+            own_loop, self.own_loop = self.own_loop, None
+            if own_loop is self.loop:
+                self.loop = None
+        if own_loop is not None:
+            own_loop.call_soon_threadsafe(own_loop.stop)
+
+    @staticmethod
+    async def _close_client(
+        client: aiohttp.ClientSession, loop: Optional[asyncio.AbstractEventLoop]
+    ):
+        """
+        Closes a client on the loop it was created on
+        """
+        if loop is asyncio.get_running_loop():
+            await client.close()
+        elif loop is not None and loop.is_running():
+            await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(client.close(), loop)
+            )
+
+    def _get_client(self):
+        """
+        The HTTP client and the semaphore are bound to the loop they are created on,
+        so they are created on the first request on the current loop.
+        The client of the previous loop is closed.
+        """
+        loop = asyncio.get_running_loop()
+        if self.client is None or self.client_loop is not loop:
+            if self.client is not None and self.client_loop.is_running():
+                asyncio.run_coroutine_threadsafe(self.client.close(), self.client_loop)
+            self.client = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=self.settings.connect_timeout,
+                    sock_read=self.settings.read_timeout,
+                ),
+                connector=aiohttp.TCPConnector(limit=self.max_concurrent_requests),
+            )
+            self.semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+            self.client_loop = loop
+        return self.client, self.semaphore
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self.loop_lock:
+            if self.loop is None or self.loop.is_closed():
+                self.loop = asyncio.new_event_loop()
+                self.own_loop = self.loop
+                threading.Thread(
+                    target=self._run_loop,
+                    args=(self.loop,),
+                    name="http-client",
+                    daemon=True,
+                ).start()
+            return self.loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop):
+        loop.run_forever()
+        loop.close()
+
+
+class AsyncRestClient(AsyncHTTPClient, RestClientInterface):
+    """
+    Sends recordings to the classification service without blocking a thread
+    per request. Many recordings can be classified at once on one event loop.
+    """
+
+    def __init__(
+        self,
+        classifier_url: str,
+        sample_rate: int = 48000,
+        settings: Optional[HTTPSettings] = None,
+        max_concurrent_requests: int = 8,
+    ):
+        super().__init__(settings, max_concurrent_requests)
+        self.classifier_url = classifier_url
+        self.sample_rate = sample_rate
+        self.negotiation = ContentNegotiation()
+
+    def post_wav(
+        self,
+        file_name: str,
+        data: Optional[AudioData] = None,
+        content_type: str = WAV_CONTENT_TYPE,
+    ) -> Any:
+        return self.run_and_wait(self.post_wav_async(file_name, data, content_type))
+
+    def submit(
+        self,
+        file_name: str,
+        data: Optional[AudioData] = None,
+        content_type: str = WAV_CONTENT_TYPE,
+    ) -> Future:
+        return self.run(self.post_wav_async(file_name, data, content_type))
+
+    async def post_wav_async(
+        self,
+        file_name: str,
+        data: Optional[AudioData] = None,
+        content_type: str = WAV_CONTENT_TYPE,
+    ) -> Optional[dict]:
+        """
+        Sends a recording to the classification service
+        :param file_name: The filename of the recording
+        :param data: The recording in memory, otherwise the recording is read from the data directory
+        :param content_type: The content type of the encoded recording
+        :return: The result of the classification service
+        """
+        if data is None:
+            with open("data/" + file_name, "rb") as wav_file:
+                data = wav_file.read()
+        elif isinstance(data, np.ndarray):
+            data = encode_wav(data, self.sample_rate)
+
+        data, content_type = self.negotiation.prepare(data, content_type)
+        recording = bytes(data)
+
+        def create_form() -> aiohttp.FormData:
+            form = aiohttp.FormData()
+            form.add_field(
+                "wave", recording, filename=file_name, content_type=content_type
+            )
+            return form
+
+        status, body = await self.request(
+            "POST", self.classifier_url + "/actions/analyse", create_form
+        )
+        if status == 415 and self.negotiation.reject(content_type):
+            return await self.post_wav_async(file_name, recording, content_type)
+        prediction = None
+        if status == 200:
+            response = json.loads(body)
+            if response["Result"]:
+                prediction = response
+        return prediction
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+from bird_detection.audio.encoder import WAV_CONTENT_TYPE, encode_wav
+from bird_detection.http.rest_client import (
+    AudioData,
+    ContentNegotiation,
+    RestClientInterface,
+)
+from bird_detection.http.session_pool import SessionPool
+
+
+class BatchingRestClient(RestClientInterface):
+    """
+    Collects recordings and sends them to the classification service in one request.
+    A batch is sent as soon as it holds batch_size recordings or its oldest recording
+    waited for batch_wait seconds. The classification service answers with the result
+    of each recording, which is mapped back to the recording by its file name.
+    Recordings which were not sent when the client is closed fail.
+    """
+
+    def __init__(
+        self,
+        classifier_url: str,
+        sample_rate: int = 48000,
+        session_pool: Optional[SessionPool] = None,
+        batch_size: int = 8,
+        batch_wait: float = 0.25,
+    ):
+        self.classifier_url = classifier_url
+        self.sample_rate = sample_rate
+        self.session_pool = session_pool or SessionPool()
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+
+        self.negotiation = ContentNegotiation()
+        # The recordings with the time they were submitted, the oldest first
+        self.pending: List[Tuple[str, bytes, str, Future, float]] = []
+        self.condition = threading.Condition()
+        self.closed = False
+        self.batches = 0
+        self.batched_recordings = 0
+        self.thread = threading.Thread(
+            target=self._send_batches, name="batching", daemon=True
+        )
+        self.thread.start()
+
+    def post_wav(
+        self,
+        file_name: str,
+        data: Optional[AudioData] = None,
+        content_type: str = WAV_CONTENT_TYPE,
+    ) -> Any:
+        return self.submit(file_name, data, content_type).result()
+
+    def submit(
+        self,
+        file_name: str,
+        data: Optional[AudioData] = None,
+        content_type: str = WAV_CONTENT_TYPE,
+    ) -> Future:
+        if data is None:
+            with open("data/" + file_name, "rb") as wav_file:
+                data = wav_file.read()
+        elif isinstance(data, np.ndarray):
+            data = encode_wav(data, self.sample_rate)
+
+        future: Future = Future()
+        with self.condition:
+            if self.closed:
+                future.set_exception(RuntimeError("The batching client is closed"))
+                return future
+            self.pending.append(
+                (file_name, bytes(data), content_type, future, time.monotonic())
+            )
+            self.condition.notify()
+        return future
+
+    def close(self, timeout: float = 5):
+        """
+        Stops sending batches and fails the recordings which were not sent
+        :param timeout: The maximum time in seconds to wait for a batch being sent
+        """
+        with self.condition:
+            self.closed = True
+            pending = self.pending
+            self.pending = []
+            self.condition.notify()
+        for _, _, _, future, _ in pending:
+            future.set_exception(RuntimeError("The batching client was closed"))
+        self.thread.join(timeout)
+
+    async def shutdown(self):
+        # Waiting for a batch being sent would block the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    def get_statistics(self) -> dict:
+        statistics = self.session_pool.get_statistics()
+        statistics["batches"] = self.batches
+        statistics["average_batch_size"] = (
+            self.batched_recordings / self.batches if self.batches else 0
+        )
+        return statistics
+
+    def _send_batches(self):
+        while True:
+            with self.condition:
+                while not self.closed and not self._is_batch_ready():
+                    timeout = None
+                    if self.pending:
+                        timeout = max(self._get_deadline() - time.monotonic(), 0)
+                    self.condition.wait(timeout)
+                if self.closed:
+                    return
+                batch = self.pending[: self.batch_size]
+                self.pending = self.pending[self.batch_size :]
+
+            try:
+                self._send_batch(batch)
+            except Exception as e:
+                logging.warning(f"Could not classify a batch of recordings: {e}")
+                for _, _, _, future, _ in batch:
+                    future.set_exception(e)
+
+    def _is_batch_ready(self) -> bool:
+        return len(self.pending) >= self.batch_size or (
+            len(self.pending) > 0 and time.monotonic() >= self._get_deadline()
+        )
+
+    def _get_deadline(self) -> float:
+        """
+        Recordings which were left over from a full batch keep their own deadline
+        :return: The time by which the oldest pending recording has to be sent
+        """
+        return self.pending[0][4] + self.batch_wait
+
+    def _send_batch(self, batch: List[Tuple[str, bytes, str, Future, float]]):
+        files = []
+        for file_name, data, content_type, _, _ in batch:
+            files.append(
+                ("wave", (file_name, *self.negotiation.prepare(data, content_type)))
+            )
+        post_url = self.classifier_url + "/actions/analyse_batch"
+        req = self.session_pool.post(post_url, files=files)
+        if req.status_code == 415:
+            rejected = [
+                self.negotiation.reject(content_type)
+                for _, (_, _, content_type) in files
+            ]
+            if any(rejected):
+                return self._send_batch(batch)
+        results = req.json()["Results"] if req.status_code == 200 else {}
+
+        self.batches += 1
+        self.batched_recordings += len(batch)
+        for file_name, _, _, future, _ in batch:
+            result = results.get(file_name)
+            future.set_result({"Result": result} if result else None)
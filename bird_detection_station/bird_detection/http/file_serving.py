@@ -0,0 +1,256 @@
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterator, Mapping, Optional, Tuple
+
+from starlette.responses import Response, StreamingResponse
+
+from bird_detection.audio.encoder import content_type_of
+from bird_detection.config import Config
+
+READ_CHUNK_SIZE = 64 * 1024
+MAX_RENDITIONS = 4096
+
+# Clips are written once and never change, so clients may keep them
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """
+    A strong ETag of a file which is never modified after it was written
+    """
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single byte range, e.g. bytes=0-1023, bytes=1024- or bytes=-1024
+    :return: The first and the last byte of the range, None if the whole file
+    is requested. Multiple ranges are answered with the whole file.
+    :raises RangeNotSatisfiable: If the range starts after the end of the file
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_value, _, end_value = header[len("bytes=") :].strip().partition("-")
+    try:
+        if not start_value:
+            suffix = int(end_value)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - suffix, 0), size - 1
+        start = int(start_value)
+        end = int(end_value) if end_value else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, mtime: float) -> bool:
+    """
+    Evaluates If-None-Match, or If-Modified-Since if there is no If-None-Match
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or "W/" + etag in tags
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def is_range_current(headers: Mapping[str, str], etag: str, last_modified: str) -> bool:
+    """
+    A range only applies if the If-Range header still matches the file
+    """
+    if_range = headers.get("if-range")
+    return if_range is None or if_range in (etag, last_modified)
+
+
+def read_file(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(READ_CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+
+class CompressedClipCache:
+    """
+    Keeps gzip compressed renditions of recently requested clips in memory,
+    up to max_bytes. Clips which do not get smaller by at least 10 % are remembered
+    as incompressible, so they are not compressed again.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.renditions: OrderedDict = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, etag: str) -> Optional[bytes]:
+        """
+        :return: The compressed clip, or None if compressing it does not pay off
+        """
+        key = (path, etag)
+        with self.lock:
+            if key in self.renditions:
+                self.hits += 1
+                self.renditions.move_to_end(key)
+                return self.renditions[key]
+            self.misses += 1
+
+        with open(path, "rb") as file:
+            data = file.read()
+        compressed_data = gzip.compress(data, compresslevel=6, mtime=0)
+        compressed = None
+        if len(compressed_data) <= len(data) * 0.9:
+            compressed = compressed_data
+
+        with self.lock:
+            if key not in self.renditions:
+                self.renditions[key] = compressed
+                self.size += len(compressed or b"")
+                while self.renditions and (
+                    self.size > self.max_bytes or len(self.renditions) > MAX_RENDITIONS
+                ):
+                    _, evicted = self.renditions.popitem(last=False)
+                    self.size -= len(evicted or b"")
+        return compressed
+
+    def get_statistics(self) -> dict:
+        return {
+            "renditions": len(self.renditions),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class FileServer:
+    """
+    Serves the clips of a directory with strong ETags, Last-Modified, conditional
+    GET and single byte ranges, so players can seek and refresh without downloading
+    the clip again. If a compressed clip cache is given, clients which accept gzip
+    and request the whole clip get a cached compressed rendition,
+    which has its own ETag.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_file_server():
+        if not FileServer.instance:
+            cache_size = Config.get_config().compressed_clip_cache
+            FileServer.instance = FileServer(
+                "data",
+                CompressedClipCache(cache_size * 1024 * 1024) if cache_size else None,
+            )
+        return FileServer.instance
+
+    def __init__(
+        self,
+        directory: str = "data",
+        compressed_cache: Optional[CompressedClipCache] = None,
+    ):
+        self.directory = directory
+        self.compressed_cache = compressed_cache
+
+    def serve(self, file_name: str, headers: Mapping[str, str]) -> Optional[Response]:
+        """
+        :param headers: The request headers with lower case names
+        :return: The response, or None if the file does not exist
+        """
+        path = os.path.join(self.directory, file_name)
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+
+        etag = file_etag(stat)
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        response_headers = {
+            "Accept-Ranges": "bytes",
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+            "Last-Modified": last_modified,
+        }
+
+        compressed = None
+        if self.compressed_cache and self._accepts_gzip(headers):
+            compressed = self.compressed_cache.get(path, etag)
+        if self.compressed_cache:
+            response_headers["Vary"] = "Accept-Encoding"
+        if compressed is not None:
+            etag = etag[:-1] + '-gzip"'
+            response_headers["Content-Encoding"] = "gzip"
+        response_headers["ETag"] = etag
+
+        if is_not_modified(headers, etag, stat.st_mtime):
+            return Response(status_code=304, headers=response_headers)
+
+        size = len(compressed) if compressed is not None else stat.st_size
+        byte_range = None
+        if is_range_current(headers, etag, last_modified):
+            try:
+                byte_range = parse_range(headers.get("range"), size)
+            except RangeNotSatisfiable:
+                response_headers["Content-Range"] = f"bytes */{size}"
+                return Response(status_code=416, headers=response_headers)
+
+        status_code = 200
+        start, end = 0, size - 1
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response_headers["Content-Length"] = str(end - start + 1)
+
+        media_type = content_type_of(file_name)
+        if compressed is not None:
+            return Response(
+                compressed[start : end + 1],
+                status_code=status_code,
+                headers=response_headers,
+                media_type=media_type,
+            )
+        return StreamingResponse(
+            read_file(path, start, end),
+            status_code=status_code,
+            headers=response_headers,
+            media_type=media_type,
+        )
+
+    @staticmethod
+    def _accepts_gzip(headers: Mapping[str, str]) -> bool:
+        """
+        Range requests of players which seek are answered with the uncompressed clip
+        """
+        accept_encoding = headers.get("accept-encoding", "").replace(" ", "")
+        return (
+            "gzip" in accept_encoding
+            and "gzip;q=0," not in accept_encoding + ","
+            and "range" not in headers
+        )
+
+    def get_statistics(self) -> dict:
+        if self.compressed_cache is None:
+            return {}
+        return {"compressed_clips": self.compressed_cache.get_statistics()}
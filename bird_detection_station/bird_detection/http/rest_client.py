@@ -1,29 +1,145 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any
+from concurrent.futures import Future
+from typing import Any, Optional, Set, Tuple, Union
 
-import requests
+import numpy as np  # type: ignore
+
+from bird_detection.audio.encoder import (
+    WAV_CONTENT_TYPE,
+    encode_wav,
+    transcode_to_wav,
+)
+from bird_detection.http.session_pool import SessionPool
+
+AudioData = Union[np.ndarray, bytes, memoryview]
+
+
+class ContentNegotiation:
+    """
+    Remembers the content types the classification service rejected with
+    415 Unsupported Media Type. Recordings of a rejected type are converted to WAV
+    before they are sent, so only the first recording of a type needs a second request.
+    """
+
+    def __init__(self):
+        self.rejected_content_types: Set[str] = set()
+
+    def prepare(self, data: AudioData, content_type: str) -> Tuple[AudioData, str]:
+        """
+        :return: The recording and the content type it is sent with
+        """
+        if content_type in self.rejected_content_types:
+            return transcode_to_wav(data), WAV_CONTENT_TYPE
+        return data, content_type
+
+    def reject(self, content_type: str) -> bool:
+        """
+        Marks a content type as not supported by the classification service
+        :return: True if the recording can be sent again as WAV
+        """
+        if content_type == WAV_CONTENT_TYPE:
+            return False
+        self.rejected_content_types.add(content_type)
+        return True
 
 
 class RestClientInterface(ABC):
     @abstractmethod
-    def post_wav(self, file_name: str) -> Any:
+    def post_wav(
+        self,
+        file_name: str,
+        data: Optional[AudioData] = None,
+        content_type: str = WAV_CONTENT_TYPE,
+    ) -> Any:
+        """
+        Sends a recording to the classification service
+        :param file_name: The filename of the recording
+        :param data: The recording as numpy array or as encoded file in memory.
+        If no data is given the recording is read from the data directory
+        :param content_type: The content type of the encoded recording
+        :return: The result of the classification service
+        """
+        pass
+
+    def submit(
+        self,
+        file_name: str,
+        data: Optional[AudioData] = None,
+        content_type: str = WAV_CONTENT_TYPE,
+    ) -> Future:
+        """
+        Sends a recording to the classification service without waiting for the result.
+        Clients which are not asynchronous send the recording right away.
+        :return: A future of the result of the classification service
+        """
+        future: Future = Future()
+        try:
+            future.set_result(self.post_wav(file_name, data, content_type))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def attach_event_loop(self, loop: asyncio.AbstractEventLoop):
+        """
+        Provides the event loop of the server to clients which run on an event loop
+        """
         pass
 
+    async def shutdown(self):
+        """
+        Closes the connections of the client when the server shuts down
+        """
+        pass
+
+    def get_statistics(self) -> dict:
+        """
+        :return: Counters which describe the requests to the classification service
+        """
+        return {}
+
 
 class RestClient(RestClientInterface):
-    def __init__(self, classifier_url: str):
+    def __init__(
+        self,
+        classifier_url: str,
+        sample_rate: int = 48000,
+        session_pool: Optional[SessionPool] = None,
+    ):
         self.classifier_url = classifier_url
+        self.sample_rate = sample_rate
+        self.session_pool = session_pool or SessionPool()
+        self.negotiation = ContentNegotiation()
 
-    def post_wav(self, file_name: str):
+    def post_wav(
+        self,
+        file_name: str,
+        data: Optional[AudioData] = None,
+        content_type: str = WAV_CONTENT_TYPE,
+    ):
         """
         Execute a long polling request to the classification service
         :param file_name: The filename of the recording which should be sent to the classification service
+        :param data: The recording in memory, otherwise the recording is read from the data directory
+        :param content_type: The content type of the encoded recording
         :return: The result of the classification service
         """
-        files = {"wave": (file_name, open("data/" + file_name, "rb"), "audio/x-wav")}
+        if data is None:
+            with open("data/" + file_name, "rb") as wav_file:
+                data = wav_file.read()
+        elif isinstance(data, np.ndarray):
+            data = encode_wav(data, self.sample_rate)
+
+        data, content_type = self.negotiation.prepare(data, content_type)
+        files: dict = {"wave": (file_name, data, content_type)}
         post_url = self.classifier_url + "/actions/analyse"
-        req = requests.post(post_url, files=files)
+        req = self.session_pool.post(post_url, files=files)
+        if req.status_code == 415 and self.negotiation.reject(content_type):
+            return self.post_wav(file_name, data, content_type)
         prediction = None
         if req.status_code == 200 and req.json()["Result"]:
             prediction = req.json()
         return prediction
+
+    def get_statistics(self) -> dict:
+        return self.session_pool.get_statistics()
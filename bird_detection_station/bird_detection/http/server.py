@@ -1,14 +1,27 @@
-import os
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator, Iterator, List, Optional
 
-from fastapi import BackgroundTasks, FastAPI, Depends
-from fastapi.responses import FileResponse
+from fastapi import (
+    BackgroundTasks,
+    FastAPI,
+    Depends,
+    Header,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+)
+from fastapi.responses import StreamingResponse
+from starlette.websockets import WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 
 from bird_detection.bird_recorder_service import BirdRecorder
 from bird_detection.config import Config
+from bird_detection.event_hub import Event, EventHub, Subscription
+from bird_detection.http.file_serving import FileServer
 from bird_detection.thing_description import ThingDescription
 
-
 app = FastAPI()
 
 origins = [
@@ -24,6 +37,16 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def attach_event_loop():
+    BirdRecorder.get_bird_recorder().attach_event_loop(asyncio.get_running_loop())
+
+
+@app.on_event("shutdown")
+async def shutdown_clients():
+    await BirdRecorder.get_bird_recorder().shutdown()
+
+
 @app.get("/")
 async def root(config: Config = Depends(Config.get_config)):
     td = ThingDescription(
@@ -39,11 +62,78 @@ async def get_recording(
     return bird_recorder.recording
 
 
+def format_time(time: Optional[datetime]) -> Optional[str]:
+    """
+    Formats a time like the Time of the predictions, so both can be compared
+    """
+    return str(time.replace(tzinfo=None)) if time else None
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_CHUNK_SIZE = 256
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def to_ndjson(predictions: Iterator[str]) -> Iterator[str]:
+    """
+    Joins the serialized predictions to chunks of newline-delimited JSON
+    """
+    chunk = []
+    for prediction in predictions:
+        chunk.append(prediction)
+        if len(chunk) >= NDJSON_CHUNK_SIZE:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
 @app.get("/properties/predictions")
-async def get_predictions(
+def get_predictions(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    species: Optional[str] = None,
+    newest_first: bool = False,
+    format: Optional[str] = None,
+    accept: Optional[str] = Header(None),
     bird_recorder: BirdRecorder = Depends(BirdRecorder.get_bird_recorder),
 ):
-    return bird_recorder.recordings
+    if format == "ndjson" or (accept and NDJSON_MEDIA_TYPE in accept):
+        # The generator is iterated in the thread pool, the event loop stays responsive
+        return StreamingResponse(
+            to_ndjson(
+                bird_recorder.prediction_store.stream(
+                    format_time(since), format_time(until), species, limit
+                )
+            ),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
+
+    # Without a limit or cursor all predictions are returned, like before the pages
+    paged = limit is not None or cursor is not None
+    page_size = (
+        min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE) if paged else MAX_PAGE_SIZE
+    )
+    predictions: List[dict] = []
+    while True:
+        page, cursor = bird_recorder.prediction_store.query(
+            cursor,
+            page_size,
+            format_time(since),
+            format_time(until),
+            species,
+            newest_first,
+        )
+        predictions += page
+        if paged or not cursor:
+            break
+    if paged and cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    return predictions
 
 
 @app.get("/properties/duration")
@@ -61,22 +151,39 @@ async def set_duration(
     return bird_recorder.duration
 
 
+@app.get("/properties/statistics")
+async def get_statistics(
+    bird_recorder: BirdRecorder = Depends(BirdRecorder.get_bird_recorder),
+):
+    statistics = bird_recorder.get_statistics()
+    statistics["files"] = FileServer.get_file_server().get_statistics()
+    return statistics
+
+
 @app.get("/properties/location")
 async def get_location(
     bird_recorder: BirdRecorder = Depends(BirdRecorder.get_bird_recorder),
 ):
     location_service = bird_recorder.location_service
-    location = location_service.get_valid_location()
-    return vars(location)
+    location = dict(vars(location_service.get_valid_location()))
+    fix = location_service.get_fix()
+    if fix is not None:
+        location["time"] = datetime.fromtimestamp(fix.timestamp).isoformat()
+        location["age"] = round(fix.age, 3)
+        location["quality"] = fix.quality
+    return location
 
 
 @app.get("/actions/files/{file_name}")
-async def get_file(file_name: str):
-    path = "data/" + file_name
-    if os.path.isfile(path):
-        return FileResponse(path)
-    else:
+def get_file(
+    file_name: str,
+    request: Request,
+    file_server: FileServer = Depends(FileServer.get_file_server),
+):
+    response = file_server.serve(file_name, request.headers)
+    if response is None:
         return {"message": f"The queried file {file_name} does not exist"}
+    return response
 
 
 @app.post("/actions/toggle_recording")
@@ -89,7 +196,7 @@ async def toggle_recording(
         background_tasks.add_task(bird_recorder.start_recording)
     else:
         bird_recorder.recording = False
-        bird_recorder.stop_recording()
+        background_tasks.add_task(bird_recorder.stop_recording)
     return {"message": f"Toggle recording to {bird_recorder.recording}"}
 
 
@@ -98,3 +205,114 @@ async def bird_detection(
     bird_recorder: BirdRecorder = Depends(BirdRecorder.get_bird_recorder),
 ):
     return {"Bird": await bird_recorder.bird_event()}
+
+
+SSE_KEEP_ALIVE_SECONDS = 15
+
+
+def matches_event(
+    event: Event, species: Optional[str], min_confidence: Optional[float]
+) -> bool:
+    """
+    :return: True if a result of the bird event matches the species and the minimum confidence
+    """
+    if species is None and min_confidence is None:
+        return True
+    return any(
+        (
+            species is None
+            or str(result.get("Common Name", "")).lower() == species.lower()
+        )
+        and (min_confidence is None or result.get("Confidence", 0) >= min_confidence)
+        for result in event.payload.get("Result", [])
+    )
+
+
+async def bird_events(
+    event_hub: EventHub,
+    subscription: Subscription,
+    last_event_id: Optional[int],
+    species: Optional[str],
+    min_confidence: Optional[float],
+    keep_alive: Optional[float] = None,
+) -> AsyncIterator[Optional[Event]]:
+    """
+    Yields the missed events of the replay buffer followed by the new events.
+    None is yielded if no event arrived within keep_alive seconds.
+    """
+    newest_event_id = 0
+    if last_event_id is not None:
+        for event in event_hub.replay(last_event_id):
+            newest_event_id = event.id
+            if matches_event(event, species, min_confidence):
+                yield event
+    while True:
+        try:
+            event = await asyncio.wait_for(subscription.get(), keep_alive)
+        except asyncio.TimeoutError:
+            yield None
+            continue
+        # Events which were published while replaying are already sent
+        if event.id > newest_event_id and matches_event(event, species, min_confidence):
+            yield event
+
+
+@app.get("/events/bird_detection/sse")
+async def bird_detection_sse(
+    request: Request,
+    species: Optional[str] = None,
+    min_confidence: Optional[float] = None,
+    last_event_id: Optional[int] = Header(None),
+    bird_recorder: BirdRecorder = Depends(BirdRecorder.get_bird_recorder),
+):
+    event_hub = bird_recorder.event_hub
+
+    async def stream() -> AsyncIterator[str]:
+        with event_hub.subscribe() as subscription:
+            async for event in bird_events(
+                event_hub,
+                subscription,
+                last_event_id,
+                species,
+                min_confidence,
+                SSE_KEEP_ALIVE_SECONDS,
+            ):
+                if event is None:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"id: {event.id}\nevent: bird_detection\ndata: {event.data}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.websocket("/events/bird_detection/ws")
+async def bird_detection_websocket(
+    websocket: WebSocket,
+    species: Optional[str] = None,
+    min_confidence: Optional[float] = None,
+    last_event_id: Optional[int] = None,
+):
+    event_hub = BirdRecorder.get_bird_recorder().event_hub
+    await websocket.accept()
+
+    async def send_events(subscription: Subscription):
+        async for event in bird_events(
+            event_hub, subscription, last_event_id, species, min_confidence
+        ):
+            if event is not None:
+                # The event is already serialized, so it is embedded without parsing it again
+                await websocket.send_text(f'{{"id": {event.id}, "Bird": {event.data}}}')
+
+    with event_hub.subscribe() as subscription:
+        sender = asyncio.ensure_future(send_events(subscription))
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sender.cancel()
@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Responses of overloaded or restarting services, which are worth another attempt
+RETRY_STATUS_CODES = {502, 503, 504}
+
+
+class HTTPSettings:
+    def __init__(
+        self,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        backoff_max: float = 10,
+        pool_size: int = 4,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size
+
+    def should_retry(self, status_code: int, attempt: int) -> bool:
+        """
+        :param attempt: The number of the failed attempt, starting at 0
+        """
+        return status_code in RETRY_STATUS_CODES and attempt < self.retries
+
+    def get_backoff(self, attempt: int) -> float:
+        """
+        :return: The seconds to wait before the next attempt, which double
+        with every attempt up to backoff_max
+        """
+        return min(self.backoff_factor * pow(2, attempt), self.backoff_max)
+
+
+class SessionPool:
+    """
+    Shares keep-alive HTTP sessions between the clients of the station.
+    Every endpoint (scheme, host and port) gets its own session with a connection pool,
+    so consecutive requests reuse open connections instead of connecting again.
+    Failed requests are retried with a bounded exponential backoff.
+    """
+
+    def __init__(self, settings: Optional[HTTPSettings] = None):
+        self.settings = settings or HTTPSettings()
+        self.sessions: Dict[str, requests.Session] = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Executes a request with the configured timeouts and retries
+        :raises requests.RequestException: If the request still fails after the last retry
+        """
+        session = self._get_session(url)
+        kwargs.setdefault(
+            "timeout", (self.settings.connect_timeout, self.settings.read_timeout)
+        )
+        attempt = 0
+        while True:
+            self.requests += 1
+            try:
+                response = session.request(method, url, **kwargs)
+                if not self.settings.should_retry(response.status_code, attempt):
+                    return response
+                logging.warning(f"{method} {url} returned {response.status_code}")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.settings.retries:
+                    self.failures += 1
+                    raise e
+                logging.warning(f"{method} {url} failed: {e}")
+
+            time.sleep(self.settings.get_backoff(attempt))
+            attempt += 1
+            self.retries += 1
+
+    def get_statistics(self) -> dict:
+        """
+        :return: The number of requests, retries and failures as well as the number
+        of opened and reused connections per endpoint
+        """
+        endpoints = {}
+        for endpoint, session in list(self.sessions.items()):
+            connections = 0
+            pooled_requests = 0
+            pool_manager = session.get_adapter(endpoint).poolmanager  # type: ignore
+            for key in list(pool_manager.pools.keys()):
+                pool = pool_manager.pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+                    pooled_requests += pool.num_requests
+            endpoints[endpoint] = {
+                "requests": pooled_requests,
+                "connections": connections,
+                "reused_connections": max(pooled_requests - connections, 0),
+            }
+
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "endpoints": endpoints,
+        }
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions = {}
+
+    def _get_session(self, url: str) -> requests.Session:
+        url_parts = urlsplit(url)
+        endpoint = f"{url_parts.scheme}://{url_parts.netloc}"
+        with self.lock:
+            if endpoint not in self.sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.settings.pool_size
+                )
+                session.mount(endpoint, adapter)
+                self.sessions[endpoint] = session
+            return self.sessions[endpoint]
@@ -1,16 +1,36 @@
 import logging
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, List, Optional, Set
 
+import numpy as np  # type: ignore
 import paho.mqtt.client as mqtt  # type: ignore
 
 import ssl
 
+from bird_detection.config import Config
+from bird_detection.mqtt.outbox import MQTTOutbox, OutboxMessage
+
 
 class MQTTServiceInterface(ABC):
     @abstractmethod
     def publish(self, topic, payload):
         pass
 
+    def get_statistics(self) -> dict:
+        """
+        :return: Counters of the delivery, e.g. the number of waiting messages
+        """
+        return {}
+
+    def close(self):
+        """
+        Stops publishing, messages which were not delivered stay in the outbox
+        """
+        pass
+
 
 class MQTTSSLConfig:
     def __init__(
@@ -38,37 +58,220 @@ def ssl_alpn(mqtt_ssl_config: MQTTSSLConfig):
 
 
 class MQTTService(MQTTServiceInterface):
+    """
+    Publishes messages through a durable outbox. publish only stores the message,
+    a sender thread drains the outbox in batches while the broker is connected.
+    At most max_inflight messages wait for their acknowledgement and at most
+    rate_limit messages are sent per second. A message is removed from the outbox once
+    the broker acknowledged it, so messages published while the broker is unreachable
+    are delivered after the client reconnected, at least once.
+    """
+
     def __init__(
         self,
         mqtt_broker: str,
         mqtt_server_port: int,
         use_ssl: bool = False,
         mqtt_ssl_config: MQTTSSLConfig = MQTTSSLConfig(),
+        outbox: Optional[MQTTOutbox] = None,
+        qos: int = 1,
+        max_inflight: int = 20,
+        batch_size: int = 50,
+        rate_limit: float = 0,
+        client: Optional[mqtt.Client] = None,
     ):
+        if outbox is None:
+            config = Config.get_config()
+            outbox = MQTTOutbox(config.mqtt_outbox_file, config.mqtt_outbox_size)
+        self.outbox = outbox
+        self.qos = qos
+        self.max_inflight = max_inflight
+        self.batch_size = batch_size
+        self.rate_limit = rate_limit
+
+        self.condition = threading.Condition()
+        self.connected = False
+        self.running = True
+        # The messages which wait for their acknowledgement by their message id
+        self.in_flight: Dict[int, OutboxMessage] = {}
+        # Acknowledgements which arrived before publish returned the message id
+        self.early_acknowledgements: Set[int] = set()
+        self.acknowledged: List[OutboxMessage] = []
+        self.last_sent_id = 0
+        self.next_send_time = 0.0
+        self.published = 0
+        self.latencies: deque = deque(maxlen=1024)
 
-        self.client = mqtt.Client()
+        self.client = client or mqtt.Client()
         self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_publish = self._on_publish
         self.client.on_message = self._on_message
+        self.client.max_inflight_messages_set(max_inflight)
+        self.client.reconnect_delay_set(1, 60)
 
         if use_ssl:
             self.mqtt_ssl_config = mqtt_ssl_config
             ssl_context = ssl_alpn(self.mqtt_ssl_config)
             self.client.tls_set_context(context=ssl_context)
 
-        try:
-            self.client.connect(mqtt_broker, mqtt_server_port, 60)
-        except ConnectionRefusedError:
-            print("Could not connect to MQTT broker")
-
+        # The network thread keeps trying to connect, also if the broker is
+        # unreachable on startup
+        self.client.connect_async(mqtt_broker, mqtt_server_port, 60)
         self.client.loop_start()
 
-    @staticmethod
-    def _on_connect(client, userdata, flags, rc):
+        self.sender = threading.Thread(
+            target=self._send_batches, name="mqtt-outbox", daemon=True
+        )
+        self.sender.start()
+
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc != mqtt.MQTT_ERR_SUCCESS:
+            logging.warning(f"Could not connect to MQTT broker, result code {rc}")
+            return
         logging.info("Connected with result code " + str(rc))
+        with self.condition:
+            self.connected = True
+            self.condition.notify()
+
+    def _on_disconnect(self, client, userdata, rc):
+        logging.warning(f"Disconnected from MQTT broker, result code {rc}")
+        with self.condition:
+            self.connected = False
+            if self.qos == 0:
+                # Messages without acknowledgement are not resent by the client,
+                # so all messages which are left in the outbox are sent again
+                self.in_flight.clear()
+                self.last_sent_id = 0
+
+    def _on_publish(self, client, userdata, mid):
+        with self.condition:
+            message = self.in_flight.pop(mid, None)
+            if message is None:
+                self.early_acknowledgements.add(mid)
+                return
+            self._acknowledge(message)
 
     @staticmethod
     def _on_message(client, userdata, msg):
         logging.info(msg.topic + " " + str(msg.payload))
 
     def publish(self, topic, payload):
-        self.client.publish(topic, payload, qos=0, retain=False)
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self.outbox.put(topic, payload)
+        with self.condition:
+            self.condition.notify()
+
+    def get_statistics(self) -> dict:
+        with self.condition:
+            statistics: dict = {
+                "connected": self.connected,
+                "queue_depth": self.outbox.depth,
+                "in_flight": len(self.in_flight),
+                "published": self.published,
+                "dropped": self.outbox.dropped,
+                "qos": self.qos,
+            }
+        latencies = list(self.latencies)
+        if latencies:
+            percentiles = np.percentile(latencies, [50, 95, 99]) * 1000
+            statistics["latency_ms"] = {
+                "p50": round(float(percentiles[0]), 3),
+                "p95": round(float(percentiles[1]), 3),
+                "p99": round(float(percentiles[2]), 3),
+                "max": round(max(latencies) * 1000, 3),
+            }
+        return statistics
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.sender.join()
+        self.client.disconnect()
+        self.client.loop_stop()
+        self._remove_acknowledged()
+        self.outbox.close()
+
+    def _send_batches(self):
+        while True:
+            with self.condition:
+                while self.running and not self._is_batch_ready():
+                    self.condition.wait()
+                if not self.running:
+                    return
+                after_id = self.last_sent_id
+                last_id = self.outbox.last_id
+                limit = min(self.batch_size, self.max_inflight - len(self.in_flight))
+
+            self._remove_acknowledged()
+            if not self.connected or limit <= 0:
+                continue
+            batch = self.outbox.peek(after_id, limit)
+            if not batch:
+                # The remaining messages were dropped or already delivered
+                with self.condition:
+                    self.last_sent_id = max(self.last_sent_id, last_id)
+            for message in batch:
+                if not self._throttle() or not self._send(message):
+                    break
+
+    def _send(self, message: OutboxMessage) -> bool:
+        """
+        The client is called without holding the lock, because it holds its own lock
+        while it runs the publish callback
+        """
+        info = self.client.publish(
+            message.topic, message.payload, qos=self.qos, retain=False
+        )
+        with self.condition:
+            if info.rc != mqtt.MQTT_ERR_SUCCESS and (
+                self.qos == 0 or info.rc != mqtt.MQTT_ERR_NO_CONN
+            ):
+                # The connection was lost before the disconnect callback. Messages
+                # with acknowledgement are queued by the client and sent on reconnect
+                self.connected = False
+                return False
+            self.last_sent_id = message.id
+            if info.mid in self.early_acknowledgements:
+                self.early_acknowledgements.discard(info.mid)
+                self._acknowledge(message)
+            else:
+                self.in_flight[info.mid] = message
+            return True
+
+    def _throttle(self) -> bool:
+        """
+        Waits until the rate limit allows to send the next message
+        :return: False if the service was closed in the meantime
+        """
+        if self.rate_limit <= 0:
+            return True
+        now = time.monotonic()
+        send_time = max(self.next_send_time, now)
+        self.next_send_time = send_time + 1 / self.rate_limit
+        with self.condition:
+            while self.running and time.monotonic() < send_time:
+                self.condition.wait(send_time - time.monotonic())
+            return self.running
+
+    def _acknowledge(self, message: OutboxMessage):
+        self.published += 1
+        self.latencies.append(time.time() - message.created)
+        self.acknowledged.append(message)
+        self.condition.notify()
+
+    def _remove_acknowledged(self):
+        with self.condition:
+            acknowledged = self.acknowledged
+            self.acknowledged = []
+        if acknowledged:
+            self.outbox.remove([message.id for message in acknowledged])
+
+    def _is_batch_ready(self) -> bool:
+        return len(self.acknowledged) > 0 or (
+            self.connected
+            and len(self.in_flight) < self.max_inflight
+            and self.outbox.last_id > self.last_sent_id
+        )
@@ -0,0 +1,100 @@
+import logging
+import sqlite3
+import threading
+import time
+from typing import List
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+
+class OutboxMessage:
+    def __init__(self, message_id: int, topic: str, payload: bytes, created: float):
+        self.id = message_id
+        self.topic = topic
+        self.payload = payload
+        self.created = created
+
+
+class MQTTOutbox:
+    """
+    Keeps the messages which were not yet delivered to the MQTT broker in an embedded
+    SQLite database, so they survive a lost connection and a restart of the station.
+    A message is only removed once the broker acknowledged it. If the outbox is full,
+    the oldest messages are dropped.
+    """
+
+    def __init__(self, database_file: str, max_messages: int = 10000):
+        self.database_file = database_file
+        self.max_messages = max_messages
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(database_file, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+        (self.depth,) = self.connection.execute(
+            "SELECT COUNT(*) FROM messages"
+        ).fetchone()
+        (self.last_id,) = self.connection.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM messages"
+        ).fetchone()
+        self.dropped = 0
+
+    def put(self, topic: str, payload: bytes) -> int:
+        """
+        Stores a message until it is delivered
+        :return: The id of the message
+        """
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "INSERT INTO messages (topic, payload, created) VALUES (?, ?, ?)",
+                (topic, payload, time.time()),
+            )
+            self.depth += 1
+            self.last_id = row.lastrowid
+            if self.depth > self.max_messages:
+                overflow = self.depth - self.max_messages
+                self.connection.execute(
+                    "DELETE FROM messages WHERE id IN "
+                    "(SELECT id FROM messages ORDER BY id LIMIT ?)",
+                    (overflow,),
+                )
+                self.depth -= overflow
+                self.dropped += overflow
+                logging.warning(f"The MQTT outbox is full, dropped {overflow} messages")
+            return self.last_id
+
+    def peek(self, after_id: int, limit: int) -> List[OutboxMessage]:
+        """
+        :param after_id: The id of the last message which was already handed out
+        :return: The oldest messages after the given message
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT id, topic, payload, created FROM messages "
+                "WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit),
+            ).fetchall()
+        return [OutboxMessage(*row) for row in rows]
+
+    def remove(self, message_ids: List[int]):
+        """
+        Removes delivered messages
+        """
+        with self.lock, self.connection:
+            removed = self.connection.executemany(
+                "DELETE FROM messages WHERE id = ?",
+                [(message_id,) for message_id in message_ids],
+            ).rowcount
+            self.depth -= removed
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,360 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from enum import Enum
+from typing import Any, Callable, List, Optional, Set
+
+# Tells a worker that no further items follow, so it stops once it took this sentinel
+STOP = object()
+
+# The seconds the workers get to stop after the queued items were dropped
+STOP_GRACE = 1.0
+
+
+class BackpressurePolicy(Enum):
+    BLOCK = 1
+    DROP_OLDEST = 2
+    DROP_NEWEST = 3
+
+
+class StageConfig:
+    def __init__(
+        self,
+        workers: int = 1,
+        queue_size: int = 4,
+        backpressure: BackpressurePolicy = BackpressurePolicy.BLOCK,
+        concurrency: int = 1,
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.backpressure = backpressure
+        self.concurrency = concurrency
+
+
+class BoundedQueue:
+    """
+    A bounded queue which applies a backpressure policy if it is full.
+    Dropped items are passed to discard, e.g. to release their resources.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        policy: BackpressurePolicy,
+        discard: Callable[[Any], None] = lambda item: None,
+    ):
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.policy = policy
+        self.discard = discard
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def put(self, item: Any, is_running: Callable[[], bool] = lambda: True):
+        """
+        Adds an item to the queue. Depending on the policy a full queue blocks the caller,
+        drops the oldest queued item or drops the new item.
+        :param item: The item which should be queued
+        :param is_running: Blocking puts give up as soon as this returns False
+        """
+        if self.policy == BackpressurePolicy.BLOCK:
+            while is_running():
+                try:
+                    self.queue.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    pass
+            self.discard(item)
+        elif self.policy == BackpressurePolicy.DROP_NEWEST:
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                self._drop(item)
+        else:
+            while True:
+                try:
+                    self.queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self._drop(self.queue.get_nowait())
+                    except queue.Empty:
+                        pass
+
+    def get(self, timeout: float) -> Any:
+        """
+        :raises queue.Empty: If no item arrived within the timeout
+        """
+        return self.queue.get(timeout=timeout)
+
+    def qsize(self) -> int:
+        return self.queue.qsize()
+
+    def close(self, workers: int, timeout: float) -> bool:
+        """
+        Adds a stop sentinel for every worker behind the queued items,
+        so the workers process the queued items before they stop
+        :return: False if the queue had no room for the sentinels within the timeout
+        """
+        deadline = time.monotonic() + timeout
+        for _ in range(workers):
+            try:
+                self.queue.put(STOP, timeout=max(deadline - time.monotonic(), 0))
+            except queue.Full:
+                return False
+        return True
+
+    def wake(self, workers: int) -> int:
+        """
+        Drops the queued items, which also releases a producer blocked by the full
+        queue, and adds a stop sentinel for every worker as far as there is room
+        :return: The number of dropped items
+        """
+        dropped = 0
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not STOP:
+                self._drop(item)
+                dropped += 1
+        for _ in range(workers):
+            try:
+                self.queue.put_nowait(STOP)
+            except queue.Full:
+                break
+        return dropped
+
+    def _drop(self, item: Any):
+        with self.lock:
+            self.dropped += 1
+        self.discard(item)
+
+
+class Stage:
+    """
+    A step of a pipeline which is executed by one or more worker threads.
+    The function receives the result of the previous stage and returns the item
+    for the next stage, or None if the item should not be processed any further.
+    The function of the first stage is called without an argument and acts as source.
+    A function may also return a future of the next item. Each worker then keeps up to
+    concurrency futures pending, so a single worker can wait for many results at once.
+    A source which blocks until its next item is available needs an interrupt,
+    which makes it return when the pipeline stops. Items of the input of the stage
+    which are dropped, by the backpressure policy or the stop, are passed to discard.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        function: Callable[..., Any],
+        config: Optional[StageConfig] = None,
+        interrupt: Optional[Callable[[], None]] = None,
+        discard: Callable[[Any], None] = lambda item: None,
+    ):
+        self.name = name
+        self.function = function
+        self.config = config or StageConfig()
+        self.interrupt = interrupt
+        self.discard = discard
+        self.input: Optional[BoundedQueue] = None
+        self.output: Optional[BoundedQueue] = None
+        self.threads: List[threading.Thread] = []
+        # The workers of a stage update the counters concurrently
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.pending = 0
+        self.busy_time = 0.0
+
+    def count(
+        self,
+        processed: int = 0,
+        failed: int = 0,
+        pending: int = 0,
+        busy_time: float = 0.0,
+    ):
+        with self.lock:
+            self.processed += processed
+            self.failed += failed
+            self.pending += pending
+            self.busy_time += busy_time
+
+    def get_statistics(self) -> dict:
+        with self.lock:
+            statistics = {
+                "workers": self.config.workers,
+                "pending": self.pending,
+                "processed": self.processed,
+                "failed": self.failed,
+                "average_time": self.busy_time / self.processed
+                if self.processed
+                else 0,
+            }
+        if self.input:
+            statistics["queued"] = self.input.qsize()
+            statistics["dropped"] = self.input.dropped
+        return statistics
+
+
+class Pipeline:
+    """
+    Connects stages with bounded queues, so every stage runs at its own pace
+    """
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+        self.running = False
+        # Set if the queued items could not be processed within the timeout of the stop
+        self.aborted = False
+        self.threads: List[threading.Thread] = []
+
+        for previous_stage, stage in zip(stages, stages[1:]):
+            stage.input = BoundedQueue(
+                stage.config.queue_size, stage.config.backpressure, stage.discard
+            )
+            previous_stage.output = stage.input
+
+    def start(self):
+        self.running = True
+        self.aborted = False
+        for index, stage in enumerate(self.stages):
+            for worker in range(stage.config.workers):
+                thread = threading.Thread(
+                    target=self._run_stage,
+                    args=(stage, index == 0),
+                    name=f"{stage.name}-{worker}",
+                    daemon=True,
+                )
+                thread.start()
+                stage.threads.append(thread)
+                self.threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        """
+        Stops the source and lets the stages process the queued items one stage
+        after the other, so items which were already captured are not lost.
+        Items which are still queued after the timeout are dropped.
+        :param timeout: The maximum time in seconds to process the queued items
+        """
+        self.running = False
+        deadline = time.monotonic() + timeout
+        for index, stage in enumerate(self.stages):
+            if stage.interrupt:
+                stage.interrupt()
+            closed = not stage.input or stage.input.close(
+                stage.config.workers, max(deadline - time.monotonic(), 0)
+            )
+            if not closed or not self._join(stage.threads, deadline):
+                self._abort(self.stages[index:])
+                break
+
+        if not self._join(self.threads, time.monotonic() + STOP_GRACE):
+            still_running = [
+                thread.name for thread in self.threads if thread.is_alive()
+            ]
+            logging.warning(f"Pipeline workers {still_running} did not stop in time")
+        self.threads = []
+        for stage in self.stages:
+            stage.threads = []
+
+    def is_running(self) -> bool:
+        return self.running
+
+    def get_statistics(self) -> dict:
+        return {stage.name: stage.get_statistics() for stage in self.stages}
+
+    def _abort(self, stages: List[Stage]):
+        """
+        Drops the queued items of the stages and wakes their workers
+        """
+        self.aborted = True
+        for stage in stages:
+            if stage.interrupt:
+                stage.interrupt()
+            if stage.input:
+                dropped = stage.input.wake(stage.config.workers)
+                if dropped:
+                    logging.warning(
+                        f"Pipeline stage {stage.name} dropped {dropped} queued items "
+                        "when it stopped"
+                    )
+
+    @staticmethod
+    def _join(threads: List[threading.Thread], deadline: float) -> bool:
+        """
+        :return: True if all threads stopped before the deadline
+        """
+        for thread in threads:
+            if thread is not threading.current_thread():
+                thread.join(max(deadline - time.monotonic(), 0))
+        return not any(
+            thread.is_alive()
+            for thread in threads
+            if thread is not threading.current_thread()
+        )
+
+    def _run_stage(self, stage: Stage, is_source: bool):
+        """
+        A source runs until the pipeline stops, other stages until they took
+        the stop sentinel from their input. Pending futures are awaited unless
+        the stop was aborted.
+        """
+        pending: Set[Future] = set()
+        stopping = False
+        while (not stopping or pending) and not self.aborted:
+            if is_source and not self.running:
+                stopping = True
+            if not stopping and len(pending) < stage.config.concurrency:
+                item = self._next_item(stage, is_source, 0 if pending else 0.5)
+                if item is STOP:
+                    stopping = True
+                elif isinstance(item, Future):
+                    pending.add(item)
+                    stage.count(pending=1)
+                else:
+                    self._forward(stage, item)
+
+            if pending:
+                done, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage.count(pending=-1)
+                    self._forward(stage, self._get_result(stage, future))
+
+    def _next_item(self, stage: Stage, is_source: bool, timeout: float) -> Any:
+        if is_source:
+            return self._execute(stage)
+        try:
+            input_item = stage.input.get(timeout=timeout)  # type: ignore
+        except queue.Empty:
+            return None
+        if input_item is STOP:
+            return STOP
+        return self._execute(stage, input_item)
+
+    def _forward(self, stage: Stage, item: Any):
+        if item is not None and stage.output:
+            stage.output.put(item, lambda: not self.aborted)
+
+    @staticmethod
+    def _get_result(stage: Stage, future: Future) -> Any:
+        try:
+            return future.result()
+        except Exception:
+            stage.count(failed=1)
+            logging.exception(f"Pipeline stage {stage.name} failed")
+            return None
+
+    @staticmethod
+    def _execute(stage: Stage, *args) -> Any:
+        start_time = time.perf_counter()
+        try:
+            return stage.function(*args)
+        except Exception:
+            stage.count(failed=1)
+            logging.exception(f"Pipeline stage {stage.name} failed")
+            return None
+        finally:
+            stage.count(processed=1, busy_time=time.perf_counter() - start_time)
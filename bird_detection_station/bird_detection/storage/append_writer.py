@@ -0,0 +1,254 @@
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future
+from enum import Enum
+from typing import BinaryIO, Callable, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+RECOVERY_WINDOW = 1 << 16
+
+
+class FsyncPolicy(Enum):
+    ALWAYS = "always"
+    INTERVAL = "interval"
+    NEVER = "never"
+
+
+def encode_record(payload: bytes) -> bytes:
+    """
+    Prefixes a record with the CRC32 of its payload, e.g. b'1a2b3c4d {"Result": ...}\\n'
+    """
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+
+def decode_record(line: bytes) -> Optional[bytes]:
+    """
+    :param line: A line of the file, with or without its newline
+    :return: The payload of the record, or None if the line is torn or corrupted.
+    Lines without checksum, written by earlier versions, are returned unchanged
+    """
+    line = line.rstrip(b"\n")
+    if line.startswith(b"{"):
+        return line
+    if len(line) < 9 or line[8:9] != b" ":
+        return None
+    payload = line[9:]
+    try:
+        checksum = int(line[:8], 16)
+    except ValueError:
+        return None
+    return payload if zlib.crc32(payload) == checksum else None
+
+
+def recover(path: str) -> int:
+    """
+    Truncates a torn tail, which an interrupted write left at the end of the file.
+    Incomplete lines and complete lines with a wrong checksum at the end are removed.
+    :return: The number of removed bytes
+    """
+    if not os.path.isfile(path):
+        return 0
+    with open(path, "r+b") as data:
+        size = data.seek(0, os.SEEK_END)
+        window_start = max(size - RECOVERY_WINDOW, 0)
+        data.seek(window_start)
+        tail = data.read()
+
+        end = len(tail)
+        if not tail.endswith(b"\n"):
+            end = tail.rfind(b"\n") + 1
+        while end > 0:
+            start = tail.rfind(b"\n", 0, end - 1) + 1
+            if start == 0 and window_start > 0:
+                break
+            if decode_record(tail[start:end]) is not None:
+                break
+            end = start
+
+        truncated = len(tail) - end
+        if truncated:
+            data.truncate(window_start + end)
+            logging.warning(f"Removed a torn tail of {truncated} bytes from {path}")
+        return truncated
+
+
+class GroupCommitWriter:
+    """
+    Appends checksummed records to a file which is kept open. Records are written
+    in groups, a group is written as soon as it holds batch_size records or its first
+    record waited for max_delay seconds. The fsync policy decides whether every group
+    is synced to disk, whether the file is synced at most every fsync_interval seconds
+    or whether syncing is left to the operating system.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        on_commit: Optional[Callable[[List[int]], None]] = None,
+        batch_size: int = 64,
+        max_delay: float = 0.05,
+        fsync_policy: FsyncPolicy = FsyncPolicy.INTERVAL,
+        fsync_interval: float = 1.0,
+    ):
+        self.path = path
+        self.on_commit = on_commit
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+
+        self.truncated_bytes = recover(path)
+        self.file: Optional[BinaryIO] = None
+        self.condition = threading.Condition()
+        self.pending: List[Tuple[bytes, Future, float]] = []
+        self.first_pending_time = 0.0
+        self.flush_requested = False
+        self.running = True
+        self.unsynced = False
+        self.last_fsync_time = time.monotonic()
+
+        self.records = 0
+        self.batches = 0
+        self.fsyncs = 0
+        self.latencies: deque = deque(maxlen=1024)
+        self.writer = threading.Thread(
+            target=self._write_batches, name="group-commit", daemon=True
+        )
+        self.writer.start()
+
+    def append(self, payload: bytes) -> Future:
+        """
+        Queues a record without waiting for the write
+        :return: A future which is resolved with the end offset of the record once it
+        is written according to the fsync policy
+        """
+        future: Future = Future()
+        with self.condition:
+            if not self.running:
+                raise ValueError("The writer is closed")
+            if not self.pending:
+                self.first_pending_time = time.monotonic()
+            self.pending.append((encode_record(payload), future, time.monotonic()))
+            if len(self.pending) >= self.batch_size:
+                self.condition.notify()
+        return future
+
+    def flush(self):
+        """
+        Writes the queued records right away and waits until they are written
+        """
+        with self.condition:
+            if not self.pending:
+                return
+            last_record = self.pending[-1][1]
+            self.flush_requested = True
+            self.condition.notify()
+        last_record.result()
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.writer.join()
+        if self.file:
+            self.file.close()
+
+    def get_statistics(self) -> dict:
+        statistics: dict = {
+            "records": self.records,
+            "batches": self.batches,
+            "fsyncs": self.fsyncs,
+            "fsync_policy": self.fsync_policy.value,
+            "truncated_bytes": self.truncated_bytes,
+        }
+        latencies = list(self.latencies)
+        if latencies:
+            percentiles = np.percentile(latencies, [50, 95, 99]) * 1000
+            statistics["latency_ms"] = {
+                "p50": round(float(percentiles[0]), 3),
+                "p95": round(float(percentiles[1]), 3),
+                "p99": round(float(percentiles[2]), 3),
+                "max": round(max(latencies) * 1000, 3),
+            }
+        return statistics
+
+    def _write_batches(self):
+        while True:
+            with self.condition:
+                while self.running and not self._is_batch_ready():
+                    if self._is_fsync_due():
+                        break
+                    self.condition.wait(self._get_timeout())
+                batch = self.pending
+                self.pending = []
+                self.flush_requested = False
+                running = self.running
+
+            try:
+                self._write(batch)
+            except OSError as e:
+                logging.error(f"Could not write to {self.path}: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            if not running:
+                return
+
+    def _write(self, batch: List[Tuple[bytes, Future, float]]):
+        ends = []
+        if batch:
+            if self.file is None:
+                self.file = open(self.path, "ab")
+            self.file.write(b"".join(record for record, _, _ in batch))
+            self.file.flush()
+            end = self.file.tell()
+            for record, _, _ in reversed(batch):
+                ends.append(end)
+                end -= len(record)
+            ends.reverse()
+            self.unsynced = True
+            self.records += len(batch)
+            self.batches += 1
+
+        if self.unsynced and (
+            self.fsync_policy == FsyncPolicy.ALWAYS or self._is_fsync_due()
+        ):
+            os.fsync(self.file.fileno())  # type: ignore
+            self.fsyncs += 1
+            self.unsynced = False
+            self.last_fsync_time = time.monotonic()
+
+        if ends and self.on_commit:
+            self.on_commit(ends)
+        now = time.monotonic()
+        for (_, future, queued_time), end in zip(batch, ends):
+            self.latencies.append(now - queued_time)
+            future.set_result(end)
+
+    def _is_batch_ready(self) -> bool:
+        return len(self.pending) > 0 and (
+            self.flush_requested
+            or len(self.pending) >= self.batch_size
+            or time.monotonic() >= self.first_pending_time + self.max_delay
+        )
+
+    def _is_fsync_due(self) -> bool:
+        return (
+            self.unsynced
+            and self.fsync_policy == FsyncPolicy.INTERVAL
+            and time.monotonic() >= self.last_fsync_time + self.fsync_interval
+        )
+
+    def _get_timeout(self) -> Optional[float]:
+        deadlines = []
+        if self.pending:
+            deadlines.append(self.first_pending_time + self.max_delay)
+        if self.unsynced and self.fsync_policy == FsyncPolicy.INTERVAL:
+            deadlines.append(self.last_fsync_time + self.fsync_interval)
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.monotonic(), 0)
@@ -0,0 +1,93 @@
+import os
+from array import array
+from typing import List, Tuple
+
+READ_CHUNK_SIZE = 1 << 20
+
+
+class LineIndex:
+    """
+    A sidecar file with the end offset of every line of a text file, stored as
+    unsigned 64 bit integers. It allows to read any line without scanning the text file.
+    The index is extended incrementally, on startup only the lines which were
+    appended after the last indexed line are scanned.
+    """
+
+    def __init__(self, index_file: str):
+        self.index_file = index_file
+        self.ends = array("Q")
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    @property
+    def indexed_size(self) -> int:
+        return self.ends[-1] if self.ends else 0
+
+    def load(self, data_file: str) -> int:
+        """
+        Loads the index and extends it with the lines appended to the data file since.
+        The index is rebuilt if it does not match the data file anymore.
+        :return: The number of lines which had to be scanned
+        """
+        self.ends = array("Q")
+        if os.path.isfile(self.index_file):
+            with open(self.index_file, "rb") as index:
+                index_data = index.read()
+            self.ends.frombytes(index_data[: len(index_data) // 8 * 8])
+
+        data_size = os.path.getsize(data_file) if os.path.isfile(data_file) else 0
+        if not self._matches(data_file, data_size):
+            self.ends = array("Q")
+            self._write_index()
+
+        indexed_lines = len(self.ends)
+        if data_size > self.indexed_size:
+            self._scan_tail(data_file)
+            with open(self.index_file, "ab") as index:
+                self.ends[indexed_lines:].tofile(index)
+        return len(self.ends) - indexed_lines
+
+    def extend(self, ends: List[int]):
+        """
+        Adds lines which were appended to the data file
+        :param ends: The offsets after the newlines of the appended lines
+        """
+        new_ends = array("Q", ends)
+        self.ends.extend(new_ends)
+        with open(self.index_file, "ab") as index:
+            new_ends.tofile(index)
+
+    def span(self, line_number: int) -> Tuple[int, int]:
+        """
+        :return: The start and the end offset of a line, including its newline
+        """
+        start = self.ends[line_number - 1] if line_number > 0 else 0
+        return start, self.ends[line_number]
+
+    def _matches(self, data_file: str, data_size: int) -> bool:
+        if not self.ends:
+            return True
+        if self.indexed_size > data_size:
+            return False
+        with open(data_file, "rb") as data:
+            data.seek(self.indexed_size - 1)
+            return data.read(1) == b"\n"
+
+    def _scan_tail(self, data_file: str):
+        offset = self.indexed_size
+        with open(data_file, "rb") as data:
+            data.seek(offset)
+            while True:
+                chunk = data.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                position = chunk.find(b"\n")
+                while position >= 0:
+                    self.ends.append(offset + position + 1)
+                    position = chunk.find(b"\n", position + 1)
+                offset += len(chunk)
+
+    def _write_index(self):
+        with open(self.index_file, "wb") as index:
+            self.ends.tofile(index)
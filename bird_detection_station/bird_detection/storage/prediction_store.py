@@ -0,0 +1,333 @@
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from json import JSONDecodeError
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from bird_detection.storage.append_writer import (
+    FsyncPolicy,
+    GroupCommitWriter,
+    decode_record,
+)
+from bird_detection.storage.line_index import LineIndex
+
+PredictionPage = Tuple[List[dict], Optional[str]]
+
+STREAM_PAGE_SIZE = 500
+
+
+class PredictionStoreInterface(ABC):
+    @abstractmethod
+    def add(self, prediction: dict):
+        """
+        Stores a complete prediction of a bird detection
+        """
+        pass
+
+    @abstractmethod
+    def query(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        species: Optional[str] = None,
+        newest_first: bool = False,
+    ) -> PredictionPage:
+        """
+        Returns one page of the stored predictions
+        :param cursor: The cursor returned with the previous page
+        :param limit: The maximum number of predictions of the page
+        :param since: Only predictions with a Time at or after since
+        :param until: Only predictions with a Time before until
+        :param species: Only predictions which contain the common name of the species
+        :param newest_first: Returns the most recent predictions first
+        :return: The predictions and the cursor of the next page, which is None on the last page
+        """
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        """
+        :return: The number of stored predictions
+        """
+        pass
+
+    def stream(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        species: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[str]:
+        """
+        Iterates over the stored predictions, oldest first, one page at a time,
+        so the memory does not grow with the size of the history
+        :param limit: The maximum number of predictions, None returns all of them
+        :return: The predictions serialized as JSON
+        """
+        cursor = None
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = STREAM_PAGE_SIZE
+            if remaining is not None:
+                page_size = min(page_size, remaining)
+                remaining -= page_size
+            predictions, cursor = self.query(cursor, page_size, since, until, species)
+            for prediction in predictions:
+                yield json.dumps(prediction)
+            if cursor is None:
+                return
+
+    def get_clip_confidences(self) -> Dict[str, float]:
+        """
+        :return: The highest confidence of the predictions with a clip by their Time,
+        which is also the name of the clip without extension
+        """
+        confidences = {}
+        for line in self.stream():
+            try:
+                prediction = json.loads(line)
+            except JSONDecodeError:
+                continue
+            if prediction.get("File"):
+                confidences[prediction.get("Time", "")] = max_confidence(prediction)
+        return confidences
+
+    def expire_clips(self, times: List[str]):
+        """
+        Marks the File of the predictions as expired after their clips were deleted
+        :param times: The Time of the predictions
+        """
+        pass
+
+    def get_statistics(self) -> dict:
+        """
+        :return: Counters which describe the storage, e.g. how long loading it took on startup
+        """
+        return {}
+
+    def close(self):
+        """
+        Writes pending predictions and releases the storage
+        """
+        pass
+
+
+def max_confidence(prediction: dict) -> float:
+    return max(
+        (result.get("Confidence", 0) for result in prediction.get("Result", [])),
+        default=0,
+    )
+
+
+def mark_expired(prediction: dict) -> dict:
+    """
+    Replaces the URL of a deleted clip, so clients do not request it
+    """
+    prediction["File"] = None
+    prediction["File Expired"] = True
+    return prediction
+
+
+def parse_time(payload: bytes) -> Optional[str]:
+    """
+    Finds the Time of a serialized prediction without parsing the whole prediction
+    """
+    start = payload.find(b'"Time": "')
+    if start < 0:
+        return None
+    start += len(b'"Time": "')
+    return payload[start : payload.find(b'"', start)].decode()
+
+
+def matches(
+    prediction: dict,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    species: Optional[str] = None,
+) -> bool:
+    """
+    Applies the filters of a query to a single prediction
+    """
+    time = prediction.get("Time", "")
+    if since is not None and time < since:
+        return False
+    if until is not None and time >= until:
+        return False
+    if species is not None:
+        species = species.lower()
+        return any(
+            str(result.get("Common Name", "")).lower() == species
+            for result in prediction.get("Result", [])
+        )
+    return True
+
+
+class FilePredictionStore(PredictionStoreInterface):
+    """
+    Stores the predictions as JSON lines in a text file.
+    The lines are appended in groups by a writer which keeps the file open, each line
+    is prefixed with a checksum, so a line torn by a power cut is removed on startup.
+    A sidecar index with the offset of every line is kept next to the file, so
+    startup only scans the lines appended since the last run. The lines are read
+    through a memory map and only parsed when they are requested.
+    The cursor is the number of the line of the last returned prediction.
+    Predictions are never rewritten, the Time of the predictions with an expired
+    clip is appended to a second sidecar file and the File is marked when the
+    predictions are read.
+    """
+
+    def __init__(
+        self,
+        prediction_file: str = "predictions.txt",
+        fsync_policy: FsyncPolicy = FsyncPolicy.INTERVAL,
+        fsync_interval: float = 1.0,
+    ):
+        self.prediction_file = prediction_file
+        self.lock = threading.Lock()
+        self.index = LineIndex(prediction_file + ".idx")
+        self.map: Optional[mmap.mmap] = None
+        self.expired_file = prediction_file + ".expired"
+        self.expired: Set[str] = set()
+        if os.path.isfile(self.expired_file):
+            with open(self.expired_file) as expired:
+                self.expired = set(expired.read().splitlines())
+
+        start = time.monotonic()
+        self.writer = GroupCommitWriter(
+            prediction_file,
+            on_commit=self._index_lines,
+            fsync_policy=fsync_policy,
+            fsync_interval=fsync_interval,
+        )
+        self.scanned_lines = self.index.load(prediction_file)
+        self.load_seconds = time.monotonic() - start
+        logging.info(
+            f"Loaded the index of {len(self.index)} predictions in "
+            f"{self.load_seconds:.3f} s, {self.scanned_lines} lines were scanned"
+        )
+
+    def add(self, prediction: dict):
+        self.writer.append(json.dumps(prediction).encode())
+
+    def query(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        species: Optional[str] = None,
+        newest_first: bool = False,
+    ) -> PredictionPage:
+        self.writer.flush()
+        line_count = len(self.index)
+        if newest_first:
+            first_line = int(cursor) - 1 if cursor else line_count - 1
+            line_numbers = range(first_line, -1, -1)
+        else:
+            first_line = int(cursor) + 1 if cursor else 0
+            line_numbers = range(first_line, line_count)
+
+        page = []
+        for line_number in line_numbers:
+            prediction = self._parse_line(line_number)
+            if prediction is not None and matches(prediction, since, until, species):
+                if prediction.get("Time") in self.expired:
+                    mark_expired(prediction)
+                page.append((line_number, prediction))
+                if len(page) == limit:
+                    break
+
+        next_cursor = str(page[-1][0]) if len(page) == limit else None
+        return [prediction for _, prediction in page], next_cursor
+
+    def stream(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        species: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[str]:
+        """
+        The lines of the file already are serialized predictions, so they are
+        passed through and only parsed if a filter needs to be applied
+        """
+        self.writer.flush()
+        filtered = since is not None or until is not None or species is not None
+        streamed = 0
+        for line_number in range(len(self.index)):
+            if limit is not None and streamed >= limit:
+                return
+            payload = decode_record(self._read_line(line_number))
+            if payload is None:
+                logging.warning("Could not parse prediction file")
+                continue
+            line = payload.decode()
+            expired = bool(self.expired) and parse_time(payload) in self.expired
+            if filtered or expired:
+                try:
+                    prediction = json.loads(line)
+                except JSONDecodeError:
+                    logging.warning("Could not parse prediction file")
+                    continue
+                if not matches(prediction, since, until, species):
+                    continue
+                if expired:
+                    line = json.dumps(mark_expired(prediction))
+            streamed += 1
+            yield line
+
+    def count(self) -> int:
+        self.writer.flush()
+        return len(self.index)
+
+    def expire_clips(self, times: List[str]):
+        with self.lock:
+            self.expired.update(times)
+            with open(self.expired_file, "a") as expired:
+                expired.writelines(prediction_time + "\n" for prediction_time in times)
+
+    def get_statistics(self) -> dict:
+        return {
+            "predictions": len(self.index),
+            "load_seconds": round(self.load_seconds, 3),
+            "scanned_lines": self.scanned_lines,
+            "writer": self.writer.get_statistics(),
+        }
+
+    def close(self):
+        self.writer.close()
+        with self.lock:
+            self.map = None
+
+    def _index_lines(self, ends: List[int]):
+        with self.lock:
+            self.index.extend(ends)
+
+    def _read_line(self, line_number: int) -> bytes:
+        with self.lock:
+            start, end = self.index.span(line_number)
+            if self.map is None or len(self.map) < end:
+                # The file grew since it was mapped, the previous map stays valid
+                # for readers which still use it
+                with open(self.prediction_file, "rb") as predictions:
+                    self.map = mmap.mmap(
+                        predictions.fileno(), 0, access=mmap.ACCESS_READ
+                    )
+            prediction_map = self.map
+        return prediction_map[start:end]
+
+    def _parse_line(self, line_number: int) -> Optional[dict]:
+        payload = decode_record(self._read_line(line_number))
+        if payload is not None:
+            try:
+                return json.loads(payload)
+            except JSONDecodeError:
+                pass
+        logging.warning("Could not parse prediction file")
+        return None
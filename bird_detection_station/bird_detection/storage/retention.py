@@ -0,0 +1,235 @@
+import heapq
+import logging
+import os
+import threading
+import time
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+from bird_detection.storage.prediction_store import PredictionStoreInterface
+
+
+class RetentionPolicy(Enum):
+    OLDEST = "oldest"
+    LOWEST_CONFIDENCE = "lowest_confidence"
+
+
+class ClipEntry:
+    def __init__(self, name: str, size: int, mtime: float, confidence: float):
+        self.name = name
+        self.size = size
+        self.mtime = mtime
+        self.confidence = confidence
+
+
+class RetentionManager:
+    """
+    Keeps the clip directory within a quota of max_bytes and deletes clips older
+    than max_age seconds, 0 disables either limit. The directory is scanned once
+    in the background on startup, afterwards saved clips are added to the catalog
+    as they are written. Two heaps, by age and by the eviction policy, let each
+    eviction run without scanning the directory again. The predictions of deleted
+    clips are marked as expired in the prediction store.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        prediction_store: PredictionStoreInterface,
+        max_bytes: int = 0,
+        max_age: float = 0,
+        policy: RetentionPolicy = RetentionPolicy.OLDEST,
+        interval: float = 60,
+    ):
+        self.directory = directory
+        self.prediction_store = prediction_store
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.policy = policy
+        self.interval = interval
+
+        self.condition = threading.Condition()
+        self.clips: Dict[str, ClipEntry] = {}
+        self.by_age: List[Tuple[float, str]] = []
+        self.by_policy: List[Tuple[float, float, str]] = []
+        self.total_bytes = 0
+        self.loaded = False
+        self.running = True
+        self.evicted_clips = 0
+        self.evicted_bytes = 0
+
+        self.worker = threading.Thread(
+            target=self._enforce_periodically, name="retention", daemon=True
+        )
+        self.worker.start()
+
+    def add_clip(self, file_name: str, size: int, confidence: float = 0):
+        """
+        Adds a clip which was just written to the directory
+        :param confidence: The highest confidence of the prediction of the clip
+        """
+        with self.condition:
+            self._add(ClipEntry(file_name, size, time.time(), confidence))
+            if self.max_bytes and self.total_bytes > self.max_bytes:
+                self.condition.notify()
+
+    def enforce(self) -> int:
+        """
+        Deletes clips until the quota and the maximum age are met
+        :return: The number of deleted clips
+        """
+        with self.condition:
+            evicted = self._select_evictions()
+        deleted = []
+        for clip in evicted:
+            try:
+                os.remove(os.path.join(self.directory, clip.name))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.warning(f"Could not delete clip {clip.name}: {e}")
+                continue
+            deleted.append(clip)
+
+        if deleted:
+            self.prediction_store.expire_clips(
+                [os.path.splitext(clip.name)[0] for clip in deleted]
+            )
+            with self.condition:
+                self.evicted_clips += len(deleted)
+                self.evicted_bytes += sum(clip.size for clip in deleted)
+            logging.info(
+                f"Deleted {len(deleted)} clips, {self.total_bytes} bytes are left"
+            )
+        return len(deleted)
+
+    def get_statistics(self) -> dict:
+        with self.condition:
+            return {
+                "clips": len(self.clips),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "evicted_clips": self.evicted_clips,
+                "evicted_bytes": self.evicted_bytes,
+                "policy": self.policy.value,
+            }
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.worker.join()
+
+    def _enforce_periodically(self):
+        self._load()
+        while True:
+            try:
+                self.enforce()
+            except Exception as e:
+                logging.error(f"Could not enforce the clip retention: {e!r}")
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: not self.running
+                    or bool(self.max_bytes and self.total_bytes > self.max_bytes),
+                    self.interval,
+                )
+                if not self.running:
+                    return
+
+    def _load(self):
+        """
+        Scans the directory once. The confidences are only needed to evict the clips
+        with the lowest confidence first.
+        """
+        confidences: Dict[str, float] = {}
+        if self.policy == RetentionPolicy.LOWEST_CONFIDENCE:
+            confidences = self.prediction_store.get_clip_confidences()
+        entries = []
+        if os.path.isdir(self.directory):
+            with os.scandir(self.directory) as directory:
+                for entry in directory:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        confidence = confidences.get(os.path.splitext(entry.name)[0], 0)
+                        entries.append(
+                            ClipEntry(
+                                entry.name, stat.st_size, stat.st_mtime, confidence
+                            )
+                        )
+        with self.condition:
+            for clip in entries:
+                if clip.name not in self.clips:
+                    self._add(clip)
+            self.loaded = True
+            self.condition.notify_all()
+
+    def _add(self, clip: ClipEntry):
+        previous = self.clips.get(clip.name)
+        if previous is not None:
+            self.total_bytes -= previous.size
+        self.clips[clip.name] = clip
+        self.total_bytes += clip.size
+        if self._evicts_by_age():
+            heapq.heappush(self.by_age, (clip.mtime, clip.name))
+        if self._evicts_by_confidence():
+            heapq.heappush(self.by_policy, (clip.confidence, clip.mtime, clip.name))
+        # Replaced clips and clips evicted through the other heap leave stale entries
+        if max(len(self.by_age), len(self.by_policy)) > 2 * len(self.clips):
+            self._rebuild_heaps()
+
+    def _evicts_by_age(self) -> bool:
+        return bool(
+            self.max_age or (self.max_bytes and self.policy == RetentionPolicy.OLDEST)
+        )
+
+    def _evicts_by_confidence(self) -> bool:
+        return bool(self.max_bytes and self.policy == RetentionPolicy.LOWEST_CONFIDENCE)
+
+    def _rebuild_heaps(self):
+        """
+        Drops the stale entries of the heaps. Needs to hold the lock.
+        """
+        self.by_age = []
+        self.by_policy = []
+        if self._evicts_by_age():
+            self.by_age = [(clip.mtime, clip.name) for clip in self.clips.values()]
+            heapq.heapify(self.by_age)
+        if self._evicts_by_confidence():
+            self.by_policy = [
+                (clip.confidence, clip.mtime, clip.name) for clip in self.clips.values()
+            ]
+            heapq.heapify(self.by_policy)
+
+    def _select_evictions(self) -> List[ClipEntry]:
+        """
+        Removes the clips which need to be deleted from the catalog. Heap entries of
+        clips which were already removed are skipped. Needs to hold the lock.
+        """
+        evicted = []
+        if self.max_age:
+            cutoff = time.time() - self.max_age
+            while self.by_age and self.by_age[0][0] < cutoff:
+                clip = self._pop(self.by_age)
+                if clip is not None:
+                    evicted.append(clip)
+        if self.max_bytes:
+            heap: list = self.by_age
+            if self.policy == RetentionPolicy.LOWEST_CONFIDENCE:
+                heap = self.by_policy
+            while self.total_bytes > self.max_bytes and heap:
+                clip = self._pop(heap)
+                if clip is not None:
+                    evicted.append(clip)
+        return evicted
+
+    def _pop(self, heap: list) -> Optional[ClipEntry]:
+        """
+        Both heaps end their entries with the modification time and the name
+        """
+        *_, mtime, name = heapq.heappop(heap)
+        clip = self.clips.get(name)
+        if clip is None or clip.mtime != mtime:
+            return None
+        del self.clips[clip.name]
+        self.total_bytes -= clip.size
+        return clip
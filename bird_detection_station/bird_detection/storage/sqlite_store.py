@@ -0,0 +1,319 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from json import JSONDecodeError
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bird_detection.storage.append_writer import FsyncPolicy, decode_record
+from bird_detection.storage.prediction_store import (
+    STREAM_PAGE_SIZE,
+    PredictionPage,
+    PredictionStoreInterface,
+    mark_expired,
+    max_confidence,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time TEXT NOT NULL,
+    file TEXT,
+    max_confidence REAL,
+    prediction TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS predictions_time ON predictions (time, id);
+CREATE TABLE IF NOT EXISTS species (
+    prediction_id INTEGER NOT NULL REFERENCES predictions (id) ON DELETE CASCADE,
+    name TEXT NOT NULL COLLATE NOCASE,
+    confidence REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS species_name ON species (name, prediction_id);
+"""
+
+
+class SQLitePredictionStore(PredictionStoreInterface):
+    """
+    Stores the predictions in an embedded SQLite database with indexes on the time
+    and the species. The database runs in WAL mode and new predictions are inserted
+    in batches, which are committed when the batch is full or its first prediction
+    waited for flush_interval seconds. The cursor is the id of the last returned prediction.
+    The fsync policy is mapped to the synchronous setting of SQLite.
+    """
+
+    SYNCHRONOUS = {
+        FsyncPolicy.ALWAYS: "FULL",
+        FsyncPolicy.INTERVAL: "NORMAL",
+        FsyncPolicy.NEVER: "OFF",
+    }
+
+    def __init__(
+        self,
+        database_file: str = "predictions.db",
+        batch_size: int = 32,
+        flush_interval: float = 1.0,
+        fsync_policy: FsyncPolicy = FsyncPolicy.INTERVAL,
+    ):
+        self.database_file = database_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.is_new = not os.path.isfile(database_file)
+        start = time.monotonic()
+
+        self.connection = sqlite3.connect(database_file, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            f"PRAGMA synchronous={SQLitePredictionStore.SYNCHRONOUS[fsync_policy]}"
+        )
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+        self.load_seconds = time.monotonic() - start
+
+        self.lock = threading.Lock()
+        self.condition = threading.Condition()
+        self.pending: List[dict] = []
+        self.first_pending_time = 0.0
+        self.running = True
+        self.flusher = threading.Thread(
+            target=self._flush_periodically, name="prediction-store", daemon=True
+        )
+        self.flusher.start()
+
+    def add(self, prediction: dict):
+        with self.condition:
+            if not self.pending:
+                self.first_pending_time = time.monotonic()
+            self.pending.append(prediction)
+            if len(self.pending) >= self.batch_size:
+                self.condition.notify()
+
+    def flush(self):
+        """
+        Inserts all pending predictions in one transaction. If the transaction fails,
+        the predictions stay pending and are inserted with the next flush.
+        :raises sqlite3.Error: If the predictions could not be inserted
+        """
+        with self.lock:
+            with self.condition:
+                batch = self.pending
+                self.pending = []
+            if not batch:
+                return
+            try:
+                self._insert(batch)
+            except sqlite3.Error as e:
+                logging.error(f"Could not store {len(batch)} predictions: {e}")
+                with self.condition:
+                    self.pending = batch + self.pending
+                    self.first_pending_time = time.monotonic()
+                raise
+
+    def import_file(self, prediction_file: str) -> int:
+        """
+        Imports the predictions of a prediction file written by the file store
+        :return: The number of imported predictions
+        """
+        imported = 0
+        batch = []
+        with open(prediction_file, "rb") as predictions:
+            for line in predictions:
+                try:
+                    batch.append(json.loads(decode_record(line) or b""))
+                except JSONDecodeError:
+                    logging.warning("Could not parse prediction file")
+                if len(batch) >= 1000:
+                    imported += self._import_batch(batch)
+                    batch = []
+        return imported + self._import_batch(batch)
+
+    def query(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        species: Optional[str] = None,
+        newest_first: bool = False,
+    ) -> PredictionPage:
+        self.flush()
+        rows = self._select(cursor, limit, since, until, species, newest_first)
+        next_cursor = str(rows[-1][0]) if len(rows) == limit else None
+        return [json.loads(prediction) for _, prediction in rows], next_cursor
+
+    def stream(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        species: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[str]:
+        """
+        The predictions are stored as JSON, so the rows are passed through without
+        parsing them. The lock is only held while a page is selected, so new
+        predictions can be inserted while a large history is streamed.
+        """
+        self.flush()
+        cursor = None
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = STREAM_PAGE_SIZE
+            if remaining is not None:
+                page_size = min(page_size, remaining)
+                remaining -= page_size
+            rows = self._select(cursor, page_size, since, until, species)
+            for _, prediction in rows:
+                yield prediction
+            if len(rows) < page_size:
+                return
+            cursor = str(rows[-1][0])
+
+    def count(self) -> int:
+        self.flush()
+        with self.lock:
+            (count,) = self.connection.execute(
+                "SELECT COUNT(*) FROM predictions"
+            ).fetchone()
+        return count
+
+    def get_clip_confidences(self) -> Dict[str, float]:
+        self.flush()
+        with self.lock:
+            return dict(
+                self.connection.execute(
+                    "SELECT time, max_confidence FROM predictions WHERE file IS NOT NULL"
+                ).fetchall()
+            )
+
+    def expire_clips(self, times: List[str]):
+        """
+        The predictions are found by the index on their time
+        """
+        self.flush()
+        with self.lock, self.connection:
+            for time_value in times:
+                rows = self.connection.execute(
+                    "SELECT id, prediction FROM predictions "
+                    "WHERE time = ? AND file IS NOT NULL",
+                    (time_value,),
+                ).fetchall()
+                self.connection.executemany(
+                    "UPDATE predictions SET file = NULL, prediction = ? WHERE id = ?",
+                    [
+                        (json.dumps(mark_expired(json.loads(prediction))), row_id)
+                        for row_id, prediction in rows
+                    ],
+                )
+
+    def get_statistics(self) -> dict:
+        return {
+            "pending_predictions": len(self.pending),
+            "load_seconds": round(self.load_seconds, 3),
+        }
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.flusher.join()
+        self.flush()
+        with self.lock:
+            self.connection.close()
+
+    def _select(
+        self,
+        cursor: Optional[str],
+        limit: int,
+        since: Optional[str],
+        until: Optional[str],
+        species: Optional[str],
+        newest_first: bool = False,
+    ) -> List[Tuple[int, str]]:
+        conditions = []
+        parameters: list = []
+        if cursor:
+            conditions.append("id < ?" if newest_first else "id > ?")
+            parameters.append(int(cursor))
+        if since is not None:
+            conditions.append("time >= ?")
+            parameters.append(since)
+        if until is not None:
+            conditions.append("time < ?")
+            parameters.append(until)
+        if species is not None:
+            conditions.append(
+                "id IN (SELECT prediction_id FROM species WHERE name = ?)"
+            )
+            parameters.append(species)
+
+        statement = "SELECT id, prediction FROM predictions"
+        if conditions:
+            statement += " WHERE " + " AND ".join(conditions)
+        statement += f" ORDER BY id {'DESC' if newest_first else 'ASC'} LIMIT ?"
+        parameters.append(limit)
+
+        with self.lock:
+            return self.connection.execute(statement, parameters).fetchall()
+
+    def _flush_periodically(self):
+        while True:
+            with self.condition:
+                while self.running and not self._is_batch_ready():
+                    timeout = None
+                    if self.pending:
+                        timeout = max(
+                            self.first_pending_time
+                            + self.flush_interval
+                            - time.monotonic(),
+                            0,
+                        )
+                    self.condition.wait(timeout)
+                if not self.running:
+                    return
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Waits before the next attempt, a full batch would be retried at once
+                with self.condition:
+                    self.condition.wait_for(
+                        lambda: not self.running, self.flush_interval
+                    )
+
+    def _is_batch_ready(self) -> bool:
+        return len(self.pending) >= self.batch_size or (
+            len(self.pending) > 0
+            and time.monotonic() >= self.first_pending_time + self.flush_interval
+        )
+
+    def _import_batch(self, batch: List[dict]) -> int:
+        with self.lock:
+            self._insert(batch)
+        return len(batch)
+
+    def _insert(self, batch: List[dict]):
+        with self.connection:
+            for prediction in batch:
+                results = prediction.get("Result", [])
+                row = self.connection.execute(
+                    "INSERT INTO predictions (time, file, max_confidence, prediction) "
+                    "VALUES (?, ?, ?, ?)",
+                    (
+                        prediction.get("Time", ""),
+                        prediction.get("File"),
+                        max_confidence(prediction) if results else None,
+                        json.dumps(prediction),
+                    ),
+                )
+                self.connection.executemany(
+                    "INSERT INTO species (prediction_id, name, confidence) VALUES (?, ?, ?)",
+                    [
+                        (
+                            row.lastrowid,
+                            result.get("Common Name", ""),
+                            result.get("Confidence", 0),
+                        )
+                        for result in results
+                    ],
+                )
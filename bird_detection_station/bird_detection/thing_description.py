@@ -22,10 +22,30 @@ class ThingDescription:
                     "forms": [{"href": f"http://{self.host_name}/properties/duration"}],
                 },
                 "predictions": {
-                    "description": "Returns the bird sound predictions which were captured during runtime",
+                    "description": "Returns the stored bird sound predictions. "
+                    "With a limit or cursor only a page is returned, "
+                    "the X-Next-Cursor header contains the cursor of the next page. "
+                    "With format=ndjson all matching predictions are streamed as newline-delimited JSON",
                     "type": "string",
+                    "uriVariables": {
+                        "cursor": {"type": "string"},
+                        "limit": {"type": "integer", "minimum": 1, "maximum": 1000},
+                        "since": {"type": "string", "format": "date-time"},
+                        "until": {"type": "string", "format": "date-time"},
+                        "species": {"type": "string"},
+                        "newest_first": {"type": "boolean"},
+                        "format": {"type": "string", "enum": ["json", "ndjson"]},
+                    },
                     "forms": [
-                        {"href": f"http://{self.host_name}/properties/predictions"}
+                        {
+                            "href": f"http://{self.host_name}/properties/predictions"
+                            "{?cursor,limit,since,until,species,newest_first}"
+                        },
+                        {
+                            "href": f"http://{self.host_name}/properties/predictions"
+                            "{?limit,since,until,species,format}",
+                            "contentType": "application/x-ndjson",
+                        },
                     ],
                 },
                 "location": {
@@ -40,6 +60,13 @@ class ThingDescription:
                         {"href": f"http://{self.host_name}/properties/recording"}
                     ],
                 },
+                "statistics": {
+                    "description": "Returns counters which describe the performance of the bird station",
+                    "type": "object",
+                    "forms": [
+                        {"href": f"http://{self.host_name}/properties/statistics"}
+                    ],
+                },
             },
             "actions": {
                 "toggle": {
@@ -51,11 +78,30 @@ class ThingDescription:
             "events": {
                 "recognized_bird": {
                     "data": {"type": "string"},
+                    "uriVariables": {
+                        "species": {"type": "string"},
+                        "min_confidence": {
+                            "type": "number",
+                            "minimum": 0,
+                            "maximum": 1,
+                        },
+                    },
                     "forms": [
                         {
                             "href": f"http://{self.host_name}/events/bird_detection",
                             "subprotocol": "longpoll",
-                        }
+                        },
+                        {
+                            "href": f"http://{self.host_name}/events/bird_detection/sse"
+                            "{?species,min_confidence}",
+                            "subprotocol": "sse",
+                            "contentType": "text/event-stream",
+                        },
+                        {
+                            "href": f"ws://{self.host_name}/events/bird_detection/ws"
+                            "{?species,min_confidence,last_event_id}",
+                            "contentType": "application/json",
+                        },
                     ],
                 }
             },
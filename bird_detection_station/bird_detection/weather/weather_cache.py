@@ -0,0 +1,174 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from bird_detection.gps.location_service import LocationServiceInterface
+from bird_detection.weather.weather_service import WeatherServiceInterface
+
+LocationKey = Tuple[float, float]
+
+
+class WeatherSnapshot:
+    def __init__(self, data: dict, fetch_time: float):
+        """
+        :param fetch_time: The wall clock time of the request, so the age of a
+        snapshot is known after a restart
+        """
+        self.data = data
+        self.fetch_time = fetch_time
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetch_time
+
+
+class WeatherCache(WeatherServiceInterface):
+    """
+    Serves the weather of the current location from memory, so a bird detection
+    never waits for the weather service. Once a snapshot is older than ttl seconds,
+    it is refreshed by a background thread while the stale snapshot is still served.
+    Snapshots which are older than ttl + max_stale seconds are not served anymore.
+    The locations are rounded to the given number of decimals, e.g. 2 decimals
+    are about 1 km, so the jitter of the GPS sensor does not cause new requests.
+    The snapshots are written to the cache file, so they are available right after
+    a restart.
+    """
+
+    def __init__(
+        self,
+        weather_service: WeatherServiceInterface,
+        location_service: LocationServiceInterface,
+        cache_file: Optional[str] = "weather_cache.json",
+        ttl: float = 600,
+        max_stale: float = 10800,
+        precision: int = 2,
+        retry_interval: float = 60,
+    ):
+        self.weather_service = weather_service
+        self.location_service = location_service
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.precision = precision
+        self.retry_interval = retry_interval
+
+        self.lock = threading.Lock()
+        self.snapshots: Dict[LocationKey, WeatherSnapshot] = {}
+        self.refreshes: Dict[LocationKey, Future] = {}
+        self.retry_times: Dict[LocationKey, float] = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="weather")
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_failures = 0
+        self._load()
+
+    def request_weather_info(self) -> dict:
+        """
+        :return: The cached weather of the current location, an empty dict if there
+        is no snapshot which is recent enough
+        """
+        location = self.location_service.get_valid_location()
+        key = self.location_key(float(location.lat), float(location.lon))
+        with self.lock:
+            snapshot = self.snapshots.get(key)
+            if snapshot is None or snapshot.age > self.ttl:
+                self._refresh(key)
+            if snapshot is None or snapshot.age > self.ttl + self.max_stale:
+                self.misses += 1
+                return {}
+            if snapshot.age > self.ttl:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return snapshot.data
+
+    def location_key(self, lat: float, lon: float) -> LocationKey:
+        return round(lat, self.precision), round(lon, self.precision)
+
+    def attach_event_loop(self, loop: asyncio.AbstractEventLoop):
+        self.weather_service.attach_event_loop(loop)
+
+    async def shutdown(self):
+        await self.weather_service.shutdown()
+
+    def get_statistics(self) -> dict:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refresh_failures": self.refresh_failures,
+            "locations": len(self.snapshots),
+            "service": self.weather_service.get_statistics(),
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def _refresh(self, key: LocationKey):
+        """
+        Starts a refresh of the location, unless one is running or the last one
+        failed less than retry_interval seconds ago. Needs to hold the lock.
+        """
+        if key in self.refreshes or time.monotonic() < self.retry_times.get(key, 0):
+            return
+        self.refreshes[key] = self.executor.submit(self._fetch, key)
+
+    def _fetch(self, key: LocationKey):
+        try:
+            data = self.weather_service.fetch_weather_info(*key)
+        except Exception as e:
+            logging.warning(f"Could not refresh weather data: {e!r}")
+            data = None
+
+        with self.lock:
+            del self.refreshes[key]
+            if data is None:
+                self.refresh_failures += 1
+                self.retry_times[key] = time.monotonic() + self.retry_interval
+                return
+            self.snapshots[key] = WeatherSnapshot(data, time.time())
+            # Snapshots of locations the station left are dropped once they expired
+            self.snapshots = {
+                location: snapshot
+                for location, snapshot in self.snapshots.items()
+                if snapshot.age <= self.ttl + self.max_stale
+            }
+            snapshots = dict(self.snapshots)
+        self._save(snapshots)
+
+    def _load(self):
+        if not self.cache_file or not os.path.isfile(self.cache_file):
+            return
+        try:
+            with open(self.cache_file) as cache:
+                entries = json.load(cache)
+            for entry in entries:
+                key = self.location_key(entry["lat"], entry["lon"])
+                self.snapshots[key] = WeatherSnapshot(entry["data"], entry["time"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Could not load the weather cache: {e!r}")
+
+    def _save(self, snapshots: Dict[LocationKey, WeatherSnapshot]):
+        """
+        Replaces the cache file atomically, so a power cut leaves either
+        the previous or the new file
+        """
+        if not self.cache_file:
+            return
+        entries = [
+            {"lat": lat, "lon": lon, "time": snapshot.fetch_time, "data": snapshot.data}
+            for (lat, lon), snapshot in snapshots.items()
+        ]
+        try:
+            with open(self.cache_file + ".tmp", "w") as cache:
+                json.dump(entries, cache)
+            os.replace(self.cache_file + ".tmp", self.cache_file)
+        except OSError as e:
+            logging.warning(f"Could not save the weather cache: {e}")
@@ -1,17 +1,72 @@
+import asyncio
+import json
+import logging
 import time
 from abc import ABC, abstractmethod
+from typing import Optional
 
+import aiohttp  # type: ignore
 import requests
 
+from bird_detection.http.async_client import AsyncHTTPClient
+from bird_detection.http.session_pool import HTTPSettings, SessionPool
+
 
 class WeatherServiceInterface(ABC):
     @abstractmethod
     def request_weather_info(self) -> dict:
         pass
 
+    def fetch_weather_info(self, lat: float, lon: float) -> Optional[dict]:
+        """
+        Requests the current weather at a location, without caching
+        :return: The weather data, or None if the request failed
+        """
+        return self.request_weather_info() or None
+
+    def attach_event_loop(self, loop: asyncio.AbstractEventLoop):
+        """
+        Provides the event loop of the server to services which run on an event loop
+        """
+        pass
+
+    async def shutdown(self):
+        """
+        Closes the connections of the service when the server shuts down
+        """
+        pass
+
+    def get_statistics(self) -> dict:
+        """
+        :return: Counters of the weather requests
+        """
+        return {}
+
+
+def weather_url(lat: float, lon: float, units: str, api_key: str) -> str:
+    return f"http://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&units={units}&appid={api_key}"
+
+
+def parse_weather_info(json_response: dict) -> dict:
+    return {
+        "weather": {
+            "main": json_response["weather"][0]["main"],
+            "description": json_response["weather"][0]["description"],
+        },
+        "main": json_response["main"],
+        "wind": json_response["wind"],
+    }
+
 
 class WeatherService(WeatherServiceInterface):
-    def __init__(self, lat: float, lon: float, api_key: str):
+    def __init__(
+        self,
+        lat: float,
+        lon: float,
+        api_key: str,
+        session_pool: Optional[SessionPool] = None,
+    ):
+        self.session_pool = session_pool or SessionPool()
         self.api_key = api_key
         self.lat = lat
         self.lon = lon
@@ -22,18 +77,71 @@ class WeatherService(WeatherServiceInterface):
 
     def request_weather_info(self) -> dict:
         if time.time() > self.last_request_time + 60:
-            self.base_url = f"http://api.openweathermap.org/data/2.5/weather?lat={self.lat}&lon={self.lon}&units={self.units}&appid={self.api_key}"
-            req = requests.post(self.base_url)
+            self.base_url = weather_url(self.lat, self.lon, self.units, self.api_key)
             self.last_request_time = time.time()
+            weather_info = self.fetch_weather_info(self.lat, self.lon)
+            if weather_info is not None:
+                self.weather_info = weather_info
+
+        return self.weather_info
+
+    def fetch_weather_info(self, lat: float, lon: float) -> Optional[dict]:
+        try:
+            req = self.session_pool.post(
+                weather_url(lat, lon, self.units, self.api_key)
+            )
+        except requests.RequestException as e:
+            logging.warning(f"Could not request weather data: {e}")
+            return None
+
+        if req.status_code == 200:
+            return parse_weather_info(req.json())
+        return None
+
 
-            if req.status_code == 200:
-                self.weather_info = {}
-                json_response = req.json()
-                self.weather_info["weather"] = {
-                    "main": json_response["weather"][0]["main"],
-                    "description": json_response["weather"][0]["description"],
-                }
-                self.weather_info["main"] = json_response["main"]
-                self.weather_info["wind"] = json_response["wind"]
+class AsyncWeatherService(AsyncHTTPClient, WeatherServiceInterface):
+    """
+    Requests the weather data with an asyncio HTTP client
+    """
+
+    def __init__(
+        self,
+        lat: float,
+        lon: float,
+        api_key: str,
+        settings: Optional[HTTPSettings] = None,
+    ):
+        super().__init__(settings, max_concurrent_requests=1)
+        self.api_key = api_key
+        self.lat = lat
+        self.lon = lon
+        self.units = "metric"
+        self.weather_info: dict = {}
+        self.last_request_time: float = 0
+
+    def request_weather_info(self) -> dict:
+        return self.run_and_wait(self.request_weather_info_async())
+
+    async def request_weather_info_async(self) -> dict:
+        if time.time() > self.last_request_time + 60:
+            self.last_request_time = time.time()
+            weather_info = await self.fetch_weather_info_async(self.lat, self.lon)
+            if weather_info is not None:
+                self.weather_info = weather_info
 
         return self.weather_info
+
+    def fetch_weather_info(self, lat: float, lon: float) -> Optional[dict]:
+        return self.run_and_wait(self.fetch_weather_info_async(lat, lon))
+
+    async def fetch_weather_info_async(self, lat: float, lon: float) -> Optional[dict]:
+        url = weather_url(lat, lon, self.units, self.api_key)
+        try:
+            status, body = await self.request("POST", url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.warning(f"Could not request weather data: {e!r}")
+            return None
+
+        if status == 200:
+            return parse_weather_info(json.loads(body))
+        return None
@@ -1,5 +1,9 @@
+import os
+
 from bird_detection.bird_recorder_service import BirdRecorder
 from bird_detection.station_type import BirdRecorderType
+from bird_detection.storage.prediction_store import FilePredictionStore
+from bird_detection.storage.retention import RetentionManager
 from tests.stubs import (
     SoundDeviceStub,
     MQTTStub,
@@ -9,7 +13,10 @@ from tests.stubs import (
 )
 
 
-def create_bird_recorder(station_type: BirdRecorderType):
+def create_bird_recorder(station_type: BirdRecorderType, directory: str):
+    """
+    :param directory: The directory for the clips and predictions of the station
+    """
     sound_device = SoundDeviceStub()
     host_url = "http://localhost"
     mqtt_service = MQTTStub("test_broker", 1883)
@@ -18,6 +25,10 @@ def create_bird_recorder(station_type: BirdRecorderType):
     weather_service = WeatherServiceStub()
     recording_time = 3
     accuracy_threshold = 0.6
+    sound_directory = os.path.join(directory, "data")
+    prediction_store = FilePredictionStore(
+        os.path.join(directory, "test_predictions.txt")
+    )
     bird_recorder = BirdRecorder(
         station_type,
         sound_device,
@@ -28,25 +39,37 @@ def create_bird_recorder(station_type: BirdRecorderType):
         weather_service,
         recording_time,
         accuracy_threshold,
-        prediction_file="test_predictions.txt",
+        prediction_store=prediction_store,
+        retention_manager=RetentionManager(sound_directory, prediction_store),
     )
+    bird_recorder.sound_directory = sound_directory
 
     return bird_recorder
 
 
-def create_offline_bird_recorder():
-    return create_bird_recorder(BirdRecorderType.OFFLINE)
+def create_offline_bird_recorder(directory: str):
+    return create_bird_recorder(BirdRecorderType.OFFLINE, directory)
 
 
-def create_offline_classification_bird_recorder():
-    return create_bird_recorder(BirdRecorderType.OFFLINE_CLASSIFICATION)
+def create_offline_classification_bird_recorder(directory: str):
+    return create_bird_recorder(BirdRecorderType.OFFLINE_CLASSIFICATION, directory)
 
 
-def create_online_bird_recorder():
-    return create_bird_recorder(BirdRecorderType.ONLINE)
+def create_online_bird_recorder(directory: str):
+    return create_bird_recorder(BirdRecorderType.ONLINE, directory)
 
 
-def create_online_bird_recorder_without_weather():
-    bird_recorder = create_bird_recorder(BirdRecorderType.ONLINE)
+def create_online_bird_recorder_without_weather(directory: str):
+    bird_recorder = create_bird_recorder(BirdRecorderType.ONLINE, directory)
     bird_recorder.weather_service = None
     return bird_recorder
+
+
+def close_bird_recorder(bird_recorder: BirdRecorder):
+    """
+    Stops the recording and the background threads of a station
+    """
+    bird_recorder.stop_recording()
+    if bird_recorder.retention_manager:
+        bird_recorder.retention_manager.close()
+    bird_recorder.prediction_store.close()
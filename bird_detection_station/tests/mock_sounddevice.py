@@ -28,3 +28,22 @@ def mock_sounddevice_module():
     sounddevice_module.DeviceList = []  # type: ignore
     sounddevice_module.query_devices.side_effect = query_devices  # type: ignore
     sys.modules[module_name] = sounddevice_module
+
+
+class InputStreamStub:
+    """
+    Replaces sounddevice.InputStream and feeds the given blocks to the callback
+    as soon as the stream is opened
+    """
+
+    def __init__(self, blocks, **kwargs):
+        self.blocks = blocks
+        self.callback = kwargs["callback"]
+
+    def __enter__(self):
+        for block in self.blocks:
+            self.callback(block, len(block), None, None)
+        return self
+
+    def __exit__(self, *args):
+        pass
@@ -1,6 +1,13 @@
+import time
+from datetime import datetime
+
 from requests import Response
 
-from bird_detection.audio.audio_services import AudioRecorderService, AudioStreamFormat
+from bird_detection.audio.audio_services import (
+    AudioRecorderService,
+    AudioStreamFormat,
+    Segment,
+)
 
 import numpy as np  # type: ignore
 
@@ -11,6 +18,16 @@ from bird_detection.mqtt.mqtt_service import MQTTServiceInterface
 from bird_detection.weather.weather_service import WeatherServiceInterface
 
 
+def wait_until(condition, timeout=2.0):
+    """
+    Waits for a condition which a background thread fulfills
+    """
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
 class DeviceSelectorMock:
     def __init__(self):
         self.selected_device = None
@@ -38,6 +55,9 @@ class SoundDeviceStub(AudioRecorderService):
         sound_device_selector: DeviceSelector = None,
         audio_format: AudioStreamFormat = None,
         threshold: float = 0.02,
+        pre_trigger_seconds: float = 0.5,
+        capture_queue_size: int = 8,
+        trigger_detector=None,
     ):
         self.sample_rate = 48000
         self.channels = 1
@@ -72,6 +92,16 @@ class SoundDeviceStub(AudioRecorderService):
     ) -> str:
         return "Soundscape_1.wav"
 
+    def capture_sound(self, record_seconds: int = 3):
+        return Segment(
+            datetime.now(),
+            np.zeros(record_seconds * self.sample_rate, dtype=np.float32),
+            self.sample_rate,
+        )
+
+    def save_audio(self, file_name: str, recording, sound_directory: str = "data"):
+        pass
+
     def start_audio_stream(self):
         pass
 
@@ -94,10 +124,10 @@ class MQTTStub(MQTTServiceInterface):
 
 
 class RestClientStub(RestClientInterface):
-    def __init__(self, classifier_url: str):
+    def __init__(self, classifier_url: str, session_pool=None):
         pass
 
-    def post_wav(self, file_name: str):
+    def post_wav(self, file_name: str, data=None, content_type="audio/x-wav"):
         response = Response()
         response.status_code = 200
         response._content = b'{"Result":[{"Common Name":"Common Chaffinch","Confidence":0.6541699290275574}]}'
@@ -116,7 +146,13 @@ class GPSServiceStub(LocationServiceInterface):
 
 
 class WeatherServiceStub(WeatherServiceInterface):
-    def __init__(self, lat: float = None, lon: float = None, api_key: str = None):
+    def __init__(
+        self,
+        lat: float = None,
+        lon: float = None,
+        api_key: str = None,
+        session_pool=None,
+    ):
         pass
 
     def request_weather_info(self):
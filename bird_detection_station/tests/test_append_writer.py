@@ -0,0 +1,50 @@
+from bird_detection.storage.append_writer import (
+    FsyncPolicy,
+    GroupCommitWriter,
+    decode_record,
+    encode_record,
+    recover,
+)
+
+
+def test_records_are_checksummed():
+    record = encode_record(b'{"Time": "2021-05-01 06:00:00"}')
+    assert record.endswith(b"\n")
+    assert decode_record(record) == b'{"Time": "2021-05-01 06:00:00"}'
+    assert decode_record(record.replace(b"06:00", b"07:00")) is None
+    assert decode_record(b'{"Time": "2021-05-01 06:00:00"}\n') is not None
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    path = str(tmp_path / "predictions.txt")
+    valid = encode_record(b'{"Result": []}')
+    with open(path, "wb") as data:
+        data.write(valid + valid[:-1].replace(b"[]", b"[1]") + b"\n" + valid[:7])
+
+    assert recover(path) == len(valid) + 1 + 7
+    with open(path, "rb") as data:
+        assert data.read() == valid
+
+
+def test_records_are_written_in_groups(tmp_path):
+    committed = []
+    writer = GroupCommitWriter(
+        str(tmp_path / "predictions.txt"),
+        on_commit=committed.extend,
+        batch_size=4,
+        max_delay=10,
+        fsync_policy=FsyncPolicy.ALWAYS,
+    )
+    ends = []
+    for _ in range(2):
+        futures = [writer.append(b'{"Result": []}') for _ in range(4)]
+        ends += [future.result(timeout=1) for future in futures]
+    writer.close()
+
+    record_size = len(encode_record(b'{"Result": []}'))
+    assert ends == [record_size * (i + 1) for i in range(8)]
+    assert committed == ends
+    statistics = writer.get_statistics()
+    assert statistics["batches"] == 2
+    assert statistics["fsyncs"] == 2
+    assert statistics["latency_ms"]["p99"] >= statistics["latency_ms"]["p50"]
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np  # type: ignore
+import pytest  # type: ignore
+
+from bird_detection.http.async_client import AsyncRestClient
+from bird_detection.weather.weather_service import AsyncWeatherService
+
+
+class SlowClassifierHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(0.2)
+        body = b'{"Result": [{"Common Name": "Common Chaffinch", "Confidence": 0.9}]}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def classifier_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowClassifierHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_recordings_are_classified_concurrently(classifier_url):
+    rest_client = AsyncRestClient(classifier_url, max_concurrent_requests=4)
+    recording = np.zeros(4800, dtype=np.float32)
+
+    start_time = time.perf_counter()
+    futures = [rest_client.submit(f"{i}.wav", recording) for i in range(8)]
+    predictions = [future.result(timeout=10) for future in futures]
+    duration = time.perf_counter() - start_time
+
+    assert all(
+        prediction["Result"][0]["Common Name"] == "Common Chaffinch"
+        for prediction in predictions
+    )
+    statistics = rest_client.get_statistics()
+    assert statistics["requests"] == 8
+    assert statistics["max_active_requests"] == 4
+    # Two rounds of four concurrent requests instead of eight sequential ones
+    assert duration < 8 * 0.2
+
+
+def test_shutdown_closes_the_client_and_its_loop(classifier_url):
+    rest_client = AsyncRestClient(classifier_url)
+    rest_client.submit("clip.wav", np.zeros(4800, dtype=np.float32)).result(timeout=5)
+    client = rest_client.client
+    loop = rest_client.own_loop
+
+    asyncio.run(rest_client.shutdown())
+
+    assert client.closed
+    assert rest_client.client is None
+    for _ in range(100):
+        if loop.is_closed():
+            break
+        time.sleep(0.01)
+    assert loop.is_closed()
+
+
+def test_blocking_call_on_the_client_loop_fails():
+    weather_service = AsyncWeatherService(52.5, 13.4, "api key")
+
+    async def refresh():
+        # A refresh callback on the loop of the client has to await the coroutine
+        return weather_service.request_weather_info()
+
+    with pytest.raises(RuntimeError):
+        weather_service.run(refresh()).result(timeout=5)
+    asyncio.run(weather_service.shutdown())
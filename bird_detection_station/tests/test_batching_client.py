@@ -0,0 +1,102 @@
+import threading
+import time
+
+import numpy as np  # type: ignore
+import pytest  # type: ignore
+import requests
+
+from bird_detection.http.batching_client import BatchingRestClient
+
+
+class MockBatchResponse:
+    def __init__(self, files):
+        self.status_code = 200
+        self.results = {
+            file_name: [{"Common Name": file_name, "Confidence": 0.99}]
+            for _, (file_name, _, _) in files
+            if file_name != "silence.wav"
+        }
+
+    def json(self):
+        return {"Results": self.results}
+
+
+def test_recordings_are_sent_in_one_batch(monkeypatch):
+    batches = []
+    lock = threading.Lock()
+
+    def mock_request(session, method, url, files=None, **kwargs):
+        with lock:
+            batches.append((url, [file_name for _, (file_name, _, _) in files]))
+        return MockBatchResponse(files)
+
+    monkeypatch.setattr(requests.Session, "request", mock_request)
+    rest_client = BatchingRestClient("http://classifier", batch_size=3, batch_wait=5)
+    recording = np.zeros(480, dtype=np.float32)
+    futures = [
+        rest_client.submit(file_name, recording)
+        for file_name in ["first.wav", "silence.wav", "second.wav"]
+    ]
+
+    first, silence, second = [future.result(timeout=1) for future in futures]
+    assert first["Result"][0]["Common Name"] == "first.wav"
+    assert silence is None
+    assert second["Result"][0]["Common Name"] == "second.wav"
+    assert batches == [
+        (
+            "http://classifier/actions/analyse_batch",
+            ["first.wav", "silence.wav", "second.wav"],
+        )
+    ]
+    assert rest_client.get_statistics()["average_batch_size"] == 3
+
+
+def test_incomplete_batch_is_sent_after_wait(monkeypatch):
+    def mock_request(session, method, url, files=None, **kwargs):
+        return MockBatchResponse(files)
+
+    monkeypatch.setattr(requests.Session, "request", mock_request)
+    rest_client = BatchingRestClient("http://classifier", batch_size=8, batch_wait=0.05)
+
+    prediction = rest_client.post_wav("clip.wav", b"RIFF")
+    assert prediction["Result"][0]["Common Name"] == "clip.wav"
+    assert rest_client.get_statistics()["batches"] == 1
+
+
+def test_left_over_recording_keeps_its_deadline(monkeypatch):
+    first_request = threading.Event()
+
+    def mock_request(session, method, url, files=None, **kwargs):
+        if not first_request.is_set():
+            first_request.set()
+            time.sleep(0.2)
+        return MockBatchResponse(files)
+
+    monkeypatch.setattr(requests.Session, "request", mock_request)
+    rest_client = BatchingRestClient("http://classifier", batch_size=2, batch_wait=0.3)
+    recording = b"RIFF"
+    start = time.monotonic()
+    rest_client.submit("a.wav", recording)
+    rest_client.submit("b.wav", recording)
+    first_request.wait(timeout=1)
+    # While the first batch is sent, a full batch and one more recording queue up
+    futures = [
+        rest_client.submit(file_name, recording)
+        for file_name in ["c.wav", "d.wav", "e.wav"]
+    ]
+
+    assert futures[2].result(timeout=1)["Result"][0]["Common Name"] == "e.wav"
+    assert time.monotonic() - start < 0.42
+
+
+def test_close_fails_the_pending_recordings():
+    rest_client = BatchingRestClient("http://classifier", batch_size=8, batch_wait=5)
+    future = rest_client.submit("first.wav", np.zeros(480, dtype=np.float32))
+
+    rest_client.close()
+
+    assert not rest_client.thread.is_alive()
+    with pytest.raises(RuntimeError):
+        future.result(timeout=0)
+    with pytest.raises(RuntimeError):
+        rest_client.post_wav("second.wav", np.zeros(480, dtype=np.float32))
@@ -3,7 +3,10 @@ import os
 import pytest  # type: ignore
 import bird_detection.bird_recorder_service as bird_recorder_module
 from bird_detection.bird_recorder_service import BirdRecorder
+from bird_detection.config import Config
+from bird_detection.station_type import BirdRecorderType
 from tests.bird_recorder_factory import (
+    close_bird_recorder,
     create_offline_bird_recorder,
     create_online_bird_recorder,
     create_online_bird_recorder_without_weather,
@@ -17,7 +20,16 @@ from tests.stubs import (
 )
 
 
-def test_create_bird_recorder(monkeypatch):
+def get_latest_prediction(bird_recorder):
+    predictions, _ = bird_recorder.prediction_store.query(limit=1, newest_first=True)
+    return predictions[0]
+
+
+def test_create_bird_recorder(monkeypatch, tmp_path):
+    # The station keeps its clips and predictions in the working and root directory
+    monkeypatch.setattr(Config.get_config(), "root_dir", str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(BirdRecorder, "instance", None)
     monkeypatch.setattr(bird_recorder_module, "DeviceSelector", DeviceSelectorMock)
     monkeypatch.setattr(bird_recorder_module, "SoundDevice", SoundDeviceStub)
     monkeypatch.setattr(bird_recorder_module, "WeatherService", WeatherServiceStub)
@@ -25,25 +37,28 @@ def test_create_bird_recorder(monkeypatch):
     monkeypatch.setattr(bird_recorder_module, "RestClient", RestClientStub)
     bird_recorder = BirdRecorder.get_bird_recorder()
     assert bird_recorder is not None
+    close_bird_recorder(bird_recorder)
 
 
 @pytest.fixture()
-def bird_recorder_offline():
-    yield create_offline_bird_recorder()
+def bird_recorder_offline(tmp_path):
+    bird_recorder = create_offline_bird_recorder(str(tmp_path))
+    yield bird_recorder
+    close_bird_recorder(bird_recorder)
 
 
 @pytest.fixture()
-def bird_recorder_online():
-    yield create_online_bird_recorder()
-    # Cleanup
-    os.remove("test_predictions.txt")
+def bird_recorder_online(tmp_path):
+    bird_recorder = create_online_bird_recorder(str(tmp_path))
+    yield bird_recorder
+    close_bird_recorder(bird_recorder)
 
 
 @pytest.fixture()
-def bird_recorder_online_without_weather():
-    yield create_online_bird_recorder_without_weather()
-    # Cleanup
-    os.remove("test_predictions.txt")
+def bird_recorder_online_without_weather(tmp_path):
+    bird_recorder = create_online_bird_recorder_without_weather(str(tmp_path))
+    yield bird_recorder
+    close_bird_recorder(bird_recorder)
 
 
 def test_filter_results(bird_recorder_offline):
@@ -76,10 +91,10 @@ def test_filter_results(bird_recorder_offline):
 def test_process_prediction_online(bird_recorder_online):
     rest_client = RestClientStub("test_server")
     response = rest_client.post_wav("blub")
-    recording_count = len(bird_recorder_online.recordings)
+    recording_count = bird_recorder_online.prediction_store.count()
     bird_recorder_online._process_prediction(response, "dummyfile")
-    assert recording_count + 1 == len(bird_recorder_online.recordings)
-    inserted_bird = bird_recorder_online.recordings[-1]
+    assert recording_count + 1 == bird_recorder_online.prediction_store.count()
+    inserted_bird = get_latest_prediction(bird_recorder_online)
     assert inserted_bird["Result"][0]["Common Name"] == "Common Chaffinch"
 
 
@@ -88,10 +103,13 @@ def test_process_prediction_online_without_weather(
 ):
     rest_client = RestClientStub("test_server")
     response = rest_client.post_wav("blub")
-    recording_count = len(bird_recorder_online_without_weather.recordings)
+    recording_count = bird_recorder_online_without_weather.prediction_store.count()
     bird_recorder_online_without_weather._process_prediction(response, "dummyfile")
-    assert recording_count + 1 == len(bird_recorder_online_without_weather.recordings)
-    inserted_bird = bird_recorder_online_without_weather.recordings[-1]
+    assert (
+        recording_count + 1
+        == bird_recorder_online_without_weather.prediction_store.count()
+    )
+    inserted_bird = get_latest_prediction(bird_recorder_online_without_weather)
     assert inserted_bird["Result"][0]["Common Name"] == "Common Chaffinch"
     assert inserted_bird["weather_info"] == "No weather data loaded"
 
@@ -100,3 +118,26 @@ def test_start_recording_offline(bird_recorder_offline):
     assert not bird_recorder_offline.recording
     bird_recorder_offline.start_recording()
     assert bird_recorder_offline.recording
+
+
+def test_negative_clip_is_not_saved(bird_recorder_offline, monkeypatch):
+    bird_recorder_offline.station_type = BirdRecorderType.OFFLINE_CLASSIFICATION
+    monkeypatch.setattr(
+        bird_recorder_offline.rest_client,
+        "post_wav",
+        lambda file_name, data, content_type: {"Result": []},
+    )
+
+    clip = bird_recorder_offline._encode_clip(bird_recorder_offline._capture_clip())
+    assert bytes(clip.encoded_data[:4]) == b"RIFF"
+    assert bird_recorder_offline._classify_clip(clip).result() is None
+    assert not os.path.exists(bird_recorder_offline.sound_directory)
+
+
+def test_positive_clip_is_saved(bird_recorder_online):
+    clip = bird_recorder_online._encode_clip(bird_recorder_online._capture_clip())
+    clip = bird_recorder_online._classify_clip(clip).result()
+    clip = bird_recorder_online._enrich_clip(clip)
+    bird_recorder_online._persist_clip(clip)
+    assert os.listdir(bird_recorder_online.sound_directory) == [clip.file_name]
+    assert get_latest_prediction(bird_recorder_online)["File"].endswith(clip.file_name)
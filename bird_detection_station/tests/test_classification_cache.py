@@ -0,0 +1,115 @@
+from concurrent.futures import Future
+
+import numpy as np  # type: ignore
+
+from bird_detection.audio.encoder import encode_wav
+from bird_detection.classification.classification_cache import ClassificationCache
+from bird_detection.classification.fingerprint import fingerprint, similarity
+from bird_detection.http.rest_client import RestClientInterface
+
+
+class CountingRestClient(RestClientInterface):
+    def __init__(self):
+        self.file_names = []
+        self.pending = None
+
+    def post_wav(self, file_name, data=None, content_type="audio/wav"):
+        self.file_names.append(file_name)
+        return {"Result": [{"Common Name": file_name, "Confidence": 0.9}]}
+
+    def submit(self, file_name, data=None, content_type="audio/wav"):
+        if self.pending is None:
+            return super().submit(file_name, data, content_type)
+        self.file_names.append(file_name)
+        return self.pending
+
+
+def song(frequency, seed=0, offset=0.0, volume=0.3):
+    """
+    A trill with three 0.6 s phrases in 3 s of background noise
+    """
+    time = np.arange(48000 * 3) / 48000 - offset
+    phrases = ((time % 1.0) < 0.6) & (time > 0)
+    trill = np.sin(2 * np.pi * (frequency + 300 * np.sin(2 * np.pi * time)) * time)
+    noise = 0.05 * np.random.default_rng(seed).standard_normal(len(time))
+    return (volume * phrases * trill + noise).astype(np.float32)
+
+
+def test_similar_songs_have_similar_fingerprints():
+    def signature(recording):
+        return fingerprint(recording, 48000)
+
+    chaffinch = signature(song(3000))
+
+    assert similarity(chaffinch, signature(song(3000, seed=1, volume=0.1))) > 0.9
+    assert similarity(chaffinch, signature(song(3000, seed=2, offset=0.25))) > 0.9
+    assert similarity(chaffinch, signature(song(4500, seed=3))) < 0.5
+    assert similarity(chaffinch, signature(song(3000, volume=0))) == 0
+
+
+def test_near_duplicates_get_the_cached_result():
+    rest_client = CountingRestClient()
+    cache = ClassificationCache(rest_client)
+
+    first = cache.post_wav("first.wav", encode_wav(song(3000), 48000))
+    first["Result"][0]["Confidence"] = 0
+    second = cache.post_wav(
+        "second.wav", encode_wav(song(3000, seed=1, offset=0.1), 48000)
+    )
+    other = cache.post_wav("other.wav", song(4500, seed=2))
+
+    assert rest_client.file_names == ["first.wav", "other.wav"]
+    assert second == {"Result": [{"Common Name": "first.wav", "Confidence": 0.9}]}
+    assert other["Result"][0]["Common Name"] == "other.wav"
+    assert cache.get_statistics()["cache"] == {
+        "entries": 2,
+        "hits": 1,
+        "misses": 2,
+        "hit_rate": 0.333,
+    }
+
+
+def test_near_duplicates_wait_for_a_pending_classification():
+    rest_client = CountingRestClient()
+    rest_client.pending = Future()
+    cache = ClassificationCache(rest_client)
+
+    first = cache.submit("first.wav", song(3000))
+    second = cache.submit("second.wav", song(3000, seed=1))
+    assert not second.done()
+    rest_client.pending.set_result({"Result": [{"Common Name": "Chaffinch"}]})
+
+    assert second.result(timeout=1) == first.result(timeout=1)
+    assert rest_client.file_names == ["first.wav"]
+
+
+def test_expired_and_evicted_results_are_classified_again():
+    rest_client = CountingRestClient()
+    expiring_cache = ClassificationCache(rest_client, ttl=0)
+    expiring_cache.post_wav("first.wav", song(3000))
+    expiring_cache.post_wav("second.wav", song(3000, seed=1))
+
+    small_cache = ClassificationCache(rest_client, max_entries=1)
+    for file_name, frequency in [("a.wav", 3000), ("b.wav", 4500), ("c.wav", 3000)]:
+        small_cache.post_wav(file_name, song(frequency, seed=len(file_name)))
+
+    assert rest_client.file_names == [
+        "first.wav",
+        "second.wav",
+        "a.wav",
+        "b.wav",
+        "c.wav",
+    ]
+
+
+def test_failures_and_silence_are_not_cached():
+    rest_client = CountingRestClient()
+    rest_client.pending = Future()
+    rest_client.pending.set_exception(ConnectionError())
+    cache = ClassificationCache(rest_client)
+
+    cache.submit("failed.wav", song(3000))
+    cache.submit("silence.wav", song(3000, volume=0))
+
+    assert cache.get_statistics()["cache"]["entries"] == 0
+    assert rest_client.file_names == ["failed.wav", "silence.wav"]
@@ -0,0 +1,49 @@
+import numpy as np  # type: ignore
+
+import bird_detection.audio.encoder as encoder_module
+from bird_detection.audio.encoder import (
+    ClipEncoder,
+    ClipEncoding,
+    content_type_of,
+    decode,
+)
+
+
+def sine(frequency, sample_rate=48000, seconds=1.0):
+    time = np.arange(int(sample_rate * seconds)) / sample_rate
+    return (0.5 * np.sin(2 * np.pi * frequency * time)).astype(np.float32)
+
+
+def test_pcm16_halves_the_size():
+    recording = sine(3000)
+    float32 = ClipEncoder(ClipEncoding.FLOAT32).encode(recording, 48000)
+    pcm16 = ClipEncoder(ClipEncoding.PCM16).encode(recording, 48000)
+
+    assert len(pcm16) < len(float32) / 2 + 100
+    decoded, sample_rate = decode(pcm16)
+    assert sample_rate == 48000
+    assert np.max(np.abs(decoded / 32767 - recording)) < 1e-4
+
+
+def test_resampling_removes_frequencies_above_nyquist():
+    encoder = ClipEncoder(ClipEncoding.FLOAT32, sample_rate=16000)
+    bird, _ = encoder.resample(sine(3000), 48000)
+    insect, sample_rate = encoder.resample(sine(12000), 48000)
+
+    assert sample_rate == 16000
+    assert len(bird) == 16000
+    assert np.sqrt(np.mean(np.square(bird))) > 0.3
+    assert np.sqrt(np.mean(np.square(insect))) < 0.01
+
+
+def test_flac_falls_back_to_wav_without_soundfile(monkeypatch):
+    monkeypatch.setattr(encoder_module, "soundfile", None)
+    encoder = ClipEncoder(ClipEncoding.FLAC)
+
+    assert encoder.extension == ".wav"
+    assert bytes(encoder.encode(sine(3000), 48000)[:4]) == b"RIFF"
+
+
+def test_content_type_of_stored_files():
+    assert content_type_of("2021-05-01 06:00:00.flac") == "audio/flac"
+    assert content_type_of("2021-05-01 06:00:00.wav") == "audio/x-wav"
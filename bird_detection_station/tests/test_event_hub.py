@@ -0,0 +1,75 @@
+import asyncio
+import threading
+
+import pytest  # type: ignore
+
+from bird_detection.event_hub import EventHub
+from bird_detection.pipeline import BackpressurePolicy
+
+
+def test_events_are_published_from_other_threads():
+    hub = EventHub()
+
+    async def receive():
+        subscriptions = [hub.subscribe() for _ in range(100)]
+        publisher = threading.Thread(
+            target=lambda: [hub.publish(f'{{"Event": {i}}}') for i in range(3)]
+        )
+        publisher.start()
+        events = [[await s.get() for _ in range(3)] for s in subscriptions]
+        publisher.join()
+        return events
+
+    events = asyncio.run(receive())
+    assert all(
+        [event.data for event in subscriber_events]
+        == ['{"Event": 0}', '{"Event": 1}', '{"Event": 2}']
+        for subscriber_events in events
+    )
+    # All subscribers share the same serialized event
+    assert events[0][0] is events[-1][0]
+
+
+@pytest.mark.parametrize(
+    "policy, expected",
+    [
+        (BackpressurePolicy.DROP_OLDEST, [2, 3]),
+        (BackpressurePolicy.DROP_NEWEST, [0, 1]),
+    ],
+)
+def test_slow_subscribers_drop_events(policy, expected):
+    hub = EventHub(queue_size=2, policy=policy)
+
+    async def receive():
+        subscription = hub.subscribe()
+        for i in range(4):
+            hub.publish(str(i))
+        await asyncio.sleep(0)
+        return subscription, [int((await subscription.get()).data) for _ in range(2)]
+
+    subscription, events = asyncio.run(receive())
+    assert events == expected
+    assert subscription.dropped == 2
+
+
+def test_closed_subscriptions_are_removed():
+    hub = EventHub()
+
+    async def subscribe():
+        with hub.subscribe():
+            assert hub.get_statistics()["subscribers"] == 1
+        hub.subscribe()
+
+    asyncio.run(subscribe())
+    assert hub.get_statistics()["subscribers"] == 1
+    hub.publish("{}")
+    assert hub.get_statistics()["subscribers"] == 0
+
+
+def test_replay_buffer_keeps_recent_events():
+    hub = EventHub(replay_size=3)
+    for i in range(5):
+        hub.publish(str(i))
+
+    assert [event.data for event in hub.replay(3)] == ["3", "4"]
+    assert [event.data for event in hub.replay(0)] == ["2", "3", "4"]
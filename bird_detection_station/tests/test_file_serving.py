@@ -0,0 +1,38 @@
+import pytest  # type: ignore
+
+from bird_detection.http.file_serving import (
+    RangeNotSatisfiable,
+    is_not_modified,
+    parse_range,
+)
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=-200", 100) == (0, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    # Multiple and invalid ranges are answered with the whole file
+    assert parse_range("bytes=0-9,20-29", 100) is None
+    assert parse_range("bytes=9-0", 100) is None
+    assert parse_range("items=0-9", 100) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=100-", 100)
+
+
+def test_is_not_modified():
+    etag = '"10-abc"'
+    assert is_not_modified({"if-none-match": etag}, etag, 0)
+    assert is_not_modified({"if-none-match": '"other", ' + etag}, etag, 0)
+    assert not is_not_modified({"if-none-match": '"other"'}, etag, 0)
+    last_modified = "Sun, 18 Oct 2026 06:00:00 GMT"
+    assert is_not_modified({"if-modified-since": last_modified}, etag, 1792303200)
+    assert not is_not_modified({"if-modified-since": last_modified}, etag, 1792303201)
+    # If-None-Match takes precedence over If-Modified-Since
+    assert not is_not_modified(
+        {"if-none-match": '"other"', "if-modified-since": last_modified},
+        etag,
+        0,
+    )
@@ -0,0 +1,149 @@
+import numpy as np  # type: ignore
+import pytest  # type: ignore
+
+import bird_detection.classification.local_classifier as local_classifier
+from bird_detection.audio.encoder import encode_wav
+from bird_detection.classification.local_classifier import (
+    LocalClassifier,
+    load_labels,
+)
+
+LABELS = [
+    "Fringilla coelebs_Common Chaffinch",
+    "Turdus merula_Eurasian Blackbird",
+    "Noise_Noise",
+]
+
+
+class FakeInterpreter:
+    """
+    Scores the chaffinch by the loudness of a chunk and the noise by its silence
+    """
+
+    instances: list = []
+    input_shape = [1, 144000]
+
+    def __init__(self, model_path, num_threads=None):
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.tensors = {}
+        self.shapes = {}
+        self.allocations = 0
+        self.invocations = 0
+        FakeInterpreter.instances.append(self)
+
+    def get_input_details(self):
+        return [
+            {"index": 0, "shape": np.array(FakeInterpreter.input_shape)},
+            {"index": 1, "shape": np.array([1, 6])},
+        ]
+
+    def get_output_details(self):
+        return [{"index": 2}]
+
+    def resize_tensor_input(self, index, shape):
+        self.shapes[index] = shape
+
+    def allocate_tensors(self):
+        self.allocations += 1
+
+    def set_tensor(self, index, value):
+        assert list(value.shape) == self.shapes[index]
+        self.tensors[index] = value
+
+    def invoke(self):
+        self.invocations += 1
+        chunks = self.tensors[0]
+        loudness = np.max(np.abs(chunks.reshape(len(chunks), -1)), axis=1)
+        scores = np.zeros((len(loudness), len(LABELS)), dtype=np.float32)
+        scores[:, 0] = loudness * 10 - 2
+        scores[:, 2] = 1 - loudness * 10
+        self.tensors[2] = scores
+
+    def get_tensor(self, index):
+        return self.tensors[index]
+
+
+@pytest.fixture
+def labels_file(tmp_path):
+    path = tmp_path / "labels.txt"
+    path.write_text("\n".join(LABELS) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def classifier(monkeypatch, labels_file):
+    FakeInterpreter.instances = []
+    monkeypatch.setattr(local_classifier, "Interpreter", FakeInterpreter)
+    return LocalClassifier("model.tflite", labels_file, num_threads=2)
+
+
+def sine(seconds, sample_rate=48000):
+    time = np.arange(int(sample_rate * seconds)) / sample_rate
+    return (0.5 * np.sin(2 * np.pi * 3000 * time)).astype(np.float32)
+
+
+def test_classifies_all_chunks_in_one_invocation(classifier):
+    interpreter = FakeInterpreter.instances[0]
+    assert interpreter.num_threads == 2
+    assert interpreter.invocations == 1
+
+    prediction = classifier.post_wav("clip.wav", encode_wav(sine(5), 48000))
+
+    assert prediction["Result"][0]["Common Name"] == "Common Chaffinch"
+    assert len(prediction["Result"]) == 1
+    assert prediction["Result"][0]["Confidence"] > 0.9
+    assert interpreter.invocations == 2
+    assert interpreter.shapes[0] == [3, 144000]
+    assert interpreter.shapes[1] == [3, 6]
+    assert np.all(interpreter.tensors[1][:, :3] == -1)
+    assert np.all(interpreter.tensors[1][:, 3:] == 0)
+    assert classifier.get_statistics()["recordings"] == 1
+    assert classifier.get_statistics()["chunks"] == 3
+
+
+def test_resamples_and_pads_short_recordings(classifier):
+    interpreter = FakeInterpreter.instances[0]
+
+    prediction = classifier.post_wav("clip.wav", encode_wav(sine(1, 16000), 16000))
+
+    assert prediction["Result"][0]["Common Name"] == "Common Chaffinch"
+    assert interpreter.shapes[0] == [1, 144000]
+
+
+def test_noise_is_not_a_detection(classifier):
+    recording = np.zeros(48000 * 4, dtype=np.float32)
+
+    assert classifier.post_wav("clip.wav", encode_wav(recording, 48000)) is None
+    assert classifier.get_statistics()["chunks"] == 2
+
+
+def test_computes_the_spectrograms_for_models_without_the_layer(
+    monkeypatch, labels_file
+):
+    FakeInterpreter.instances = []
+    monkeypatch.setattr(FakeInterpreter, "input_shape", [1, 257, 384, 1])
+    monkeypatch.setattr(local_classifier, "Interpreter", FakeInterpreter)
+    classifier = LocalClassifier("model.tflite", labels_file)
+    interpreter = FakeInterpreter.instances[0]
+
+    prediction = classifier.post_wav("clip.wav", encode_wav(sine(5), 48000))
+
+    assert prediction["Result"][0]["Common Name"] == "Common Chaffinch"
+    assert interpreter.shapes[0] == [3, 257, 384, 1]
+    silence = np.zeros(48000 * 3, dtype=np.float32)
+    assert classifier.post_wav("silence.wav", encode_wav(silence, 48000)) is None
+
+
+def test_requires_an_interpreter(monkeypatch, labels_file):
+    monkeypatch.setattr(local_classifier, "Interpreter", None)
+
+    with pytest.raises(ValueError):
+        LocalClassifier("model.tflite", labels_file)
+
+
+def test_loads_the_labels_of_the_classification_service(tmp_path):
+    path = tmp_path / "labels.ts"
+    path.write_text('export const labels = ["A a_B b", "Noise_Noise"];\n')
+
+    assert load_labels(str(path)) == ["A a_B b", "Noise_Noise"]
@@ -1,8 +1,10 @@
+import time
+
 from serial import SerialException  # type: ignore
 
 import bird_detection.gps.location_service
 
-from bird_detection.gps.location_service import LocationService
+from bird_detection.gps.location_service import Location, LocationService
 
 
 class SerialStubError:
@@ -20,6 +22,7 @@ class SerialStub:
         return True
 
     def readline(self):
+        time.sleep(0.01)
         return b"$GPGGA,123011.345,5333.887,N,01000.399,E,1,12,1.0,0.0,M,0.0,M,,*6F\r\n"
 
 
@@ -28,6 +31,7 @@ def test_is_GPS_sensor_attached(monkeypatch):
     location_service = LocationService()
     is_GPS_sensor_atteched = location_service.is_GPS_sensor_attached()
     assert is_GPS_sensor_atteched
+    location_service.close()
 
     monkeypatch.setattr(bird_detection.gps.location_service, "Serial", SerialStubError)
     location_service = LocationService()
@@ -37,7 +41,19 @@ def test_is_GPS_sensor_attached(monkeypatch):
 
 def test_get_valid_location(monkeypatch):
     monkeypatch.setattr(bird_detection.gps.location_service, "Serial", SerialStub)
-    location_service = LocationService()
+    location_service = LocationService(Location(lat="0.0", lon="0.0"))
+    fix = location_service.wait_for_fix(timeout=1)
+    assert fix.quality == 1
+    assert fix.age < 1
     location = location_service.get_valid_location()
     assert location.lat == "53.56478333333333"
     assert location.lon == "10.00665"
+    location_service.close()
+
+
+def test_fallback_location_without_sensor(monkeypatch):
+    monkeypatch.setattr(bird_detection.gps.location_service, "Serial", SerialStubError)
+    fallback = Location(lat="53.56", lon="10.00")
+    location_service = LocationService(fallback)
+    assert location_service.wait_for_fix(timeout=1) is None
+    assert location_service.get_valid_location() is fallback
@@ -0,0 +1,144 @@
+import itertools
+import time
+
+import paho.mqtt.client as mqtt  # type: ignore
+import pytest  # type: ignore
+
+from bird_detection.mqtt.mqtt_service import MQTTService
+from bird_detection.mqtt.outbox import MQTTOutbox
+from tests.stubs import wait_until
+
+
+class FakeMQTTClient:
+    """
+    Records the published messages instead of sending them to a broker
+    """
+
+    def __init__(self):
+        self.connected = False
+        self.published = []
+        self.mids = itertools.count(1)
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        info = mqtt.MQTTMessageInfo(next(self.mids))
+        info.rc = mqtt.MQTT_ERR_SUCCESS if self.connected else mqtt.MQTT_ERR_NO_CONN
+        if self.connected:
+            self.published.append((info.mid, topic, payload))
+        return info
+
+    def max_inflight_messages_set(self, inflight):
+        pass
+
+    def reconnect_delay_set(self, min_delay, max_delay):
+        pass
+
+    def connect_async(self, host, port, keepalive):
+        pass
+
+    def loop_start(self):
+        pass
+
+    def loop_stop(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+
+@pytest.fixture
+def outbox_file(tmp_path):
+    return str(tmp_path / "mqtt_outbox.db")
+
+
+def create_service(client, outbox_file, **kwargs) -> MQTTService:
+    return MQTTService(
+        "test_broker", 1883, outbox=MQTTOutbox(outbox_file), client=client, **kwargs
+    )
+
+
+def connect(service: MQTTService, client: FakeMQTTClient):
+    client.connected = True
+    service._on_connect(client, None, {}, 0)
+
+
+def test_outbox_keeps_messages_across_restarts(outbox_file):
+    outbox = MQTTOutbox(outbox_file, max_messages=3)
+    for i in range(5):
+        outbox.put("BirdEvent", b"%d" % i)
+    outbox.close()
+
+    outbox = MQTTOutbox(outbox_file, max_messages=3)
+    messages = outbox.peek(0, 10)
+    assert [message.payload for message in messages] == [b"2", b"3", b"4"]
+    assert outbox.depth == 3
+
+    outbox.remove([messages[0].id])
+    assert [message.payload for message in outbox.peek(0, 10)] == [b"3", b"4"]
+    assert outbox.depth == 2
+    outbox.close()
+
+
+def test_messages_published_while_disconnected_are_delivered_after_connecting(
+    outbox_file,
+):
+    client = FakeMQTTClient()
+    service = create_service(client, outbox_file, max_inflight=2)
+    for i in range(5):
+        service.publish("BirdEvent", f'{{"Event": {i}}}')
+    time.sleep(0.05)
+    assert client.published == []
+    assert service.get_statistics()["queue_depth"] == 5
+
+    connect(service, client)
+    # Only max_inflight messages are sent before the broker acknowledges them
+    wait_until(lambda: len(client.published) == 2)
+    time.sleep(0.05)
+    assert len(client.published) == 2
+
+    acknowledged = 0
+    while acknowledged < 5:
+        wait_until(lambda: len(client.published) > acknowledged)
+        service._on_publish(client, None, client.published[acknowledged][0])
+        acknowledged += 1
+
+    assert [payload for _, _, payload in client.published] == [
+        b'{"Event": %d}' % i for i in range(5)
+    ]
+    wait_until(lambda: service.get_statistics()["queue_depth"] == 0)
+    statistics = service.get_statistics()
+    assert statistics["published"] == 5
+    assert statistics["in_flight"] == 0
+    assert "p99" in statistics["latency_ms"]
+    service.close()
+
+
+def test_messages_without_acknowledgement_are_resent_after_reconnect(outbox_file):
+    client = FakeMQTTClient()
+    service = create_service(client, outbox_file, qos=0)
+    connect(service, client)
+    service.publish("BirdEvent", "first")
+    wait_until(lambda: len(client.published) == 1)
+
+    client.connected = False
+    service._on_disconnect(client, None, 1)
+    service.publish("BirdEvent", "second")
+    connect(service, client)
+    wait_until(lambda: len(client.published) == 3)
+    assert [payload for _, _, payload in client.published] == [
+        b"first",
+        b"first",
+        b"second",
+    ]
+    service.close()
+
+
+def test_rate_limit(outbox_file):
+    client = FakeMQTTClient()
+    service = create_service(client, outbox_file, rate_limit=50)
+    connect(service, client)
+    start = time.monotonic()
+    for i in range(6):
+        service.publish("BirdEvent", str(i))
+    wait_until(lambda: len(client.published) == 6)
+    assert time.monotonic() - start >= 0.09
+    service.close()
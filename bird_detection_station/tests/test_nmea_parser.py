@@ -0,0 +1,39 @@
+from functools import reduce
+
+from bird_detection.gps.nmea_parser import parse_fix
+
+
+def sentence(body: str) -> bytes:
+    checksum = reduce(lambda a, b: a ^ b, body.encode(), 0)
+    return f"${body}*{checksum:02X}\r\n".encode()
+
+
+def test_parse_gga_of_all_talkers():
+    for talker in ["GP", "GL", "GN"]:
+        line = sentence(
+            f"{talker}GGA,123011.345,5333.887,N,01000.399,E,2,12,1.0,0.0,M,0.0,M,,"
+        )
+        assert parse_fix(line) == (53.56478333333333, 10.00665, 2)
+
+
+def test_parse_rmc():
+    line = sentence("GNRMC,123011.00,A,5333.887,S,01000.399,W,0.1,,181026,,,A")
+    assert parse_fix(line) == (-53.56478333333333, -10.00665, 1)
+    line = sentence("GNRMC,123011.00,V,,,,,,,181026,,,N")
+    assert parse_fix(line) is None
+
+
+def test_skip_invalid_sentences():
+    # A wrong checksum
+    assert (
+        parse_fix(
+            b"$GPGGA,123011.345,5333.887,N,01000.399,E,1,12,1.0,0.0,M,0.0,M,,*00\r\n"
+        )
+        is None
+    )
+    # No fix
+    assert parse_fix(sentence("GPGGA,123011.345,,,,,0,00,99.9,,,,,,")) is None
+    # Other sentences
+    assert parse_fix(sentence("GPGSV,3,1,11,03,03,111,00,04,15,270,00")) is None
+    assert parse_fix(b"\xff\xfe$GPGGA,12") is None
+    assert parse_fix(b"") is None
@@ -0,0 +1,187 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from bird_detection.pipeline import (
+    BackpressurePolicy,
+    BoundedQueue,
+    Pipeline,
+    Stage,
+    StageConfig,
+)
+
+
+def test_bounded_queue_drop_oldest():
+    discarded = []
+    bounded_queue = BoundedQueue(2, BackpressurePolicy.DROP_OLDEST, discarded.append)
+    for item in range(4):
+        bounded_queue.put(item)
+    assert bounded_queue.dropped == 2
+    assert discarded == [0, 1]
+    assert bounded_queue.get(timeout=0) == 2
+    assert bounded_queue.get(timeout=0) == 3
+
+
+def test_bounded_queue_drop_newest():
+    discarded = []
+    bounded_queue = BoundedQueue(2, BackpressurePolicy.DROP_NEWEST, discarded.append)
+    for item in range(4):
+        bounded_queue.put(item)
+    assert bounded_queue.dropped == 2
+    assert discarded == [2, 3]
+    assert bounded_queue.get(timeout=0) == 0
+    assert bounded_queue.get(timeout=0) == 1
+
+
+def test_bounded_queue_wake_discards_the_waiting_items():
+    discarded = []
+    bounded_queue = BoundedQueue(4, BackpressurePolicy.BLOCK, discarded.append)
+    bounded_queue.put(1)
+    bounded_queue.put(2)
+    bounded_queue.wake(workers=2)
+    assert discarded == [1, 2]
+
+
+def test_pipeline_passes_items_through_stages():
+    items = iter(range(10))
+    results = []
+    done = threading.Event()
+
+    def source():
+        return next(items, None)
+
+    def collect(item):
+        results.append(item)
+        if len(results) == 5:
+            done.set()
+
+    pipeline = Pipeline(
+        [
+            Stage("source", source),
+            Stage("double", lambda item: item * 2, StageConfig(workers=3)),
+            Stage("filter", lambda item: item if item % 4 == 0 else None),
+            Stage("collect", collect),
+        ]
+    )
+    pipeline.start()
+    assert done.wait(timeout=5)
+    pipeline.stop()
+
+    assert sorted(results) == [0, 4, 8, 12, 16]
+    statistics = pipeline.get_statistics()
+    assert statistics["double"]["processed"] == 10
+    assert statistics["double"]["workers"] == 3
+
+
+def test_worker_keeps_futures_in_flight():
+    items = iter(range(4))
+    results = []
+    done = threading.Event()
+    requests = []
+
+    def submit(item):
+        future = Future()
+        requests.append((item, future))
+        return future
+
+    def collect(item):
+        results.append(item)
+        if len(results) == 4:
+            done.set()
+
+    pipeline = Pipeline(
+        [
+            Stage("source", lambda: next(items, None)),
+            Stage("classify", submit, StageConfig(concurrency=4)),
+            Stage("collect", collect),
+        ]
+    )
+    pipeline.start()
+    # A single worker submits all items before the first result arrives
+    while len(requests) < 4:
+        time.sleep(0.01)
+    for item, future in reversed(requests):
+        future.set_result(item)
+    assert done.wait(timeout=5)
+    pipeline.stop()
+
+    assert sorted(results) == [0, 1, 2, 3]
+
+
+def test_stop_waits_for_the_workers():
+    sounds: queue.Queue = queue.Queue()
+
+    def capture():
+        # Blocks like a capture which waits for the next sound
+        return sounds.get()
+
+    pipeline = Pipeline(
+        [
+            Stage("capture", capture, interrupt=lambda: sounds.put(None)),
+            Stage("encode", lambda item: item, StageConfig(workers=2)),
+        ]
+    )
+    pipeline.start()
+    threads = list(pipeline.threads)
+    start = time.monotonic()
+    pipeline.stop(timeout=2)
+
+    assert time.monotonic() - start < 0.4
+    assert not any(thread.is_alive() for thread in threads)
+    assert pipeline.threads == []
+
+
+def test_stop_processes_the_queued_items():
+    items = iter(range(10))
+    produced = threading.Event()
+    results = []
+
+    def source():
+        item = next(items, None)
+        if item is None:
+            produced.set()
+            time.sleep(0.01)
+        return item
+
+    def slow(item):
+        time.sleep(0.01)
+        return item
+
+    pipeline = Pipeline(
+        [
+            Stage("source", source),
+            Stage("slow", slow, StageConfig(queue_size=10)),
+            Stage("collect", results.append, StageConfig(queue_size=10)),
+        ]
+    )
+    pipeline.start()
+    assert produced.wait(timeout=5)
+    pipeline.stop()
+
+    assert results == list(range(10))
+
+
+def test_stop_drops_the_items_left_after_the_timeout():
+    items = iter(range(10))
+    discarded = []
+
+    def slow(item):
+        time.sleep(0.2)
+        return item
+
+    pipeline = Pipeline(
+        [
+            Stage("source", lambda: next(items, None)),
+            Stage("slow", slow, StageConfig(queue_size=10), discard=discarded.append),
+        ]
+    )
+    pipeline.start()
+    while pipeline.stages[1].input.qsize() < 8:
+        time.sleep(0.01)
+    start = time.monotonic()
+    pipeline.stop(timeout=0.3)
+
+    assert time.monotonic() - start < 1
+    assert len(discarded) >= 5
+    assert pipeline.get_statistics()["slow"]["dropped"] == len(discarded)
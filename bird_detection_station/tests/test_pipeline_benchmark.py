@@ -0,0 +1,47 @@
+import numpy as np  # type: ignore
+
+from benchmarks.pipeline_benchmark import find_regressions
+from benchmarks.synthetic_audio import SyntheticAudio
+
+
+def test_synthetic_audio_has_bursts_at_the_interval():
+    audio = SyntheticAudio(burst_interval=0.5, burst_seconds=0.1, sample_rate=8000)
+    samples = np.concatenate([audio.next_block() for _ in range(8)])[:, 0]
+
+    loud = np.flatnonzero(np.abs(samples) > 0.01)
+    assert 0 < loud[0] < 400
+    assert 4000 < loud[np.argmax(loud >= 2000)] < 4400
+    assert not np.any(samples[1000:4000])
+
+
+def test_noise_does_not_trigger():
+    audio = SyntheticAudio("noise", burst_interval=10, sample_rate=8000)
+    audio.position = 8000
+    block = audio.next_block()
+
+    assert 0 < np.sqrt(np.mean(np.square(block))) < 0.02
+
+
+def test_regressions_exceed_the_tolerance():
+    baselines = {
+        "scenario": {
+            "clips_per_second": 10,
+            "latency_p95_ms": 100,
+            "peak_rss_mb": 100,
+        }
+    }
+    results = {
+        "scenario": {
+            "clips_per_second": 7.5,
+            "latency_p95_ms": 125,
+            "peak_rss_mb": 103,
+        }
+    }
+
+    assert find_regressions(results, baselines, 0.3) == []
+    results["scenario"]["clips_per_second"] = 6.5
+    results["scenario"]["latency_p95_ms"] = 150
+    assert find_regressions(results, baselines, 0.3) == [
+        "scenario clips_per_second: 6.5 (baseline 10)",
+        "scenario latency_p95_ms: 150 (baseline 100)",
+    ]
@@ -0,0 +1,157 @@
+import json
+import sqlite3
+
+import pytest  # type: ignore
+
+from bird_detection.storage.prediction_store import FilePredictionStore
+import bird_detection.storage.sqlite_store as sqlite_store_module
+from bird_detection.storage.sqlite_store import SQLitePredictionStore
+
+
+def create_prediction(minute: int, species: str, confidence: float = 0.9) -> dict:
+    return {
+        "Result": [{"Common Name": species, "Confidence": confidence}],
+        "File": f"http://localhost/actions/files/2021-05-01 06:{minute:02d}:00.wav",
+        "Time": f"2021-05-01 06:{minute:02d}:00",
+        "GPS": {"lat": "50.0", "lon": "8.0"},
+        "weather_info": "No weather data loaded",
+    }
+
+
+@pytest.fixture(params=["sqlite", "file"])
+def prediction_store(request, tmp_path):
+    if request.param == "sqlite":
+        store = SQLitePredictionStore(str(tmp_path / "predictions.db"), batch_size=4)
+    else:
+        store = FilePredictionStore(str(tmp_path / "predictions.txt"))
+    for minute in range(10):
+        species = "Common Chaffinch" if minute % 2 else "Eurasian Blackbird"
+        store.add(create_prediction(minute, species))
+    yield store
+    store.close()
+
+
+def test_cursor_pagination(prediction_store):
+    times = []
+    cursor = None
+    while True:
+        predictions, cursor = prediction_store.query(cursor, limit=3)
+        times += [prediction["Time"] for prediction in predictions]
+        if cursor is None:
+            break
+
+    assert prediction_store.count() == 10
+    assert times == [f"2021-05-01 06:{minute:02d}:00" for minute in range(10)]
+
+
+def test_newest_first(prediction_store):
+    predictions, cursor = prediction_store.query(limit=2, newest_first=True)
+    assert [prediction["Time"][-5:] for prediction in predictions] == ["09:00", "08:00"]
+
+    predictions, _ = prediction_store.query(cursor, limit=2, newest_first=True)
+    assert [prediction["Time"][-5:] for prediction in predictions] == ["07:00", "06:00"]
+
+
+def test_time_range_and_species_filter(prediction_store):
+    predictions, cursor = prediction_store.query(
+        since="2021-05-01 06:02:00",
+        until="2021-05-01 06:07:00",
+        species="common chaffinch",
+    )
+    assert [prediction["Time"][-5:] for prediction in predictions] == ["03:00", "05:00"]
+    assert cursor is None
+
+
+def test_prediction_file_is_imported(tmp_path):
+    prediction_file = tmp_path / "predictions.txt"
+    with open(prediction_file, "w") as predictions:
+        predictions.write(json.dumps(create_prediction(0, "Common Chaffinch")) + "\n")
+        predictions.write('{"Result": [\n')
+        predictions.write(json.dumps(create_prediction(1, "Common Chaffinch")) + "\n")
+
+    store = SQLitePredictionStore(str(tmp_path / "predictions.db"))
+    assert store.is_new
+    assert store.import_file(str(prediction_file)) == 2
+    store.close()
+
+    store = SQLitePredictionStore(str(tmp_path / "predictions.db"))
+    assert not store.is_new
+    assert store.count() == 2
+    store.close()
+
+
+def test_failed_batch_stays_pending(tmp_path, monkeypatch):
+    store = SQLitePredictionStore(str(tmp_path / "predictions.db"), flush_interval=60)
+    insert = store._insert
+
+    def insert_on_full_disk(batch):
+        monkeypatch.setattr(store, "_insert", insert)
+        raise sqlite3.OperationalError("database or disk is full")
+
+    monkeypatch.setattr(store, "_insert", insert_on_full_disk)
+    store.add(create_prediction(0, "Common Chaffinch"))
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush()
+    store.add(create_prediction(1, "Eurasian Blackbird"))
+
+    assert store.count() == 2
+    predictions, _ = store.query()
+    assert [prediction["Time"] for prediction in predictions] == [
+        "2021-05-01 06:00:00",
+        "2021-05-01 06:01:00",
+    ]
+    store.close()
+
+
+def test_stream_in_pages(prediction_store, monkeypatch):
+    monkeypatch.setattr(sqlite_store_module, "STREAM_PAGE_SIZE", 4)
+    lines = list(prediction_store.stream())
+    assert [json.loads(line)["Time"][-5:] for line in lines] == [
+        f"{minute:02d}:00" for minute in range(10)
+    ]
+
+    lines = list(prediction_store.stream(since="2021-05-01 06:03:00", limit=5))
+    assert [json.loads(line)["Time"][-5:] for line in lines] == [
+        f"{minute:02d}:00" for minute in range(3, 8)
+    ]
+
+
+def test_index_is_extended_incrementally(tmp_path):
+    prediction_file = str(tmp_path / "predictions.txt")
+    store = FilePredictionStore(prediction_file)
+    for minute in range(3):
+        store.add(create_prediction(minute, "Common Chaffinch"))
+    store.close()
+
+    # Lines written by earlier versions without an index update
+    with open(prediction_file, "a") as predictions:
+        predictions.write(json.dumps(create_prediction(3, "Common Chaffinch")) + "\n")
+
+    store = FilePredictionStore(prediction_file)
+    assert store.scanned_lines == 1
+    assert store.count() == 4
+    predictions, _ = store.query(cursor="2")
+    assert predictions[0]["Time"][-5:] == "03:00"
+    store.close()
+
+    store = FilePredictionStore(prediction_file)
+    assert store.scanned_lines == 0
+    assert store.get_statistics()["predictions"] == 4
+    store.close()
+
+
+def test_index_is_rebuilt_for_a_replaced_file(tmp_path):
+    prediction_file = str(tmp_path / "predictions.txt")
+    store = FilePredictionStore(prediction_file)
+    for minute in range(3):
+        store.add(create_prediction(minute, "Common Chaffinch"))
+    store.close()
+
+    with open(prediction_file, "w") as predictions:
+        predictions.write(json.dumps(create_prediction(9, "Common Chaffinch")) + "\n")
+
+    store = FilePredictionStore(prediction_file)
+    assert store.count() == 1
+    predictions, _ = store.query()
+    assert predictions[0]["Time"][-5:] == "09:00"
+    store.close()
@@ -0,0 +1,47 @@
+import numpy as np  # type: ignore
+import requests
+
+import bird_detection.http.rest_client as rest_client_module
+from bird_detection.http.rest_client import RestClient
+from tests.test_server import MockResponse
+
+
+def test_post_wav_from_memory(monkeypatch):
+    sent_files = {}
+
+    def mock_request(session, method, url, files=None, **kwargs):
+        sent_files.update(files)
+        return MockResponse()
+
+    monkeypatch.setattr(requests.Session, "request", mock_request)
+    rest_client = RestClient("http://classifier")
+    prediction = rest_client.post_wav("clip.wav", np.zeros(480, dtype=np.float32))
+
+    assert prediction["Result"][0]["Common Name"] == "mock_response"
+    file_name, data, content_type = sent_files["wave"]
+    assert file_name == "clip.wav"
+    assert bytes(data[:4]) == b"RIFF"
+    assert content_type == "audio/x-wav"
+
+
+def test_rejected_content_type_is_sent_as_wav(monkeypatch):
+    sent_content_types = []
+
+    def mock_request(session, method, url, files=None, **kwargs):
+        file_name, data, content_type = files["wave"]
+        sent_content_types.append(content_type)
+        if content_type != "audio/x-wav":
+            response = MockResponse()
+            response.status_code = 415
+            return response
+        assert bytes(data[:4]) == b"RIFF"
+        return MockResponse()
+
+    monkeypatch.setattr(requests.Session, "request", mock_request)
+    monkeypatch.setattr(rest_client_module, "transcode_to_wav", lambda data: b"RIFF")
+    rest_client = RestClient("http://classifier")
+    for _ in range(2):
+        prediction = rest_client.post_wav("clip.flac", b"fLaC", "audio/flac")
+        assert prediction["Result"][0]["Common Name"] == "mock_response"
+
+    assert sent_content_types == ["audio/flac", "audio/x-wav", "audio/x-wav"]
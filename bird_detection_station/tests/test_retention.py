@@ -0,0 +1,106 @@
+import json
+import os
+import time
+
+from bird_detection.storage.prediction_store import FilePredictionStore
+from bird_detection.storage.retention import RetentionManager, RetentionPolicy
+from bird_detection.storage.sqlite_store import SQLitePredictionStore
+from tests.stubs import wait_until
+from tests.test_prediction_store import create_prediction
+
+
+def create_clips(directory, prediction_store, confidences):
+    directory.mkdir()
+    for minute, confidence in enumerate(confidences):
+        prediction = create_prediction(minute, "Common Chaffinch", confidence)
+        prediction_store.add(prediction)
+        clip = directory / (prediction["Time"] + ".wav")
+        clip.write_bytes(b"\0" * 100)
+        os.utime(clip, (time.time() - 600 + minute, time.time() - 600 + minute))
+
+
+def test_oldest_clips_are_deleted_and_expired(tmp_path):
+    store = SQLitePredictionStore(str(tmp_path / "predictions.db"))
+    create_clips(tmp_path / "data", store, [0.9, 0.8, 0.7, 0.6])
+    manager = RetentionManager(str(tmp_path / "data"), store, max_bytes=250)
+    wait_until(lambda: manager.get_statistics()["evicted_clips"] == 2)
+
+    assert sorted(os.listdir(tmp_path / "data")) == [
+        "2021-05-01 06:02:00.wav",
+        "2021-05-01 06:03:00.wav",
+    ]
+    predictions, _ = store.query()
+    assert [prediction["File"] is None for prediction in predictions] == [
+        True,
+        True,
+        False,
+        False,
+    ]
+    assert predictions[0]["File Expired"]
+
+    # Saved clips are added without scanning the directory again
+    (tmp_path / "data" / "new.wav").write_bytes(b"\0" * 100)
+    manager.add_clip("new.wav", 100, 0.9)
+    wait_until(lambda: manager.get_statistics()["evicted_clips"] == 3)
+    assert not os.path.isfile(tmp_path / "data" / "2021-05-01 06:02:00.wav")
+    manager.close()
+    store.close()
+
+
+def test_lowest_confidence_clips_are_deleted_first(tmp_path):
+    store = FilePredictionStore(str(tmp_path / "predictions.txt"))
+    create_clips(tmp_path / "data", store, [0.9, 0.6, 0.7, 0.8])
+    manager = RetentionManager(
+        str(tmp_path / "data"),
+        store,
+        max_bytes=250,
+        policy=RetentionPolicy.LOWEST_CONFIDENCE,
+    )
+    wait_until(lambda: manager.get_statistics()["evicted_clips"] == 2)
+    manager.close()
+
+    assert sorted(os.listdir(tmp_path / "data")) == [
+        "2021-05-01 06:00:00.wav",
+        "2021-05-01 06:03:00.wav",
+    ]
+    store.close()
+    # The expiration survives a restart and is applied to streamed predictions
+    store = FilePredictionStore(str(tmp_path / "predictions.txt"))
+    files = [json.loads(line)["File"] is None for line in store.stream()]
+    assert files == [False, True, True, False]
+    store.close()
+
+
+def test_clips_older_than_max_age_are_deleted(tmp_path):
+    store = SQLitePredictionStore(str(tmp_path / "predictions.db"))
+    create_clips(tmp_path / "data", store, [0.9, 0.9, 0.9])
+    manager = RetentionManager(str(tmp_path / "data"), store, max_age=598.5)
+    wait_until(lambda: manager.get_statistics()["evicted_clips"] == 2)
+    assert os.listdir(tmp_path / "data") == ["2021-05-01 06:02:00.wav"]
+    manager.close()
+    store.close()
+
+
+def test_heaps_stay_bounded(tmp_path):
+    store = FilePredictionStore(str(tmp_path / "predictions.txt"))
+    unlimited = RetentionManager(
+        str(tmp_path / "data"), store, policy=RetentionPolicy.LOWEST_CONFIDENCE
+    )
+    quota = RetentionManager(
+        str(tmp_path / "data"),
+        store,
+        max_bytes=1024 * 1024,
+        policy=RetentionPolicy.LOWEST_CONFIDENCE,
+    )
+    for index in range(100):
+        # The same clips are written again and again
+        unlimited.add_clip(f"{index % 5}.wav", 100, 0.9)
+        quota.add_clip(f"{index % 5}.wav", 100, 0.9)
+
+    assert unlimited.by_age == [] and unlimited.by_policy == []
+    assert quota.by_age == []
+    assert len(quota.by_policy) <= 10
+    assert quota.get_statistics()["bytes"] == 500
+    unlimited.close()
+    quota.close()
+    store.close()
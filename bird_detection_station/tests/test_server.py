@@ -1,5 +1,4 @@
 import json
-import os
 
 import pytest  # type: ignore
 import requests
@@ -8,7 +7,9 @@ from fastapi.testclient import TestClient
 
 import bird_detection.bird_recorder_service as bird_recorder_module
 from bird_detection.bird_recorder_service import BirdRecorder
-from tests.bird_recorder_factory import create_online_bird_recorder
+from bird_detection.http.file_serving import CompressedClipCache, FileServer
+from bird_detection.storage.sqlite_store import SQLitePredictionStore
+from tests.bird_recorder_factory import close_bird_recorder, create_online_bird_recorder
 
 from tests.stubs import (
     DeviceSelectorMock,
@@ -51,14 +52,14 @@ def mock_post(*args, **kwargs):
 
 
 @pytest.fixture()
-def bird_recorder():
-    BirdRecorder.instance = create_online_bird_recorder()
-    yield
-    # Cleanup
-    os.remove("test_predictions.txt")
+def bird_recorder(monkeypatch, tmp_path):
+    bird_recorder = create_online_bird_recorder(str(tmp_path))
+    monkeypatch.setattr(BirdRecorder, "instance", bird_recorder)
+    yield bird_recorder
+    close_bird_recorder(bird_recorder)
 
 
-def test_toggle_recording(monkeypatch):
+def test_toggle_recording(monkeypatch, bird_recorder):
     mock_sound_device(monkeypatch)
     monkeypatch.setattr(requests, "post", mock_post)
 
@@ -81,3 +82,109 @@ def test_get_root(monkeypatch):
     response = json.loads(json_response.content)
     assert json_response.status_code == 200
     assert response["@context"] == "https://www.w3.org/2019/wot/td/v1"
+
+
+def test_get_predictions_page(monkeypatch, bird_recorder, tmp_path):
+    mock_sound_device(monkeypatch)
+    bird_recorder.prediction_store.close()
+    bird_recorder.prediction_store = SQLitePredictionStore(
+        str(tmp_path / "predictions.db")
+    )
+    for minute in range(3):
+        bird_recorder.prediction_store.add(
+            {"Result": [], "Time": f"2021-05-01 06:0{minute}:00"}
+        )
+
+    response = client.get("/properties/predictions")
+    assert len(response.json()) == 3
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/properties/predictions?limit=2")
+    assert [prediction["Time"] for prediction in response.json()] == [
+        "2021-05-01 06:00:00",
+        "2021-05-01 06:01:00",
+    ]
+
+    response = client.get(
+        "/properties/predictions",
+        params={"cursor": response.headers["X-Next-Cursor"], "limit": 2},
+    )
+    assert len(response.json()) == 1
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/properties/predictions?since=2021-05-01T06:01:00")
+    assert len(response.json()) == 2
+
+    response = client.get(
+        "/properties/predictions?since=2021-05-01T06:01:00",
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["Time"] for line in response.text.splitlines()] == [
+        "2021-05-01 06:01:00",
+        "2021-05-01 06:02:00",
+    ]
+
+
+def test_bird_detection_websocket_replays_and_filters(monkeypatch, bird_recorder):
+    mock_sound_device(monkeypatch)
+    chaffinch = {"Result": [{"Common Name": "Common Chaffinch", "Confidence": 0.9}]}
+    blackbird = {"Result": [{"Common Name": "Eurasian Blackbird", "Confidence": 0.9}]}
+    for prediction in [chaffinch, blackbird, chaffinch]:
+        bird_recorder.event_hub.publish(json.dumps(prediction), prediction)
+
+    with client.websocket_connect(
+        "/events/bird_detection/ws?species=common%20chaffinch&last_event_id=1"
+    ) as websocket:
+        event = websocket.receive_json()
+        assert event["id"] == 3
+        assert event["Bird"] == chaffinch
+
+        bird_recorder.event_hub.publish(json.dumps(blackbird), blackbird)
+        bird_recorder.event_hub.publish(json.dumps(chaffinch), chaffinch)
+        assert websocket.receive_json()["id"] == 5
+
+
+def test_get_file_with_range_and_etag(monkeypatch, tmp_path):
+    mock_sound_device(monkeypatch)
+    file_server = FileServer(str(tmp_path), CompressedClipCache(1024 * 1024))
+    monkeypatch.setattr(FileServer, "instance", file_server)
+    with open(tmp_path / "test_clip.wav", "wb") as clip_file:
+        clip_file.write(bytes(range(256)) * 16)
+
+    response = client.get(
+        "/actions/files/test_clip.wav", headers={"Accept-Encoding": "identity"}
+    )
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.content == bytes(range(256)) * 16
+    assert "immutable" in response.headers["cache-control"]
+    etag = response.headers["etag"]
+
+    response = client.get(
+        "/actions/files/test_clip.wav",
+        headers={"If-None-Match": etag, "Accept-Encoding": "identity"},
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = client.get(
+        "/actions/files/test_clip.wav", headers={"Range": "bytes=256-511"}
+    )
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 256-511/4096"
+    assert response.content == bytes(range(256))
+
+    response = client.get(
+        "/actions/files/test_clip.wav", headers={"Range": "bytes=5000-"}
+    )
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */4096"
+
+    # A compressed rendition with its own ETag
+    response = client.get(
+        "/actions/files/test_clip.wav", headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] != etag
+    assert response.content == bytes(range(256)) * 16
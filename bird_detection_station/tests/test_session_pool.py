@@ -0,0 +1,64 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest  # type: ignore
+import requests
+
+from bird_detection.http.session_pool import HTTPSettings, SessionPool
+
+
+class ClassifierHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = b'{"Result": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def classifier_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ClassifierHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_connections_are_reused(classifier_url):
+    session_pool = SessionPool()
+    for _ in range(5):
+        response = session_pool.post(classifier_url + "/actions/analyse", data=b"wav")
+        assert response.status_code == 200
+
+    endpoint = session_pool.get_statistics()["endpoints"][classifier_url]
+    assert endpoint["requests"] == 5
+    assert endpoint["connections"] == 1
+    assert endpoint["reused_connections"] == 4
+
+
+def test_failed_requests_are_retried(monkeypatch):
+    session_pool = SessionPool(HTTPSettings(retries=2, backoff_factor=0))
+    attempts = []
+
+    def failing_request(session, method, url, **kwargs):
+        attempts.append(kwargs["timeout"])
+        raise requests.ConnectionError()
+
+    monkeypatch.setattr(requests.Session, "request", failing_request)
+    with pytest.raises(requests.ConnectionError):
+        session_pool.post("http://classifier/actions/analyse")
+
+    assert len(attempts) == 3
+    assert attempts[0] == (3.05, 30)
+    statistics = session_pool.get_statistics()
+    assert statistics["retries"] == 2
+    assert statistics["failures"] == 1
@@ -0,0 +1,157 @@
+import numpy as np  # type: ignore
+
+import bird_detection.audio.sound_device_wrapper as sound_device_module
+from bird_detection.audio.buffers import ClipBuffer, RingBuffer
+from bird_detection.audio.continuous_capture import ContinuousCapture
+from bird_detection.audio.device_selection import DeviceSelector
+from bird_detection.audio.sound_device_wrapper import SoundDevice
+from tests.mock_sounddevice import InputStreamStub
+
+
+def create_sound_device(pre_trigger_seconds: float = 0.5) -> SoundDevice:
+    device_selector = DeviceSelector()
+    device_selector._set_device("Test audio device")
+    return SoundDevice(
+        device_selector, threshold=0.1, pre_trigger_seconds=pre_trigger_seconds
+    )
+
+
+def block(value: float, frames: int = 1000) -> np.ndarray:
+    return np.full((frames, 1), value, dtype=np.float32)
+
+
+def test_ring_buffer_keeps_latest_frames():
+    ring_buffer = RingBuffer(5)
+    ring_buffer.write(np.arange(3, dtype=np.float32).reshape(-1, 1))
+    ring_buffer.write(np.arange(3, 7, dtype=np.float32).reshape(-1, 1))
+    out = np.zeros((5, 1), dtype=np.float32)
+    assert ring_buffer.read_into(out) == 5
+    assert out[:, 0].tolist() == [2, 3, 4, 5, 6]
+
+    ring_buffer.write(np.arange(10, 20, dtype=np.float32).reshape(-1, 1))
+    ring_buffer.read_into(out)
+    assert out[:, 0].tolist() == [15, 16, 17, 18, 19]
+
+
+def test_clip_buffer_returns_view():
+    clip = ClipBuffer(4)
+    assert not clip.write(np.ones((3, 1), dtype=np.float32))
+    assert clip.write(np.ones((3, 1), dtype=np.float32))
+    view = clip.view()
+    assert len(view) == 4
+    assert np.shares_memory(view, clip.buffer)
+
+
+def test_record_sound_keeps_pre_trigger(monkeypatch, tmp_path):
+    saved = {}
+    blocks = [block(0.0), block(0.01), block(0.5), block(0.3), block(0.3)]
+    monkeypatch.setattr(
+        sound_device_module.sd,
+        "InputStream",
+        lambda **kwargs: InputStreamStub(blocks, **kwargs),
+    )
+    sound_device = create_sound_device(pre_trigger_seconds=1.5)
+    sound_device.sample_rate = 1000
+
+    def save_audio(file_name, recording, sound_directory):
+        saved["recording"] = recording
+
+    monkeypatch.setattr(sound_device, "save_audio", save_audio)
+    file_name = sound_device.record_sound(2, sound_directory=str(tmp_path))
+
+    recording = saved["recording"]
+    assert file_name.endswith(".wav")
+    assert len(recording) == 3500
+    assert np.allclose(recording[:500], 0.0)
+    assert np.allclose(recording[500:1500], 0.01)
+    assert np.allclose(recording[1500:2500], 0.5)
+    assert np.allclose(recording[2500:], 0.3)
+
+
+def test_continuous_capture_counts_dropped_blocks():
+    capture = ContinuousCapture(
+        1000,
+        1,
+        "Test audio device",
+        lambda data: np.max(np.abs(data)) < 0.1,
+        record_seconds=2,
+        pre_trigger_seconds=0.5,
+        queue_size=1,
+    )
+    for data in [block(0.0), block(0.5), block(0.5)]:
+        capture._callback(data, len(data), None, None)
+    # The second sound is dropped because nobody consumed the first one
+    for data in [block(0.0), block(0.5), block(0.5)]:
+        capture._callback(data, len(data), None, None)
+
+    statistics = capture.get_statistics()
+    assert statistics["captured_segments"] == 1
+    assert statistics["dropped_segments"] == 1
+    assert statistics["dropped_blocks"] == 2
+
+    segment = capture.next_segment(timeout=0)
+    assert len(segment.data) == 2500
+    assert np.allclose(segment.data[:500], 0.0)
+    assert np.allclose(segment.data[500:], 0.5)
+    assert capture.next_segment(timeout=0) is None
+
+
+def test_continuous_capture_reuses_released_buffers():
+    capture = ContinuousCapture(
+        1000,
+        1,
+        "Test audio device",
+        lambda data: np.max(np.abs(data)) < 0.1,
+        record_seconds=2,
+        pre_trigger_seconds=0.5,
+        queue_size=1,
+    )
+
+    def record(value: float):
+        for data in [block(0.0), block(value), block(value)]:
+            capture._callback(data, len(data), None, None)
+
+    record(0.5)
+    first = capture.next_segment(timeout=0)
+    record(0.6)
+    # Both buffers are in use, so the third sound is skipped
+    record(0.7)
+    assert capture.get_statistics()["dropped_segments"] == 1
+    assert capture.get_statistics()["dropped_blocks"] == 2
+
+    second = capture.next_segment(timeout=0)
+    assert np.allclose(second.data[500:], 0.6)
+    first.release()
+    second.release()
+    assert capture.get_statistics()["free_buffers"] == 2
+
+    record(0.8)
+    third = capture.next_segment(timeout=0)
+    assert np.allclose(third.data[500:], 0.8)
+    assert capture.get_statistics()["free_buffers"] == 1
+
+
+def test_continuous_capture_pool_covers_the_held_segments():
+    capture = ContinuousCapture(
+        1000,
+        1,
+        "Test audio device",
+        lambda data: np.max(np.abs(data)) < 0.1,
+        queue_size=2,
+    )
+    capture.start(held_segments=3)
+    capture.stop()
+
+    assert capture.get_statistics()["free_buffers"] == 6
+
+
+def test_stopped_continuous_capture_ends_the_recording(monkeypatch):
+    def open_stream(**kwargs):
+        raise AssertionError("No one-shot stream may be opened")
+
+    sound_device = create_sound_device()
+    sound_device.start_continuous_capture(2)
+    sound_device.stop_continuous_capture()
+    monkeypatch.setattr(sound_device_module.sd, "InputStream", open_stream)
+
+    assert sound_device.capture_sound(2) is None
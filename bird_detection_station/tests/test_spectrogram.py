@@ -0,0 +1,72 @@
+import numpy as np  # type: ignore
+
+from bird_detection.classification.spectrogram import SpectrogramFrontend
+
+
+def simple_spec_layer(signal, frame_length=512, frame_step=374, mag_scale=1.0):
+    """
+    The operations of the SimpleSpecLayer of BirdNET.ts for a single window
+    """
+    frame_count = (len(signal) - frame_length) // frame_step + 1
+    window = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame_length) / frame_length)
+    stft = np.stack(
+        [
+            np.fft.rfft(signal[i * frame_step : i * frame_step + frame_length] * window)
+            for i in range(frame_count)
+        ]
+    )
+    spec = np.real(stft) ** 2.0
+    spec = spec ** (1.0 / (1.0 + np.exp(mag_scale)))
+    spec = (spec - spec.min()) / spec.max()
+    return spec.T
+
+
+def bird_song(seconds, sample_rate=48000):
+    rng = np.random.default_rng(3)
+    time = np.arange(int(sample_rate * seconds)) / sample_rate
+    chirp = np.sin(2 * np.pi * (2000 + 1500 * np.sin(2 * np.pi * 3 * time)) * time)
+    return (0.4 * chirp + 0.05 * rng.standard_normal(len(time))).astype(np.float32)
+
+
+def test_matches_the_layer_for_every_window():
+    samples = bird_song(5.5)
+    frontend = SpectrogramFrontend()
+
+    features = frontend.compute(samples)
+
+    assert features.shape == (3, 257, 384)
+    # The windows start on the frame nearest to their hop of 1 s
+    starts = frontend.first_frames(len(samples)) * 374
+    assert starts.tolist() == [0, 47872, 96118]
+    for index, start in enumerate(starts):
+        expected = simple_spec_layer(samples[start : start + 144000].astype(np.float64))
+        assert np.max(np.abs(features[index] - expected)) < 1e-4
+
+
+def test_windows_fit_into_the_recording():
+    frontend = SpectrogramFrontend()
+
+    for length in range(144000, 480000, 997):
+        starts = frontend.first_frames(length) * 374
+        hops = np.arange(len(starts)) * 48000
+        assert np.all(np.abs(starts - hops) <= 187)
+        assert starts[-1] + 383 * 374 + 512 <= length
+
+
+def test_shares_frames_of_aligned_windows():
+    # A hop of 100 frame steps, so the windows share most of their frames
+    samples = bird_song(4, sample_rate=37400)
+    frontend = SpectrogramFrontend(sample_rate=37400)
+
+    features = frontend.compute(samples)
+
+    assert features.shape == (2, 257, 299)
+    expected = simple_spec_layer(samples[37400 : 37400 + 112200].astype(np.float64))
+    assert np.max(np.abs(features[1] - expected)) < 1e-4
+
+
+def test_pads_short_and_silent_recordings():
+    features = SpectrogramFrontend().compute(np.zeros(1000, dtype=np.float32))
+
+    assert features.shape == (1, 257, 384)
+    assert not np.any(features)
@@ -0,0 +1,43 @@
+import numpy as np  # type: ignore
+
+from bird_detection.audio.trigger_detector import BandEnergyDetector
+
+SAMPLE_RATE = 48000
+BLOCK_SIZE = 1024
+
+
+def blocks(signal: np.ndarray):
+    for start in range(0, len(signal) - BLOCK_SIZE + 1, BLOCK_SIZE):
+        yield signal[start : start + BLOCK_SIZE].reshape(-1, 1)
+
+
+def tone(frequency: float, seconds: float, amplitude: float) -> np.ndarray:
+    time = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return amplitude * np.sin(2 * np.pi * frequency * time)
+
+
+def test_low_frequency_noise_is_suppressed():
+    detector = BandEnergyDetector(SAMPLE_RATE, rms_threshold=0.02)
+    rng = np.random.default_rng(0)
+    background = 0.001 * rng.standard_normal(SAMPLE_RATE)
+    wind = background + tone(150, 1, 0.3)
+
+    results = [detector.is_silent(block) for block in blocks(wind)]
+    assert all(results)
+    statistics = detector.get_statistics()
+    assert statistics["triggers"] == 0
+    assert statistics["suppressed_triggers"] > 0
+
+
+def test_bird_call_triggers():
+    detector = BandEnergyDetector(SAMPLE_RATE)
+    rng = np.random.default_rng(1)
+    background = 0.001 * rng.standard_normal(SAMPLE_RATE)
+    for block in blocks(background):
+        assert detector.is_silent(block)
+
+    call = 0.001 * rng.standard_normal(BLOCK_SIZE) + tone(
+        4000, BLOCK_SIZE / SAMPLE_RATE, 0.05
+    )
+    assert not detector.is_silent(call.reshape(-1, 1))
+    assert detector.get_statistics()["triggers"] == 1
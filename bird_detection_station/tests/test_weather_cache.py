@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest  # type: ignore
+
+from bird_detection.gps.location_service import Location
+from bird_detection.weather.weather_cache import WeatherCache
+from bird_detection.weather.weather_service import WeatherServiceInterface
+from tests.stubs import GPSServiceStub, wait_until
+
+
+class CountingWeatherService(WeatherServiceInterface):
+    def __init__(self):
+        self.requests = []
+        self.available = True
+        self.release = threading.Event()
+        self.release.set()
+
+    def request_weather_info(self):
+        return {}
+
+    def fetch_weather_info(self, lat, lon):
+        self.release.wait()
+        self.requests.append((lat, lon))
+        if not self.available:
+            return None
+        return {"main": {"temp": len(self.requests)}}
+
+
+class MovingGPSService(GPSServiceStub):
+    def __init__(self):
+        super().__init__()
+        self.location = Location(lat="53.5611", lon="10.0011")
+
+    def get_valid_location(self):
+        return self.location
+
+
+@pytest.fixture
+def cache_file(tmp_path):
+    return str(tmp_path / "weather_cache.json")
+
+
+def test_weather_is_refreshed_in_the_background_and_persisted(cache_file):
+    weather_service = CountingWeatherService()
+    location_service = MovingGPSService()
+    cache = WeatherCache(weather_service, location_service, cache_file)
+    assert cache.request_weather_info() == {}
+    wait_until(lambda: cache.request_weather_info() == {"main": {"temp": 1}})
+
+    # A small jitter of the GPS sensor is the same location
+    location_service.location = Location(lat="53.5638", lon="10.0042")
+    assert cache.request_weather_info() == {"main": {"temp": 1}}
+    assert weather_service.requests == [(53.56, 10.0)]
+    cache.close()
+
+    restarted_cache = WeatherCache(weather_service, location_service, cache_file)
+    assert restarted_cache.request_weather_info() == {"main": {"temp": 1}}
+    assert len(weather_service.requests) == 1
+    restarted_cache.close()
+
+
+def test_stale_weather_is_served_while_refreshing(cache_file):
+    weather_service = CountingWeatherService()
+    cache = WeatherCache(
+        weather_service, MovingGPSService(), cache_file, ttl=0.05, max_stale=60
+    )
+    cache.request_weather_info()
+    wait_until(lambda: cache.request_weather_info() == {"main": {"temp": 1}})
+
+    weather_service.release.clear()
+    time.sleep(0.1)
+    # The refresh is blocked, the stale snapshot is served without waiting
+    assert cache.request_weather_info() == {"main": {"temp": 1}}
+    assert cache.get_statistics()["stale_hits"] == 1
+    weather_service.release.set()
+    wait_until(lambda: cache.request_weather_info() == {"main": {"temp": 2}})
+    cache.close()
+
+
+def test_expired_weather_is_not_served(cache_file):
+    weather_service = CountingWeatherService()
+    cache = WeatherCache(
+        weather_service,
+        MovingGPSService(),
+        cache_file,
+        ttl=0.05,
+        max_stale=0.05,
+        retry_interval=60,
+    )
+    cache.request_weather_info()
+    wait_until(lambda: cache.request_weather_info() == {"main": {"temp": 1}})
+
+    weather_service.available = False
+    time.sleep(0.06)
+    assert cache.request_weather_info() == {"main": {"temp": 1}}
+    wait_until(lambda: cache.get_statistics()["refresh_failures"] == 1)
+    time.sleep(0.05)
+    assert cache.request_weather_info() == {}
+    # A failed refresh is not retried before the retry interval
+    assert len(weather_service.requests) == 2
+    cache.close()